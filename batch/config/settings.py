@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Optional
 
 from pydantic import BaseSettings
 
@@ -14,6 +15,27 @@ class Settings(BaseSettings):
 
     MONGO_HOST: str
     MONGO_DB: str
+    RELIABILITY_COLLECTION: str = "lease_version_reliability"
+
+    # outputs of the training job
+    MODEL_ARTIFACT: str = "models/reliability"
+    ENTITY_FEATURES_DIR: str = "data/processed/entity_features"
+
+    # comp versions read per MySQL page, pages buffered between stages and
+    # scoring processes
+    SCORING_PAGE_SIZE: int = 5000
+    SCORING_QUEUE_SIZE: int = 4
+    SCORING_JOBS: int = 1
+    # versions with a larger comp_version.id are scored
+    SCORING_AFTER_VERSION_ID: int = 0
+    # pages are keyed on comp_version.id, so a resumed run only sees new
+    # versions: set to rescore every version after SCORING_AFTER_VERSION_ID,
+    # picking up edited versions and master reassignments
+    SCORING_RESCORE_ALL: bool = False
+    # progress is checkpointed to this file when set, to Mongo otherwise
+    SCORING_CHECKPOINT_FILE: Optional[str] = None
+    SCORING_CHECKPOINT_COLLECTION: str = "lease_version_reliability_checkpoints"
+    SCORING_CHECKPOINT_NAME: str = "version_scoring"
 
     class Config:
         case_sensitive = True
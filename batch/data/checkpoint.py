@@ -0,0 +1,89 @@
+"""
+Durable progress of the scoring job: the last committed version cursor and
+the hash of the model artifact that scored up to it.
+"""
+import asyncio
+from datetime import datetime, timezone
+import json
+import os
+
+
+class FileCheckpoint:
+    """
+    Checkpoint in a local JSON file, replaced atomically on every save.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f)
+
+    def _save(self, checkpoint):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    async def load(self):
+        return await asyncio.to_thread(self._load)
+
+    async def save(self, cursor, model_hash):
+        await asyncio.to_thread(
+            self._save,
+            {
+                "cursor": cursor,
+                "model_hash": model_hash,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            },
+        )
+
+
+class MongoCheckpoint:
+    """
+    Checkpoint stored as the document `name` of a Mongo collection.
+    """
+
+    def __init__(self, collection, name):
+        self.collection = collection
+        self.name = name
+
+    async def load(self):
+        document = await self.collection.find_one({"_id": self.name})
+        if document is None:
+            return None
+        document.pop("_id")
+        return document
+
+    async def save(self, cursor, model_hash):
+        await self.collection.update_one(
+            {"_id": self.name},
+            {
+                "$set": {
+                    "cursor": cursor,
+                    "model_hash": model_hash,
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                },
+            },
+            upsert=True,
+        )
+
+
+async def resume_cursor(checkpoint, model_hash, start=0):
+    """
+    Cursor to resume from: the checkpointed one when it was committed with
+    the same model, `start` otherwise, so that a new model rescores every
+    version.
+    """
+    saved = await checkpoint.load()
+    if saved is None or saved["model_hash"] != model_hash:
+        return start
+    return max(saved["cursor"], start)
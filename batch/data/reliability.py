@@ -0,0 +1,51 @@
+from pymongo import UpdateOne
+
+
+async def upsert_reliabilities(collection, documents):
+    """
+    Upsert version reliability documents by `_id` in one unordered bulk
+    write, so one failing document does not stop the rest of the page.
+    Returns the number of documents written.
+    """
+    if not documents:
+        return 0
+    result = await collection.bulk_write(
+        [
+            UpdateOne({"_id": doc["_id"]}, {"$set": doc}, upsert=True)
+            for doc in documents
+        ],
+        ordered=False,
+    )
+    return result.upserted_count + result.matched_count
+
+
+async def ensure_indexes(collection):
+    await collection.create_index([("comp_version_id", 1)])
+
+
+async def skip_scored_versions(pages, collection, model_hash):
+    """
+    Drop the versions already scored with the model `model_hash` from the
+    `(cursor, page)` pairs of `pages`. Only pages at or below the highest
+    version id written with that model are looked up, which after a
+    restart are the pages written past the last checkpoint.
+    """
+    latest = await collection.find_one(
+        {"model_hash": model_hash},
+        sort=[("comp_version_id", -1)],
+        projection={"comp_version_id": 1},
+    )
+    high_water = None if latest is None else latest["comp_version_id"]
+    async for cursor, page in pages:
+        ids = page["comp_version_id"]
+        if high_water is not None and int(ids.iloc[0]) <= high_water:
+            scored = collection.find(
+                {
+                    "comp_version_id": {"$in": [int(i) for i in ids]},
+                    "model_hash": model_hash,
+                },
+                projection={"comp_version_id": 1},
+            )
+            done = [doc["comp_version_id"] async for doc in scored]
+            page = page[~ids.isin(done)]
+        yield cursor, page
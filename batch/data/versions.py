@@ -0,0 +1,73 @@
+import pandas as pd
+
+VERSION_COLUMNS = [
+    "comp_version_id",
+    "submitter_person_id",
+    "comp_data_id_version",
+    "comp_data_id_master",
+    "comp_batch_id",
+]
+
+# one page of versions by id, every version of the page is returned at
+# least once so the last id is the next page's cursor
+VERSION_PAGE_QUERY = """
+SELECT
+cv.id AS comp_version_id,
+cv.submitter_person_id,
+cv.comp_data_id AS comp_data_id_version,
+cm.comp_data_id AS comp_data_id_master,
+cp.comp_batch_id
+FROM (
+SELECT id, submitter_person_id, comp_data_id
+FROM comp_version
+WHERE id > :after_id
+ORDER BY id
+LIMIT :page_size) cv
+LEFT JOIN comp_master_versions cmv
+ON cmv.comp_version_id = cv.id
+LEFT JOIN comp_master cm
+ON cmv.comp_master_id = cm.id
+LEFT JOIN comp_proposal cp
+ON cv.id = cp.comp_version_id
+ORDER BY cv.id
+"""
+
+
+async def fetch_version_page(database, after_id, page_size):
+    """
+    Comp versions with an id greater than `after_id`, at most `page_size`
+    of them, one row per version.
+    """
+    rows = await database.fetch_all(
+        query=VERSION_PAGE_QUERY,
+        values={"after_id": after_id, "page_size": page_size},
+    )
+    df = pd.DataFrame.from_records(
+        [tuple(row) for row in rows],
+        columns=VERSION_COLUMNS,
+    )
+    # a version with several proposals keeps the first one with a batch
+    df = df.sort_values(
+        by=["comp_version_id", "comp_batch_id"],
+        na_position="last",
+        kind="stable",
+    )
+    return df.drop_duplicates(subset="comp_version_id").reset_index(drop=True)
+
+
+async def iter_version_pages(database, after_id=0, page_size=5000):
+    """
+    Keyset pagination over `comp_version.id`: yield `(cursor, page)` pairs
+    of versions in id order, starting after `after_id`, until a page comes
+    back short. The cursor is the last id of the page, the next pages
+    start after it. Versions changed in place keep their id and are not
+    seen again once paged past.
+    """
+    while True:
+        page = await fetch_version_page(database, after_id, page_size)
+        if page.empty:
+            return
+        after_id = int(page["comp_version_id"].iloc[-1])
+        yield after_id, page
+        if len(page) < page_size:
+            return
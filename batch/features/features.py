@@ -0,0 +1,36 @@
+import os
+
+import pandas as pd
+
+from train.data.schema import apply_schema, fill_missing
+from train.features.features import get_rate_features
+
+ENTITIES = ["submitter_person_id", "logo"]
+
+
+def load_entity_features(directory):
+    """
+    Entity aggregates and batch logos exported by the training job.
+    """
+    entity_features = {
+        name: pd.read_parquet(os.path.join(directory, f"{name}.parquet"))
+        for name in ENTITIES
+    }
+    batch_logos = pd.read_parquet(
+        os.path.join(directory, "batch_logos.parquet"),
+    )
+    return entity_features, batch_logos
+
+
+def version_features(versions, entity_features, batch_logos, attributes):
+    """
+    Rate features of each version from the latest aggregates of its
+    submitter and logo, as in training. Entities without aggregates yet
+    get the zero counts training gives versions without a logo.
+    """
+    df = versions.merge(batch_logos, on="comp_batch_id", how="left")
+    df = apply_schema(df)
+    for name in ENTITIES:
+        df = df.merge(entity_features[name], on=name, how="left")
+    df = fill_missing(df, 0)
+    return get_rate_features(df, attributes)
@@ -4,23 +4,95 @@ import structlog
 
 from batch.common.logging import initialize_logging
 from batch.config.settings import settings
+from batch.data.checkpoint import FileCheckpoint, MongoCheckpoint, resume_cursor
 from batch.data.database import (
     cs_mongo_instance as mongo_client,
     cs_mysql_instance as mysql,
 )
+from batch.data.reliability import (
+    ensure_indexes,
+    skip_scored_versions,
+    upsert_reliabilities,
+)
+from batch.data.versions import iter_version_pages
+from batch.models.scorer import VersionScorer
+from batch.pipeline import run_pipeline
+from train.model.artifact import artifact_hash
 
 logger = structlog.get_logger()
 initialize_logging(settings.ENV)
 
 
+def get_checkpoint(mongodb):
+    if settings.SCORING_CHECKPOINT_FILE:
+        return FileCheckpoint(settings.SCORING_CHECKPOINT_FILE)
+    return MongoCheckpoint(
+        mongodb[settings.SCORING_CHECKPOINT_COLLECTION],
+        settings.SCORING_CHECKPOINT_NAME,
+    )
+
+
+async def run_scoring(database, mongodb):
+    """
+    Score the versions of the MySQL `database` into the reliability
+    collection of `mongodb` and return the pipeline stats.
+    """
+    collection = mongodb[settings.RELIABILITY_COLLECTION]
+    await ensure_indexes(collection)
+
+    model_hash = artifact_hash(settings.MODEL_ARTIFACT)
+    checkpoint = get_checkpoint(mongodb)
+    if settings.SCORING_RESCORE_ALL:
+        after_id = settings.SCORING_AFTER_VERSION_ID
+        pages = iter_version_pages(
+            database,
+            after_id,
+            settings.SCORING_PAGE_SIZE,
+        )
+    else:
+        after_id = await resume_cursor(
+            checkpoint,
+            model_hash,
+            settings.SCORING_AFTER_VERSION_ID,
+        )
+        pages = skip_scored_versions(
+            iter_version_pages(database, after_id, settings.SCORING_PAGE_SIZE),
+            collection,
+            model_hash,
+        )
+    logger.info(
+        "Scoring versions",
+        after_id=after_id,
+        model_hash=model_hash,
+        rescore_all=settings.SCORING_RESCORE_ALL,
+    )
+
+    async with VersionScorer(
+        settings.MODEL_ARTIFACT,
+        settings.ENTITY_FEATURES_DIR,
+        model_hash,
+        settings.SCORING_JOBS,
+    ) as scorer:
+        return await run_pipeline(
+            pages,
+            scorer.score,
+            lambda documents: upsert_reliabilities(collection, documents),
+            lambda cursor: checkpoint.save(cursor, model_hash),
+            queue_size=settings.SCORING_QUEUE_SIZE,
+            n_scorers=settings.SCORING_JOBS,
+        )
+
+
 async def main() -> None:
     # MySQL connection
     await mysql.connect()
-    await mysql.disconnect()
 
     # Mongo connection
     mongo_client.get_io_loop = asyncio.get_running_loop
-    mongodb = mongo_client[settings.MONGO_DB]  # noqa: F841
+    try:
+        await run_scoring(mysql, mongo_client[settings.MONGO_DB])
+    finally:
+        await mysql.disconnect()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+"""
+Scoring of version pages in a process pool. Every worker memory-maps the
+model artifact and loads the entity aggregates once.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from batch.features.features import load_entity_features, version_features
+from train.model.artifact import load_model_artifact
+
+ID_COLUMNS = ["comp_version_id", "comp_data_id_version", "comp_data_id_master"]
+
+_worker = {}
+
+
+def _init_worker(artifact_path, entity_features_dir, model_hash):
+    artifact = load_model_artifact(artifact_path)
+    entity_features, batch_logos = load_entity_features(entity_features_dir)
+    _worker.update(
+        artifact=artifact,
+        model_hash=model_hash,
+        attributes={
+            label: label[: -len("_label")] for label in artifact.labels
+        },
+        entity_features=entity_features,
+        batch_logos=batch_logos,
+    )
+
+
+def score_versions(versions):
+    """
+    Reliability document of every scorable version of the page: versions
+    need a master and a submitter, like in the training extract.
+    """
+    versions = versions.dropna(
+        subset=["comp_data_id_master", "submitter_person_id"],
+    )
+    if versions.empty:
+        return []
+    attributes = _worker["attributes"]
+    artifact = _worker["artifact"]
+    df = version_features(
+        versions,
+        _worker["entity_features"],
+        _worker["batch_logos"],
+        list(attributes.values()),
+    )
+    probabilities = artifact.predict_proba_all(
+        df[artifact.feature_columns],
+        deduplicate=True,
+    )
+
+    scored_at = datetime.now(timezone.utc)
+    training_data = artifact.manifest["training_data_hash"]
+    ids = df[ID_COLUMNS].astype("int64").to_numpy().tolist()
+    reliability = zip(
+        *[probabilities[label].tolist() for label in attributes],
+    )
+    return [
+        {
+            "_id": comp_data_id_version,
+            "comp_version_id": comp_version_id,
+            "comp_data_id_master": comp_data_id_master,
+            "reliability": dict(zip(attributes.values(), values)),
+            "model_hash": _worker["model_hash"],
+            "training_data_hash": training_data,
+            "scored_at": scored_at,
+        }
+        for (
+            comp_version_id,
+            comp_data_id_version,
+            comp_data_id_master,
+        ), values in zip(ids, reliability)
+    ]
+
+
+class VersionScorer:
+    """
+    Async front of the scoring pool, used as an async context manager.
+    """
+
+    def __init__(
+        self,
+        artifact_path,
+        entity_features_dir,
+        model_hash,
+        n_jobs=1,
+    ):
+        self.artifact_path = artifact_path
+        self.entity_features_dir = entity_features_dir
+        self.model_hash = model_hash
+        self.n_jobs = n_jobs
+        self.executor = None
+
+    async def __aenter__(self):
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.n_jobs,
+            initializer=_init_worker,
+            initargs=(
+                self.artifact_path,
+                self.entity_features_dir,
+                self.model_hash,
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.executor = None
+
+    async def score(self, versions):
+        # pages emptied by the scored versions filter skip the pool
+        if versions.empty:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            score_versions,
+            versions,
+        )
@@ -0,0 +1,116 @@
+"""
+Streaming scoring pipeline: pages of versions flow from the reader through
+the scorers to the writer over bounded queues, so a slow stage holds the
+ones before it back instead of letting pages pile up in memory.
+
+Every page comes with a cursor. Pages may finish out of order with several
+scorers, so the writer only commits the cursor of the last page of the
+written prefix: everything up to a committed cursor has been written.
+"""
+import asyncio
+import time
+
+import structlog
+
+logger = structlog.get_logger()
+
+# end of stream marker, one per consumer of a queue
+_DONE = None
+
+
+async def _read(pages, queue, n_consumers, stats):
+    sequence = 0
+    async for cursor, page in pages:
+        stats["read"] += len(page)
+        await queue.put((sequence, cursor, page))
+        sequence += 1
+    for _ in range(n_consumers):
+        await queue.put(_DONE)
+
+
+async def _score(score, in_queue, out_queue, stats):
+    while True:
+        item = await in_queue.get()
+        if item is _DONE:
+            await out_queue.put(_DONE)
+            return
+        sequence, cursor, page = item
+        documents = await score(page)
+        stats["scored"] += len(documents)
+        await out_queue.put((sequence, cursor, documents))
+
+
+async def _write(write, commit, queue, n_producers, stats):
+    finished = 0
+    written = {}
+    next_sequence = 0
+    while finished < n_producers:
+        item = await queue.get()
+        if item is _DONE:
+            finished += 1
+            continue
+        sequence, cursor, documents = item
+        stats["written"] += await write(documents)
+        written[sequence] = cursor
+
+        committed = None
+        while next_sequence in written:
+            committed = written.pop(next_sequence)
+            next_sequence += 1
+        if committed is not None:
+            if commit is not None:
+                await commit(committed)
+            stats["cursor"] = committed
+        logger.info("Scored versions written", **stats)
+
+
+async def run_pipeline(
+    pages,
+    score,
+    write,
+    commit=None,
+    queue_size=4,
+    n_scorers=1,
+):
+    """
+    Run `score` on every page of the async iterable of `(cursor, page)`
+    pairs `pages` with `n_scorers` concurrent scorers and `write` the
+    results. `score` returns the documents of a page and `write` the
+    number of documents written. `commit` is awaited with the cursor of
+    the last page once it and every page before it are written. The first
+    failing stage cancels the others and its error is raised.
+    """
+    start = time.perf_counter()
+    stats = {"read": 0, "scored": 0, "written": 0, "cursor": None}
+    pending = asyncio.Queue(maxsize=queue_size)
+    scored = asyncio.Queue(maxsize=queue_size)
+    tasks = [
+        asyncio.ensure_future(_read(pages, pending, n_scorers, stats)),
+        *[
+            asyncio.ensure_future(_score(score, pending, scored, stats))
+            for _ in range(n_scorers)
+        ],
+        asyncio.ensure_future(
+            _write(write, commit, scored, n_scorers, stats),
+        ),
+    ]
+    try:
+        done, _ = await asyncio.wait(
+            tasks,
+            return_when=asyncio.FIRST_EXCEPTION,
+        )
+        for task in done:
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "Scoring pipeline finished",
+        seconds=round(elapsed, 2),
+        versions_per_second=round(stats["written"] / max(elapsed, 1e-9)),
+        **stats,
+    )
+    return stats
@@ -0,0 +1,157 @@
+"""
+Throughput of the API server while the CompStak auth service goes down,
+against a local stub of the auth and exchange services.
+
+    python -m benchmarks.auth_outage --clients 64 --phase-seconds 5
+
+The server app is driven in process over ASGI. Clients split between
+`/exchange/attributes`, which needs a token, and the health check. Tokens
+expire after one second, so every phase exercises the token flow:
+
+    healthy   auth answers normally
+    outage    auth hangs (`--outage hang`) or returns 503 (`--outage error`)
+    recovered auth answers normally again
+
+The other server settings (MySQL, client credentials, ...) are read from
+the environment as usual; the stub URLs override CS_AUTH_URL and
+CS_EXCHANGE_URL. The auth timeouts default to short values so the circuit
+opens and closes again within a phase; set CS_AUTH_TIMEOUT,
+CS_AUTH_DEADLINE or CS_AUTH_CIRCUIT_RESET to override.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import socket
+import threading
+import time
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+import uvicorn
+
+STUB = {"outage": None}
+
+
+async def stub_token(request):
+    if STUB["outage"] == "hang":
+        await asyncio.sleep(3600)
+    if STUB["outage"] == "error":
+        return JSONResponse({"error": "unavailable"}, status_code=503)
+    return JSONResponse(
+        {
+            "token_type": "Bearer",
+            "access_token": f"token-{time.monotonic()}",
+            "expires_in": 1,
+            "refresh_token": "",
+            "scope": "stub",
+        },
+    )
+
+
+async def stub_attributes(request):
+    return JSONResponse({"attributes": ["tenant_name", "starting_rent"]})
+
+
+def start_stub_server(app):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"),
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+async def client_loop(client, path, stats, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        stats[(path, status)].append(time.perf_counter() - start)
+
+
+async def run_phase(client, clients, seconds):
+    stats = collections.defaultdict(list)
+    stop = asyncio.Event()
+    paths = ["/api/v1/exchange/attributes", "/"]
+    tasks = [
+        asyncio.create_task(
+            client_loop(client, paths[i % len(paths)], stats, stop),
+        )
+        for i in range(clients)
+    ]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.wait(tasks, timeout=60)
+
+    result = {}
+    for (path, status), latencies in sorted(stats.items(), key=str):
+        latencies = sorted(latencies)
+        result[f"{path} {status}"] = {
+            "rps": round(len(latencies) / seconds, 1),
+            "p50_ms": round(1000 * latencies[len(latencies) // 2], 1),
+            "p99_ms": round(1000 * latencies[int(len(latencies) * 0.99)], 1),
+        }
+    return result
+
+
+async def main(args):
+    import httpx
+
+    from server.app import app
+
+    results = {}
+    async with httpx.AsyncClient(
+        app=app,
+        base_url="http://server",
+        timeout=None,
+    ) as client:
+        for phase, outage in [
+            ("healthy", None),
+            ("outage", args.outage),
+            ("recovered", None),
+        ]:
+            STUB["outage"] = outage
+            results[phase] = await run_phase(
+                client,
+                args.clients,
+                args.phase_seconds,
+            )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--phase-seconds", type=float, default=5.0)
+    parser.add_argument("--outage", choices=["hang", "error"], default="hang")
+    args = parser.parse_args()
+
+    url = start_stub_server(
+        Starlette(
+            routes=[
+                Route("/api/oauth2/token", stub_token, methods=["POST"]),
+                Route("/api/allAttrs", stub_attributes),
+            ],
+        ),
+    )
+    os.environ["CS_AUTH_URL"] = url
+    os.environ["CS_EXCHANGE_URL"] = url
+    os.environ["CS_TOKEN_REFRESH_MARGIN"] = "0"
+    # revalidate the attributes on every request so each one needs a token
+    os.environ["EXCHANGE_ATTRIBUTES_TTL"] = "0"
+    os.environ["EXCHANGE_ATTRIBUTES_STALE_TTL"] = "0"
+    os.environ.setdefault("CS_AUTH_TIMEOUT", "0.5")
+    os.environ.setdefault("CS_AUTH_DEADLINE", "1")
+    os.environ.setdefault("CS_AUTH_CIRCUIT_RESET", "2")
+    asyncio.run(main(args))
@@ -0,0 +1,153 @@
+"""
+Latency of `/exchange/attributes` against a local stub of the auth and
+exchange services that serves a large attributes payload with an ETag.
+
+    python -m benchmarks.exchange_proxy --clients 16 --seconds 5
+
+Phases:
+
+    revalidate  the response cache is expired on every request, so each
+                call goes upstream over the pooled client (304s)
+    cached      repeat callers are served from memory
+    etag        callers send If-None-Match and get 304s from the server
+
+The other server settings are read from the environment as usual, the
+stub URL overrides CS_AUTH_URL and CS_EXCHANGE_URL.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from benchmarks.auth_outage import start_stub_server
+
+STUB = {"payload": b"", "requests": 0, "delay": 0.0}
+
+
+async def stub_token(request):
+    return JSONResponse(
+        {
+            "token_type": "Bearer",
+            "access_token": "token",
+            "expires_in": 3600,
+            "refresh_token": "",
+            "scope": "stub",
+        },
+    )
+
+
+async def stub_attributes(request):
+    STUB["requests"] += 1
+    await asyncio.sleep(STUB["delay"])
+    etag = f'"{hashlib.sha1(STUB["payload"]).hexdigest()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(
+        STUB["payload"],
+        media_type="application/json",
+        headers={"ETag": etag},
+    )
+
+
+def attributes_payload(n_attributes):
+    return json.dumps(
+        {
+            f"attribute_{i}": {
+                "label": f"Attribute {i}",
+                "values": [f"value {j}" for j in range(50)],
+            }
+            for i in range(n_attributes)
+        },
+    ).encode()
+
+
+def set_cache_ttl(cache, ttl, stale_ttl):
+    cache.ttl, cache.stale_ttl = ttl, stale_ttl
+    cache.cached = cache.cached._replace(max_age=ttl)
+
+
+async def run_phase(client, clients, seconds, headers=None):
+    latencies = []
+    statuses = set()
+    deadline = time.perf_counter() + seconds
+
+    async def client_loop():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get(
+                "/api/v1/exchange/attributes",
+                headers=headers,
+            )
+            statuses.add(response.status_code)
+            latencies.append(time.perf_counter() - start)
+
+    upstream = STUB["requests"]
+    await asyncio.gather(*[client_loop() for _ in range(clients)])
+    latencies.sort()
+    return {
+        "rps": round(len(latencies) / seconds, 1),
+        "p50_ms": round(1000 * latencies[len(latencies) // 2], 2),
+        "p99_ms": round(1000 * latencies[int(len(latencies) * 0.99)], 2),
+        "upstream_requests": STUB["requests"] - upstream,
+        "statuses": sorted(statuses),
+    }
+
+
+async def main(args):
+    import httpx
+
+    from server.api.endpoints.exchange import attributes_cache
+    from server.app import app
+
+    results = {}
+    async with httpx.AsyncClient(app=app, base_url="http://server") as client:
+        first = await client.get("/api/v1/exchange/attributes")
+        etag = first.headers["etag"]
+        results["payload_bytes"] = len(first.content)
+
+        ttl, stale_ttl = attributes_cache.ttl, attributes_cache.stale_ttl
+        set_cache_ttl(attributes_cache, 0, 0)
+        results["revalidate"] = await run_phase(
+            client,
+            args.clients,
+            args.seconds,
+        )
+
+        set_cache_ttl(attributes_cache, ttl, stale_ttl)
+        results["cached"] = await run_phase(client, args.clients, args.seconds)
+        results["etag"] = await run_phase(
+            client,
+            args.clients,
+            args.seconds,
+            headers={"If-None-Match": etag},
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--attributes", type=int, default=2000)
+    parser.add_argument("--upstream-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    STUB["payload"] = attributes_payload(args.attributes)
+    STUB["delay"] = args.upstream_delay
+    url = start_stub_server(
+        Starlette(
+            routes=[
+                Route("/api/oauth2/token", stub_token, methods=["POST"]),
+                Route("/api/allAttrs", stub_attributes),
+            ],
+        ),
+    )
+    os.environ["CS_AUTH_URL"] = url
+    os.environ["CS_EXCHANGE_URL"] = url
+    asyncio.run(main(args))
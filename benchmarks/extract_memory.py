@@ -0,0 +1,71 @@
+"""
+Peak memory of the version extract, `pd.read_sql` against streamed batches,
+measured on the local SQLite stand-in.
+
+    python -m benchmarks.extract_memory --rows 200000 --batch-size 50000
+
+Each mode runs in a fresh process so its peak RSS is not shared with the
+data generation or the other mode.
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import tempfile
+import time
+
+from benchmarks import offline_settings  # noqa: F401
+from tests.standin import connect_standin, load_standin
+from train.data.dataset import read_version_data
+from train.data.synthetic import ATTRIBUTES, synthetic_version_data
+
+
+def run_extract(directory, batch_size, results):
+    connection = connect_standin(directory)
+    start = time.perf_counter()
+    df = read_version_data(connection, "", batch_size, ATTRIBUTES)
+    results.put(
+        {
+            "batch_size": batch_size,
+            "rows": len(df),
+            "seconds": round(time.perf_counter() - start, 3),
+            "peak_rss_mb": round(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                1,
+            ),
+            "frame_mb": round(df.memory_usage(deep=True).sum() / 2**20, 1),
+        },
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        connection = connect_standin(directory)
+        load_standin(connection, synthetic_version_data(args.rows))
+        connection.close()
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        report = {}
+        for mode, batch_size in [
+            ("read_sql", None),
+            ("stream", args.batch_size),
+        ]:
+            process = context.Process(
+                target=run_extract,
+                args=(directory, batch_size, results),
+            )
+            process.start()
+            report[mode] = results.get()
+            process.join()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
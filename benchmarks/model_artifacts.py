@@ -0,0 +1,161 @@
+"""
+Load time, memory and size of the model dict stored with joblib, pickle and
+the compact memory-mapped artifact.
+
+    python -m benchmarks.model_artifacts --rows 100000 --models 14
+
+Every format is loaded in a fresh process, which reports the load time,
+the RSS growth caused by the load and the time to score a batch.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import resource
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from train.model.artifact import load_model_artifact, save_model_artifact
+
+N_FEATURES = 56
+
+
+def synthetic_training_data(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.random((n_rows, N_FEATURES), dtype="float32")
+    noise = rng.random(n_rows)
+    return X, rng, noise
+
+
+def train_model_dict(n_rows, n_models, n_trees):
+    X, rng, noise = synthetic_training_data(n_rows)
+    model_dict = {}
+    for i in range(n_models):
+        weights = rng.normal(size=N_FEATURES)
+        score = X @ weights
+        y = (score + noise * score.std() > np.median(score)).astype(int)
+        clf = RandomForestClassifier(
+            n_estimators=n_trees,
+            random_state=1,
+            n_jobs=-1,
+        )
+        model_dict[f"attribute_{i}_label"] = clf.fit(X, y)
+    return model_dict, X
+
+
+def _rss_mb():
+    """
+    Current resident set size, falling back to the peak where /proc is
+    not available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _size_mb(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 2**20
+    return (
+        sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        / 2**20
+    )
+
+
+def run_load(fmt, path, X, results):
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    if fmt == "compact":
+        artifact = load_model_artifact(path)
+
+        def predict_all():
+            return artifact.predict_proba_all(X)
+
+    else:
+        if fmt == "joblib":
+            model_dict = joblib.load(path)
+        else:
+            with open(path, "rb") as f:
+                model_dict = pickle.load(f)
+
+        def predict_all():
+            return {
+                label: clf.predict_proba(X)[:, 1]
+                for label, clf in model_dict.items()
+            }
+
+    load_seconds = time.perf_counter() - start
+    rss_load = _rss_mb() - rss_before
+
+    start = time.perf_counter()
+    probabilities = predict_all()
+    results.put(
+        {
+            "load_seconds": round(load_seconds, 3),
+            "load_rss_mb": round(rss_load, 1),
+            "score_seconds": round(time.perf_counter() - start, 3),
+            "size_mb": round(_size_mb(path), 1),
+            "probabilities": probabilities,
+        },
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--models", type=int, default=14)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--score-rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    model_dict, X = train_model_dict(args.rows, args.models, args.trees)
+    X_score = X[: args.score_rows]
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {
+            "joblib": os.path.join(directory, "models.joblib"),
+            "pickle": os.path.join(directory, "models.pkl"),
+            "compact": os.path.join(directory, "compact"),
+        }
+        joblib.dump(model_dict, paths["joblib"])
+        with open(paths["pickle"], "wb") as f:
+            pickle.dump(model_dict, f, protocol=pickle.HIGHEST_PROTOCOL)
+        save_model_artifact(
+            model_dict,
+            [f"x{i}" for i in range(N_FEATURES)],
+            paths["compact"],
+        )
+        del model_dict
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        report = {}
+        for fmt, path in paths.items():
+            process = context.Process(
+                target=run_load,
+                args=(fmt, path, X_score, results),
+            )
+            process.start()
+            report[fmt] = results.get()
+            process.join()
+
+    reference = report["joblib"].pop("probabilities")
+    for fmt in ["pickle", "compact"]:
+        probabilities = report[fmt].pop("probabilities")
+        report[fmt]["max_abs_prob_diff"] = max(
+            float(np.abs(probabilities[label] - reference[label]).max())
+            for label in reference
+        )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
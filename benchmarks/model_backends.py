@@ -0,0 +1,143 @@
+"""
+Train time, scoring throughput, artifact size and holdout accuracy / F1 of
+the model backends of `train_multioutput_classifiers`, on synthetic
+features with a planted signal per attribute.
+
+    python -m benchmarks.model_backends --rows 20000 --holdout 20000
+
+Scoring is timed through both paths used downstream: the estimators'
+`predict_proba` on a DataFrame (training exports) and the loaded model
+artifact (API server).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score
+
+from benchmarks import offline_settings  # noqa: F401
+from train.data.synthetic import ATTRIBUTES
+from train.model.artifact import load_model_artifact, save_model_artifact
+from train.model.model import BACKENDS, train_multioutput_classifiers
+
+
+def synthetic_training_data(n_rows, n_features=56, seed=0):
+    """
+    Rate-like features and one label column per attribute drawn from a
+    logistic model of the features, with 10% null (-1) labels.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.random((n_rows, n_features)).astype("float32")
+    X_cols = [f"feature_{i}_rate" for i in range(n_features)]
+    df = pd.DataFrame(X, columns=X_cols)
+
+    y_cols = []
+    for att in ATTRIBUTES:
+        weights = rng.normal(size=n_features) * (rng.random(n_features) < 0.2)
+        logit = 4 * (X - 0.5) @ weights + rng.normal(size=n_rows)
+        labels = (logit > 0).astype("int8")
+        labels[rng.random(n_rows) < 0.1] = -1
+        df[f"{att}_label"] = labels
+        y_cols.append(f"{att}_label")
+    return df, X_cols, y_cols
+
+
+def _directory_mb(path):
+    return sum(
+        os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+    ) / (2**20)
+
+
+def run_backend(backend, train, holdout, X_cols, y_cols, tree_jobs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model_dict = train_multioutput_classifiers(
+            train,
+            X_cols,
+            y_cols,
+            backend=backend,
+            model_jobs=1,
+            tree_jobs=tree_jobs,
+        )
+    train_seconds = time.perf_counter() - start
+
+    X_holdout = holdout[X_cols]
+    start = time.perf_counter()
+    probabilities = {
+        col: clf.predict_proba(X_holdout)[:, 1]
+        for col, clf in model_dict.items()
+    }
+    estimator_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        save_model_artifact(model_dict, X_cols, directory)
+        artifact_mb = _directory_mb(directory)
+        artifact = load_model_artifact(directory)
+        matrix = X_holdout.to_numpy(dtype="float32")
+        start = time.perf_counter()
+        artifact.predict_proba_all(matrix, y_cols)
+        artifact_seconds = time.perf_counter() - start
+
+    metrics = {}
+    for col in y_cols:
+        labeled = holdout[col].to_numpy() != -1
+        y_true = holdout[col].to_numpy()[labeled]
+        y_pred = (probabilities[col][labeled] > 0.5).astype("int8")
+        metrics[col] = {
+            "accuracy": round(accuracy_score(y_true, y_pred), 4),
+            "f1": round(f1_score(y_true, y_pred), 4),
+        }
+
+    return {
+        "train_seconds": round(train_seconds, 2),
+        "estimator_rows_per_second": round(len(holdout) / estimator_seconds),
+        "artifact_rows_per_second": round(len(holdout) / artifact_seconds),
+        "artifact_mb": round(artifact_mb, 2),
+        "mean_accuracy": round(
+            np.mean([m["accuracy"] for m in metrics.values()]),
+            4,
+        ),
+        "mean_f1": round(np.mean([m["f1"] for m in metrics.values()]), 4),
+        "attributes": metrics,
+    }
+
+
+def main(args):
+    df, X_cols, y_cols = synthetic_training_data(args.rows + args.holdout)
+    train, holdout = df.iloc[: args.rows], df.iloc[args.rows :]
+
+    results = {}
+    for backend in args.backends:
+        results[backend] = run_backend(
+            backend,
+            train,
+            holdout,
+            X_cols,
+            y_cols,
+            args.tree_jobs,
+        )
+        summary = {
+            k: v for k, v in results[backend].items() if k != "attributes"
+        }
+        print(backend, summary, flush=True)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--holdout", type=int, default=20000)
+    parser.add_argument("--tree-jobs", type=int, default=-1)
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=BACKENDS,
+        default=BACKENDS,
+    )
+    main(parser.parse_args())
@@ -0,0 +1,23 @@
+"""
+Placeholder connection settings for the benchmarks that run the training
+code offline. The training modules read their settings on import and
+require the MySQL and Snowflake settings, which these benchmarks never
+use. Import this module before any `train` module:
+
+    from benchmarks import offline_settings  # noqa: F401
+
+Values already in the environment are kept.
+"""
+import os
+
+for name in [
+    "MYSQL_HOST",
+    "MYSQL_USER",
+    "MYSQL_PASS",
+    "MYSQL_PORT",
+    "MYSQL_DB",
+    "SNOWFLAKE_USERNAME",
+    "SNOWFLAKE_PRIVATE_KEY_DECRYPTED",
+    "SNOWFLAKE_ACCOUNT",
+]:
+    os.environ.setdefault(name, "offline")
@@ -0,0 +1,245 @@
+"""
+Wall time and peak RSS of the training pipeline stages on synthetic data
+(see `train.data.synthetic`), checked against a JSON baseline.
+
+    python -m benchmarks.training_pipeline --rows 10000 1000000
+    python -m benchmarks.training_pipeline --rows 10000 --save
+
+Every size runs in a fresh process. The RSS is sampled while a stage
+runs, so the peak of a stage is not hidden by an earlier, bigger one.
+With `--save` the results are merged into the baseline file, otherwise
+they are compared with it and the run fails when a stage takes more time
+or memory than its baseline by more than `--tolerance`, or when a size
+has no baseline to compare with.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from queue import Empty
+import sys
+import time
+
+from benchmarks import offline_settings  # noqa: F401
+from train.common.profiling import PeakRSS
+from train.data.dataset import get_labels, split_version_data
+from train.data.output_data import (
+    get_submitter_reliability,
+    get_version_reliability,
+)
+from train.data.schema import apply_schema
+from train.data.synthetic import (
+    ATTRIBUTES,
+    synthetic_submitter_info,
+    synthetic_version_data,
+)
+from train.features.features import feature_engineering, get_entity_features
+from train.model.model import (
+    get_column_names,
+    get_split_columns,
+    train_multioutput_classifiers,
+)
+
+BASELINE = "benchmarks/baselines/training_pipeline.json"
+
+STAGES = [
+    "get_labels",
+    "feature_engineering",
+    "train_multioutput_classifiers",
+    "get_submitter_reliability",
+    "get_version_reliability",
+]
+
+# differences below these are noise, whatever the tolerance
+MIN_SECONDS = 0.1
+MIN_RSS_MB = 10
+
+
+def run_stages(n_rows, seed, results):
+    report = {}
+
+    def stage(name, function, *args):
+        with PeakRSS() as rss:
+            start = time.perf_counter()
+            result = function(*args)
+            seconds = time.perf_counter() - start
+        report[name] = {
+            "seconds": round(seconds, 3),
+            "peak_rss_mb": round(rss.peak / 2**20, 1),
+        }
+        print(n_rows, name, report[name], file=sys.stderr, flush=True)
+        return result
+
+    col_names_correct, col_names_filled, col_names_label = get_column_names(
+        ATTRIBUTES,
+    )
+    version_data = stage("generate", synthetic_version_data, n_rows, seed)
+    submitter_name = synthetic_submitter_info(version_data)
+
+    labeled = stage(
+        "get_labels",
+        lambda df: apply_schema(get_labels(df, ATTRIBUTES)),
+        version_data,
+    )
+    del version_data
+    data, all_data = split_version_data(labeled)
+    del labeled
+
+    def features():
+        # the reliable data and all data, as in `train/train.py`
+        df = feature_engineering(
+            data,
+            col_names_label,
+            col_names_filled,
+            col_names_correct,
+            ATTRIBUTES,
+        )
+        df_all = feature_engineering(
+            all_data,
+            col_names_label,
+            col_names_filled,
+            col_names_correct,
+            ATTRIBUTES,
+            get_entity_features(all_data, col_names_label, col_names_filled),
+        )
+        return df, df_all
+
+    df, df_all = stage("feature_engineering", features)
+    x_cols, y_cols = get_split_columns(df.columns)
+    model_dict = stage(
+        "train_multioutput_classifiers",
+        train_multioutput_classifiers,
+        df,
+        x_cols,
+        y_cols,
+    )
+    stage(
+        "get_submitter_reliability",
+        lambda: asyncio.run(
+            get_submitter_reliability(
+                df,
+                x_cols,
+                y_cols,
+                model_dict,
+                submitter_name,
+            ),
+        ),
+    )
+    stage(
+        "get_version_reliability",
+        get_version_reliability,
+        df_all,
+        ATTRIBUTES,
+        x_cols,
+        y_cols,
+        model_dict,
+    )
+    results.put(report)
+
+
+def regressions(results, baseline, tolerance):
+    """
+    `(rows, stage, metric, value, baseline)` of every measure of `results`
+    above its baseline by more than `tolerance`.
+    """
+    found = []
+    for rows, stages in results.items():
+        for name, measures in stages.items():
+            expected = baseline.get(rows, {}).get(name)
+            if name not in STAGES or expected is None:
+                continue
+            for metric, slack in [
+                ("seconds", MIN_SECONDS),
+                ("peak_rss_mb", MIN_RSS_MB),
+            ]:
+                limit = max(
+                    expected[metric] * (1 + tolerance),
+                    expected[metric] + slack,
+                )
+                if measures[metric] > limit:
+                    found.append(
+                        (
+                            rows,
+                            name,
+                            metric,
+                            measures[metric],
+                            expected[metric],
+                        ),
+                    )
+    return found
+
+
+def wait_report(process, queue, poll_seconds=1.0):
+    """
+    Report of a `run_stages` process, polled so that a process that dies
+    without one (killed for memory, crashed in a native extension) fails
+    the run instead of blocking it.
+    """
+    while process.exitcode is None:
+        try:
+            return queue.get(timeout=poll_seconds)
+        except Empty:
+            pass
+    # the report may still be in flight when the process exits
+    try:
+        return queue.get(timeout=poll_seconds)
+    except Empty:
+        raise RuntimeError(
+            f"Benchmark process exited with code {process.exitcode} "
+            "without a report",
+        ) from None
+
+
+def main(args):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    results = {}
+    for n_rows in args.rows:
+        process = context.Process(
+            target=run_stages,
+            args=(n_rows, args.seed, queue),
+        )
+        process.start()
+        try:
+            results[str(n_rows)] = wait_report(process, queue)
+        finally:
+            process.join()
+    print(json.dumps(results, indent=2))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.save:
+        baseline.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        return 0
+
+    found = regressions(results, baseline, args.tolerance)
+    for rows, name, metric, value, expected in found:
+        print(
+            f"REGRESSION rows={rows} {name} {metric}: {value} "
+            f"(baseline {expected})",
+        )
+    missing = [rows for rows in results if rows not in baseline]
+    for rows in missing:
+        print(
+            f"NO BASELINE rows={rows} in {args.baseline}, "
+            "record one with --save",
+        )
+    return 1 if found or missing else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save", action="store_true")
+    sys.exit(main(parser.parse_args()))
@@ -1,27 +1,60 @@
 import logging
-from typing import Any, Dict
+import time
+from typing import Dict
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Request, Response
 import httpx
 
-from server.api.endpoints.token import get_cs_auth_headers
+from server.api.endpoints.token import cs_token_cache, get_cs_auth_headers
 from server.config.settings import settings
+from server.data.http import cs_http_instance
+from server.data.response_cache import ResponseCache
+from server.metrics import observe_upstream
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+async def request_all_attributes(validators: Dict[str, str]) -> httpx.Response:
+    url = f"{settings.CS_EXCHANGE_URL}/api/allAttrs"
+    headers = await get_cs_auth_headers()
+
+    start = time.perf_counter()
+    try:
+        response = await cs_http_instance.client.get(
+            url=url,
+            headers={**headers, **validators},
+        )
+    except httpx.TransportError:
+        observe_upstream("cs_exchange", start, "error")
+        raise
+    observe_upstream("cs_exchange", start, str(response.status_code))
+    if response.status_code == httpx.codes.UNAUTHORIZED:
+        # let the next request fetch a new token
+        await cs_token_cache.invalidate(headers["Authorization"].split()[-1])
+    return response
+
+
+attributes_cache = ResponseCache(
+    request_all_attributes,
+    ttl=settings.EXCHANGE_ATTRIBUTES_TTL,
+    stale_ttl=settings.EXCHANGE_ATTRIBUTES_STALE_TTL,
+    name="exchange_attributes",
+)
+
+
 @router.get(
     "/attributes",
     tags=["exchange"],
 )
-async def get_all_attributes(
-    headers: Dict[str, str] = Depends(get_cs_auth_headers),
-) -> Any:
-    url = f"{settings.CS_EXCHANGE_URL}/api/allAttrs"
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url=url, headers=headers)
-        response.raise_for_status()
+async def get_all_attributes(request: Request) -> Response:
+    cached = await attributes_cache.get()
+    headers = {"ETag": cached.etag}
+    if request.headers.get("if-none-match") == cached.etag:
+        return Response(status_code=304, headers=headers)
 
-    return response.json()
+    return Response(
+        content=cached.content,
+        media_type=cached.media_type,
+        headers=headers,
+    )
@@ -0,0 +1,160 @@
+import logging
+from typing import Any, Mapping
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from server.api.schemas.reliability import (
+    MasterReliability,
+    ReliabilityFeatures,
+    StoredVersionReliability,
+    VersionBatchFeatures,
+    VersionBatchReliability,
+    VersionFeatures,
+    VersionReliability,
+)
+from server.models.reliability import ReliabilityModel
+from server.models.version_reliability import VersionReliabilityIndex
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def get_reliability_model(request: Request) -> ReliabilityModel:
+    model = getattr(request.app.state, "reliability_model", None)
+    if model is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Reliability models are not loaded",
+        )
+    return model
+
+
+def get_version_reliability_index(request: Request) -> VersionReliabilityIndex:
+    store = getattr(request.app.state, "version_reliability", None)
+    if store is None or store.index is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Version reliabilities are not loaded",
+        )
+    return store.index
+
+
+def check_features(
+    model: ReliabilityModel,
+    features: Mapping[str, Any],
+) -> None:
+    missing = model.missing_features(features)
+    if missing:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Missing features: {', '.join(missing)}",
+        )
+
+
+@router.get(
+    "/features",
+    tags=["reliability"],
+    response_model=ReliabilityFeatures,
+)
+def get_reliability_features(
+    model: ReliabilityModel = Depends(get_reliability_model),
+) -> ReliabilityFeatures:
+    return ReliabilityFeatures(
+        attributes=list(model.attributes.values()),
+        feature_columns=model.feature_columns,
+    )
+
+
+@router.post(
+    "/version",
+    tags=["reliability"],
+    response_model=VersionReliability,
+)
+def get_version_reliability(
+    version: VersionFeatures,
+    model: ReliabilityModel = Depends(get_reliability_model),
+) -> VersionReliability:
+    check_features(model, version.features)
+    matrix = model.feature_matrix(
+        {col: [value] for col, value in version.features.items()},
+    )
+    probabilities = model.predict(matrix)
+
+    return VersionReliability(
+        comp_data_id_version=version.comp_data_id_version,
+        reliability={att: float(p[0]) for att, p in probabilities.items()},
+    )
+
+
+@router.post(
+    "/versions",
+    tags=["reliability"],
+    response_model=VersionBatchReliability,
+)
+def get_versions_reliability(
+    batch: VersionBatchFeatures,
+    model: ReliabilityModel = Depends(get_reliability_model),
+) -> VersionBatchReliability:
+    check_features(model, batch.features)
+    n_versions = len(batch.comp_data_id_version)
+    for col in model.feature_columns:
+        if len(batch.features[col]) != n_versions:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Feature {col} does not have {n_versions} values",
+            )
+
+    probabilities = model.predict(model.feature_matrix(batch.features))
+
+    return VersionBatchReliability(
+        comp_data_id_version=batch.comp_data_id_version,
+        reliability={att: p.tolist() for att, p in probabilities.items()},
+    )
+
+
+@router.get(
+    "/versions/{comp_data_id_version}",
+    tags=["reliability"],
+    response_model=StoredVersionReliability,
+)
+def get_stored_version_reliability(
+    comp_data_id_version: int,
+    index: VersionReliabilityIndex = Depends(get_version_reliability_index),
+) -> StoredVersionReliability:
+    found = index.version(comp_data_id_version)
+    if found is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Version {comp_data_id_version} not found",
+        )
+
+    comp_data_id_master, reliability = found
+    return StoredVersionReliability(
+        comp_data_id_version=comp_data_id_version,
+        comp_data_id_master=comp_data_id_master,
+        reliability=reliability,
+    )
+
+
+@router.get(
+    "/masters/{comp_data_id_master}",
+    tags=["reliability"],
+    response_model=MasterReliability,
+)
+def get_master_reliability(
+    comp_data_id_master: int,
+    index: VersionReliabilityIndex = Depends(get_version_reliability_index),
+) -> MasterReliability:
+    found = index.master(comp_data_id_master)
+    if found is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Master {comp_data_id_master} not found",
+        )
+
+    comp_data_id_version, reliability = found
+    return MasterReliability(
+        comp_data_id_master=comp_data_id_master,
+        comp_data_id_version=comp_data_id_version,
+        reliability=reliability,
+    )
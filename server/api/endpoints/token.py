@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from random import random
 import time
@@ -12,6 +13,10 @@ from server.api.schemas.token import (
     TokenResponse,
 )
 from server.config.settings import settings
+from server.data.circuit_breaker import CircuitBreaker
+from server.data.http import cs_http_instance
+from server.data.token_cache import TokenCache
+from server.metrics import observe_upstream
 
 router = APIRouter()
 
@@ -19,32 +24,98 @@ logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2ClientCredentials(tokenUrl="token")
 
+auth_circuit = CircuitBreaker(
+    "cs_auth",
+    failure_threshold=settings.CS_AUTH_CIRCUIT_FAILURES,
+    reset_timeout=settings.CS_AUTH_CIRCUIT_RESET,
+)
+
+
+def _retryable(response: httpx.Response) -> bool:
+    # client errors other than rate limiting will not go away
+    return (
+        response.status_code >= 500
+        or response.status_code == httpx.codes.TOO_MANY_REQUESTS
+    )
 
-def retrieve_token(
+
+async def _post_token(
+    url: str,
     headers: Dict[str, str],
     data: Dict[str, str],
-) -> TokenResponse:
-    url = f"{settings.CS_AUTH_URL}/api/oauth2/token"
-
+) -> httpx.Response:
     token_attempt_count = 1
 
-    response = httpx.post(url=url, headers=headers, data=data)
-
-    while not response.status_code == httpx.codes.OK:
-        if token_attempt_count <= settings.MAX_TOKEN_ATTEMPTS:
-            time.sleep(pow(2, token_attempt_count) * random())
-            response = httpx.post(url=url, data=data)
-            token_attempt_count += 1
+    while True:
+        attempts_left = token_attempt_count <= settings.MAX_TOKEN_ATTEMPTS
+        start = time.perf_counter()
+        try:
+            response = await cs_http_instance.client.post(
+                url=url,
+                headers=headers,
+                data=data,
+                timeout=settings.CS_AUTH_TIMEOUT,
+            )
+        except httpx.TransportError as e:
+            observe_upstream("cs_auth", start, "error")
+            if not attempts_left:
+                raise HTTPException(status_code=503, detail=repr(e))
         else:
-            raise HTTPException(status_code=400, detail=response.text)
+            observe_upstream("cs_auth", start, str(response.status_code))
+            if not (attempts_left and _retryable(response)):
+                return response
+
+        await asyncio.sleep(pow(2, token_attempt_count) * random())
+        token_attempt_count += 1
+
+
+async def retrieve_token(
+    headers: Dict[str, str],
+    data: Dict[str, str],
+) -> TokenResponse:
+    """
+    Request a token from the CompStak auth service, retrying server errors
+    with backoff until `CS_AUTH_DEADLINE` runs out. Calls fail fast with 503
+    while the auth circuit is open.
+    """
+    if not auth_circuit.allow():
+        raise HTTPException(
+            status_code=503,
+            detail="CompStak auth service unavailable",
+        )
+
+    url = f"{settings.CS_AUTH_URL}/api/oauth2/token"
+    try:
+        response = await asyncio.wait_for(
+            _post_token(url, headers, data),
+            timeout=settings.CS_AUTH_DEADLINE,
+        )
+    except asyncio.TimeoutError:
+        auth_circuit.record_failure()
+        raise HTTPException(
+            status_code=504,
+            detail="CompStak auth service timed out",
+        )
+    except HTTPException:
+        auth_circuit.record_failure()
+        raise
+
+    # server errors and rate limiting that outlasted the retries
+    if _retryable(response):
+        auth_circuit.record_failure()
+    else:
+        auth_circuit.record_success()
+
+    if not response.status_code == httpx.codes.OK:
+        raise HTTPException(status_code=400, detail=response.text)
 
     token: TokenResponse = response.json()
 
     return token
 
 
-def get_cs_auth_headers() -> Dict[str, str]:
-    token: TokenResponse = retrieve_token(
+async def fetch_cs_token() -> TokenResponse:
+    return await retrieve_token(
         headers={
             "accept": "application/json",
             "cache-control": "no-cache",
@@ -58,6 +129,18 @@ def get_cs_auth_headers() -> Dict[str, str]:
         },
     )
 
+
+cs_token_cache = TokenCache(
+    fetch_cs_token,
+    refresh_margin=settings.CS_TOKEN_REFRESH_MARGIN,
+    path=settings.CS_TOKEN_CACHE_FILE,
+    name="cs_token",
+)
+
+
+async def get_cs_auth_headers() -> Dict[str, str]:
+    token: TokenResponse = await cs_token_cache.get()
+
     token_type = token["token_type"]
     access_token = token["access_token"]
 
@@ -65,7 +148,7 @@ def get_cs_auth_headers() -> Dict[str, str]:
 
 
 @router.post("/token", tags=["token"], response_model=TokenResponse)
-def cs_login(
+async def cs_login(
     request: Request,
     form_data: OAuth2ClientCredentialsRequestForm = Depends(),
 ) -> TokenResponse:
@@ -89,10 +172,10 @@ def cs_login(
 
     if auth_header:
         headers["authorization"] = auth_header
-        return retrieve_token(headers, data)
+        return await retrieve_token(headers, data)
     elif client_id and client_secret:
         data["client_id"] = client_id
         data["client_secret"] = client_secret
-        return retrieve_token(headers, data)
+        return await retrieve_token(headers, data)
     else:
         raise HTTPException(status_code=400, detail="Incorrect credential")
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from server.api.endpoints import exchange
+from server.api.endpoints import exchange, reliability
 
 api_router: APIRouter = APIRouter()
 api_router.include_router(
@@ -8,3 +8,8 @@ api_router.include_router(
     prefix="/exchange",
     tags=["exchange"],
 )
+api_router.include_router(
+    reliability.router,
+    prefix="/reliability",
+    tags=["reliability"],
+)
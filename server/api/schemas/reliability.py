@@ -0,0 +1,48 @@
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+
+class ReliabilityFeatures(BaseModel):
+    attributes: List[str]
+    feature_columns: List[str]
+
+
+class VersionFeatures(BaseModel):
+    comp_data_id_version: int
+    features: Dict[str, float]
+
+
+class VersionReliability(BaseModel):
+    comp_data_id_version: int
+    reliability: Dict[str, float]
+
+
+class StoredVersionReliability(VersionReliability):
+    comp_data_id_master: int
+
+
+class VersionBatchFeatures(BaseModel):
+    """
+    Columnar batch: one list per feature column, aligned with
+    `comp_data_id_version`.
+    """
+
+    comp_data_id_version: List[int]
+    features: Dict[str, List[float]]
+
+
+class VersionBatchReliability(BaseModel):
+    comp_data_id_version: List[int]
+    reliability: Dict[str, List[float]]
+
+
+class MasterReliability(BaseModel):
+    """
+    Stored reliabilities of every version of a master, columnar and ordered
+    by `comp_data_id_version`.
+    """
+
+    comp_data_id_master: int
+    comp_data_id_version: List[int]
+    reliability: Dict[str, List[float]]
@@ -1,3 +1,6 @@
+import asyncio
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette_exporter import PrometheusMiddleware, handle_metrics
@@ -8,6 +11,9 @@ from server.api.endpoints import healthcheck, token
 from server.api.router import api_router
 from server.config.settings import settings
 from server.data.database import cs_mysql_instance
+from server.data.http import cs_http_instance
+from server.models.reliability import ReliabilityModel
+from server.models.version_reliability import VersionReliabilityStore
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -37,12 +43,39 @@ async def startup() -> None:
     app.state.db = cs_mysql_instance
     logger.info("CompStak MySQL database connected")
 
+    await cs_http_instance.connect()
+    app.state.http = cs_http_instance
+
+    model_path = os.path.join(
+        settings.MODEL_DIR,
+        settings.RELIABILITY_ARTIFACT,
+    )
+    if os.path.exists(model_path):
+        app.state.reliability_model = ReliabilityModel.load(model_path)
+        logger.info("Reliability models loaded", path=model_path)
+    else:
+        app.state.reliability_model = None
+        logger.warning("Reliability models not found", path=model_path)
+
+    store = VersionReliabilityStore(
+        os.path.join(settings.DATA_DIR, settings.VERSION_RELIABILITY_FILE),
+    )
+    if not store.reload():
+        logger.warning("Version reliabilities not found", path=store.path)
+    app.state.version_reliability = store
+    app.state.version_reliability_watch = asyncio.create_task(
+        store.watch(settings.VERSION_RELIABILITY_RELOAD_SECONDS),
+    )
+
 
 @app.on_event("shutdown")
 async def shutdown() -> None:
+    app.state.version_reliability_watch.cancel()
     await cs_mysql_instance.disconnect()
     logger.info("CompStak MySQL database disconnected")
 
+    await cs_http_instance.disconnect()
+
 
 if __name__ == "__main__":
     uvicorn.run(
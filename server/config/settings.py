@@ -12,6 +12,9 @@ class Settings(BaseSettings):
     DATA_RAW_DIR: str = "data/raw/"
     DATA_DIR: str = "data/processed/"
     MODEL_DIR: str = "models/"
+    RELIABILITY_ARTIFACT: str = "reliability"
+    VERSION_RELIABILITY_FILE: str = "version_reliability.csv"
+    VERSION_RELIABILITY_RELOAD_SECONDS: float = 60.0
 
     MYSQL_HOST: str
     MYSQL_USER: str
@@ -25,7 +28,19 @@ class Settings(BaseSettings):
     CS_CLIENT_ID: str
     CS_CLIENT_SECRET: str
     CS_SCOPE: str
+    CS_HTTP_TIMEOUT: float = 10.0
+    CS_HTTP_MAX_CONNECTIONS: int = 100
+    CS_HTTP_MAX_KEEPALIVE: int = 20
+    EXCHANGE_ATTRIBUTES_TTL: float = 300.0
+    EXCHANGE_ATTRIBUTES_STALE_TTL: float = 3600.0
     MAX_TOKEN_ATTEMPTS: int = 5
+    CS_AUTH_TIMEOUT: float = 5.0
+    CS_AUTH_DEADLINE: float = 15.0
+    CS_AUTH_CIRCUIT_FAILURES: int = 5
+    CS_AUTH_CIRCUIT_RESET: float = 30.0
+    CS_TOKEN_REFRESH_MARGIN: float = 60.0
+    # shared by the workers of one host when set
+    CS_TOKEN_CACHE_FILE: Optional[str] = None
 
     AWS_ROLE_ARN: Optional[str] = None
     AWS_WEB_IDENTITY_TOKEN_FILE: Optional[str] = None
@@ -0,0 +1,72 @@
+import time
+from typing import Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for an upstream service.
+
+    After `failure_threshold` failed calls in a row the circuit opens and
+    `allow` rejects calls for `reset_timeout` seconds. Then a single probe
+    call is let through (half open): success closes the circuit, failure
+    opens it again. A probe that never reports back is replaced after
+    another `reset_timeout`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        now = time.monotonic()
+        if state == "half_open" and (
+            self._probe_started is None
+            or now - self._probe_started >= self.reset_timeout
+        ):
+            self._probe_started = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info("Circuit closed", circuit=self.name)
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        probing = self._probe_started is not None
+        if probing or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(
+                    "Circuit opened",
+                    circuit=self.name,
+                    failures=self.failures,
+                )
+            self.opened_at = time.monotonic()
+        self._probe_started = None
@@ -0,0 +1,40 @@
+from typing import Optional
+
+import httpx
+
+from server.config.settings import settings
+
+
+class CompstakServicesHTTP:
+    """
+    One connection pool shared by the calls to the CompStak services
+    (auth, exchange, comp processing), so requests reuse TCP and TLS
+    connections. Opened and closed with the app; used before `connect`
+    (e.g. in scripts driving the app without its lifespan) it opens itself.
+    """
+
+    def __init__(self) -> None:
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=settings.CS_HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.CS_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.CS_HTTP_MAX_KEEPALIVE,
+                ),
+            )
+        return self._client
+
+    async def connect(self) -> None:
+        self.client
+
+    async def disconnect(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+cs_http_instance = CompstakServicesHTTP()
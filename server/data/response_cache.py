@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import re
+import time
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
+
+import httpx
+import structlog
+
+from server.metrics import CACHE_REQUESTS
+
+logger = structlog.get_logger()
+
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class CachedResponse(NamedTuple):
+    content: bytes
+    media_type: str
+    etag: str
+    last_modified: Optional[str]
+    fetched_at: float
+    max_age: float
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+class ResponseCache:
+    """
+    In-memory cache of one upstream GET.
+
+    A response is fresh for the upstream `Cache-Control: max-age`, or `ttl`
+    without one. A stale response is still served for `stale_ttl` more
+    seconds while a background request revalidates it with the stored
+    `ETag` / `Last-Modified`; after that callers wait for the upstream.
+    Revalidations are single-flight and a failed background revalidation
+    keeps the stale response.
+
+    `request` sends the GET with the given validator headers. Lookups are
+    counted under the cache `name`.
+    """
+
+    def __init__(
+        self,
+        request: Callable[[Dict[str, str]], Awaitable[httpx.Response]],
+        ttl: float,
+        stale_ttl: float,
+        name: str = "response",
+    ) -> None:
+        self.request = request
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.cached: Optional[CachedResponse] = None
+        self._revalidating: Optional[asyncio.Future] = None
+
+    def _max_age(self, response: httpx.Response) -> float:
+        match = MAX_AGE.search(response.headers.get("cache-control", ""))
+        return float(match.group(1)) if match else self.ttl
+
+    async def _revalidate(self) -> CachedResponse:
+        cached = self.cached
+        validators = {}
+        if cached is not None:
+            validators["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                validators["If-Modified-Since"] = cached.last_modified
+
+        response = await self.request(validators)
+        if cached is not None and response.status_code == 304:
+            self.cached = cached._replace(
+                fetched_at=time.monotonic(),
+                max_age=self._max_age(response),
+            )
+            return self.cached
+
+        response.raise_for_status()
+        content = response.content
+        etag = response.headers.get("etag")
+        if etag is None:
+            etag = f'"{hashlib.sha1(content).hexdigest()}"'
+        self.cached = CachedResponse(
+            content=content,
+            media_type=response.headers.get(
+                "content-type",
+                "application/json",
+            ),
+            etag=etag,
+            last_modified=response.headers.get("last-modified"),
+            fetched_at=time.monotonic(),
+            max_age=self._max_age(response),
+        )
+        logger.info(
+            "Upstream response cached",
+            bytes=len(content),
+            max_age=self.cached.max_age,
+        )
+        return self.cached
+
+    def _revalidate_done(self, revalidating: asyncio.Future) -> None:
+        self._revalidating = None
+        if revalidating.cancelled():
+            return
+        error = revalidating.exception()
+        if error is not None:
+            logger.warning("Upstream revalidation failed", error=repr(error))
+
+    def _start_revalidation(self) -> asyncio.Future:
+        if self._revalidating is None:
+            self._revalidating = asyncio.ensure_future(self._revalidate())
+            self._revalidating.add_done_callback(self._revalidate_done)
+        return self._revalidating
+
+    async def get(self) -> CachedResponse:
+        cached = self.cached
+        if cached is not None:
+            if cached.age < cached.max_age:
+                CACHE_REQUESTS.labels(self.name, "hit").inc()
+                return cached
+            if cached.age < cached.max_age + self.stale_ttl:
+                CACHE_REQUESTS.labels(self.name, "stale").inc()
+                self._start_revalidation()
+                return cached
+
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        return await asyncio.shield(self._start_revalidation())
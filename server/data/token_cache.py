@@ -0,0 +1,133 @@
+import asyncio
+from contextlib import asynccontextmanager
+import fcntl
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+import structlog
+
+from server.metrics import CACHE_REQUESTS
+
+logger = structlog.get_logger()
+
+Token = Dict[str, Any]
+
+
+class TokenCache:
+    """
+    Process-wide cache of an OAuth token, reused until `refresh_margin`
+    seconds (at most half of its lifetime) before it expires.
+
+    Refreshes are single-flight: callers that find the token expired all
+    await the same refresh, and share its token or its error. With `path`
+    set the token is also shared between worker processes through that
+    file, and an exclusive lock on `<path>.lock` makes one worker refresh
+    for all. Lookups are counted under the cache `name`.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[Token]],
+        refresh_margin: float = 60.0,
+        path: Optional[str] = None,
+        name: str = "token",
+    ) -> None:
+        self.fetch = fetch
+        self.name = name
+        self.refresh_margin = refresh_margin
+        self.path = path
+        self._refreshing: Optional[asyncio.Future] = None
+        # {"token": ..., "expires_at": ...}, replaced as a whole
+        self._entry: Optional[Dict[str, Any]] = None
+
+    def _fresh(self, entry: Optional[Dict[str, Any]]) -> bool:
+        if entry is None or entry["token"] is None:
+            return False
+        # a token that lives no longer than the margin is still reused for
+        # half of its lifetime
+        margin = min(self.refresh_margin, entry["token"]["expires_in"] / 2)
+        return time.time() < entry["expires_at"] - margin
+
+    def _read_shared(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_shared(self, entry: Dict[str, Any]) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self.path)
+
+    async def _refresh(self) -> Dict[str, Any]:
+        token = await self.fetch()
+        logger.info("CompStak token refreshed", expires_in=token["expires_in"])
+        return {"token": token, "expires_at": time.time() + token["expires_in"]}
+
+    @asynccontextmanager
+    async def _shared_lock(self) -> AsyncIterator[None]:
+        # closing the file releases the lock, even if waiting is cancelled
+        with open(f"{self.path}.lock", "a") as lock:
+            await asyncio.to_thread(fcntl.flock, lock.fileno(), fcntl.LOCK_EX)
+            yield
+
+    async def _refresh_shared(self) -> Dict[str, Any]:
+        async with self._shared_lock():
+            entry = self._read_shared()
+            if not self._fresh(entry):
+                entry = await self._refresh()
+                self._write_shared(entry)
+            return entry
+
+    async def _update(self) -> Dict[str, Any]:
+        if self.path:
+            self._entry = await self._refresh_shared()
+        else:
+            self._entry = await self._refresh()
+        return self._entry
+
+    def _refresh_done(self, refreshing: asyncio.Future) -> None:
+        self._refreshing = None
+        # the error was already raised to the callers, if any are left
+        if not refreshing.cancelled():
+            refreshing.exception()
+
+    async def get(self) -> Token:
+        entry = self._entry
+        if self._fresh(entry):
+            CACHE_REQUESTS.labels(self.name, "hit").inc()
+            return entry["token"]
+
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._update())
+            self._refreshing.add_done_callback(self._refresh_done)
+        # a caller that gives up does not cancel the refresh for the others
+        entry = await asyncio.shield(self._refreshing)
+        return entry["token"]
+
+    @staticmethod
+    def _holds(entry: Optional[Dict[str, Any]], access_token: str) -> bool:
+        return (
+            entry is not None
+            and entry["token"] is not None
+            and entry["token"]["access_token"] == access_token
+        )
+
+    async def invalidate(self, access_token: str) -> None:
+        """
+        Drop `access_token` after the upstream rejected it. A token that was
+        already replaced by a newer one is left alone.
+        """
+        if self._holds(self._entry, access_token):
+            self._entry = None
+        if not self.path:
+            return
+        async with self._shared_lock():
+            if self._holds(self._read_shared(), access_token):
+                self._write_shared({"token": None, "expires_at": 0.0})
@@ -0,0 +1,72 @@
+"""
+Prometheus metrics of model serving and of the calls to CompStak services,
+served on `/metrics` next to the request metrics of `PrometheusMiddleware`.
+"""
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# seconds, from one row scored in-process to a slow upstream call
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+INFERENCE_SECONDS = Histogram(
+    "reliability_inference_seconds",
+    "Time to score a request by stage: feature matrix assembly (features) "
+    "or evaluation of all attribute models (model)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+BATCH_ROWS = Histogram(
+    "reliability_batch_rows",
+    "Versions scored per request",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+
+LOAD_SECONDS = Gauge(
+    "reliability_load_seconds",
+    "Time of the last load of the reliability models or of the stored "
+    "version reliabilities",
+    ["source"],
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result: hit, stale (served while "
+    "revalidating) or miss",
+    ["cache", "result"],
+)
+
+UPSTREAM_SECONDS = Histogram(
+    "upstream_request_seconds",
+    "Latency of calls to CompStak services by service and response status, "
+    "error when no response was received",
+    ["service", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def observe_upstream(service: str, start: float, status: str) -> None:
+    """
+    Record a call to `service` started at `time.perf_counter()` `start`.
+    """
+    UPSTREAM_SECONDS.labels(service, status).observe(
+        time.perf_counter() - start,
+    )
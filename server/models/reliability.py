@@ -0,0 +1,57 @@
+from typing import Any, Dict, List, Mapping, Sequence
+
+import numpy as np
+
+from server.metrics import BATCH_ROWS, INFERENCE_SECONDS, LOAD_SECONDS
+from train.model.artifact import ModelArtifact, load_model_artifact
+
+
+class ReliabilityModel:
+    """
+    Per-attribute reliability models trained by
+    `train.model.model.train_multioutput_classifiers`, read from the
+    memory-mapped model artifact.
+    """
+
+    def __init__(self, artifact: ModelArtifact) -> None:
+        self.artifact = artifact
+        self.feature_columns: List[str] = list(artifact.feature_columns)
+        self.attributes = {
+            label: label[: -len("_label")] for label in artifact.labels
+        }
+
+    @classmethod
+    def load(cls, path: str) -> "ReliabilityModel":
+        with LOAD_SECONDS.labels("reliability_model").time():
+            return cls(load_model_artifact(path))
+
+    def missing_features(self, features: Mapping[str, Any]) -> List[str]:
+        return [col for col in self.feature_columns if col not in features]
+
+    def feature_matrix(
+        self,
+        features: Mapping[str, Sequence[float]],
+    ) -> np.ndarray:
+        """
+        Columnar features, keyed by feature column, as a row-major float32
+        matrix in training column order.
+        """
+        with INFERENCE_SECONDS.labels("features").time():
+            return np.column_stack(
+                [
+                    np.asarray(features[col], dtype="float32")
+                    for col in self.feature_columns
+                ],
+            )
+
+    def predict(self, matrix: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Probability that each attribute of each row is reliable.
+        """
+        BATCH_ROWS.observe(len(matrix))
+        with INFERENCE_SECONDS.labels("model").time():
+            probabilities = self.artifact.predict_proba_all(matrix)
+        return {
+            attribute: probabilities[label]
+            for label, attribute in self.attributes.items()
+        }
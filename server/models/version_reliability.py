@@ -0,0 +1,166 @@
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import structlog
+
+from server.metrics import LOAD_SECONDS
+
+logger = structlog.get_logger()
+
+PROB_SUFFIX = "_prob"
+
+
+class VersionReliabilityIndex:
+    """
+    Precomputed version reliabilities exported by training
+    (`version_reliability.csv`), held as a float32 probability matrix with
+    sorted id arrays so lookups are binary searches:
+
+    - `version_ids` is sorted and row i of `probabilities` belongs to it
+    - `master_ids` is sorted and the versions of master j are rows
+      `master_rows[master_offsets[j]:master_offsets[j + 1]]`
+    """
+
+    def __init__(
+        self,
+        version_ids: np.ndarray,
+        master_ids: np.ndarray,
+        probabilities: np.ndarray,
+        attributes: List[str],
+    ) -> None:
+        order = np.argsort(version_ids, kind="stable")
+        self.version_ids = version_ids[order]
+        self.probabilities = np.ascontiguousarray(probabilities[order])
+        self.attributes = attributes
+
+        version_masters = master_ids[order]
+        self.master_rows = np.argsort(version_masters, kind="stable")
+        sorted_masters = version_masters[self.master_rows]
+        starts = np.flatnonzero(
+            np.r_[True, sorted_masters[1:] != sorted_masters[:-1]],
+        )
+        self.master_ids = sorted_masters[starts]
+        self.master_offsets = np.r_[starts, len(sorted_masters)]
+        self.version_masters = version_masters
+
+    @classmethod
+    def read_csv(cls, path: str) -> "VersionReliabilityIndex":
+        header = pd.read_csv(path, nrows=0).columns
+        attributes = [
+            col[: -len(PROB_SUFFIX)]
+            for col in header
+            if col.endswith(PROB_SUFFIX)
+        ]
+        prob_cols = [f"{att}{PROB_SUFFIX}" for att in attributes]
+        df = pd.read_csv(
+            path,
+            usecols=["comp_data_id_version", "comp_data_id_master"] + prob_cols,
+            dtype={col: "float32" for col in prob_cols},
+        )
+        return cls(
+            df["comp_data_id_version"].to_numpy(dtype="int64"),
+            df["comp_data_id_master"].to_numpy(dtype="int64"),
+            df[prob_cols].to_numpy(dtype="float32"),
+            attributes,
+        )
+
+    def __len__(self) -> int:
+        return len(self.version_ids)
+
+    def _reliability(self, rows: np.ndarray) -> Dict[str, List[float]]:
+        values = self.probabilities[rows].T.tolist()
+        return dict(zip(self.attributes, values))
+
+    def version(
+        self,
+        comp_data_id_version: int,
+    ) -> Optional[Tuple[int, Dict[str, float]]]:
+        """
+        Master id and attribute probabilities of a version, None if the
+        version is not in the export.
+        """
+        row = np.searchsorted(self.version_ids, comp_data_id_version)
+        if (
+            row == len(self.version_ids)
+            or self.version_ids[row] != comp_data_id_version
+        ):
+            return None
+        probabilities = self.probabilities[row].tolist()
+        return (
+            int(self.version_masters[row]),
+            dict(zip(self.attributes, probabilities)),
+        )
+
+    def master(
+        self,
+        comp_data_id_master: int,
+    ) -> Optional[Tuple[List[int], Dict[str, List[float]]]]:
+        """
+        Version ids of a master and their attribute probabilities, columnar
+        and ordered by version id. None if the master is not in the export.
+        """
+        j = np.searchsorted(self.master_ids, comp_data_id_master)
+        if (
+            j == len(self.master_ids)
+            or self.master_ids[j] != comp_data_id_master
+        ):
+            return None
+        rows = self.master_rows[
+            self.master_offsets[j] : self.master_offsets[j + 1]
+        ]
+        return self.version_ids[rows].tolist(), self._reliability(rows)
+
+
+class VersionReliabilityStore:
+    """
+    Holds the current index of the export at `path` and swaps in a fresh
+    one when the file changes. Training replaces the export atomically, so
+    a changed modification time always means a complete file; requests
+    keep using the previous index until the new one is built.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.index: Optional[VersionReliabilityIndex] = None
+        self._stat: Optional[Tuple[int, int]] = None
+
+    def _file_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self) -> bool:
+        """
+        Rebuild the index if the export changed since the last load.
+        """
+        stat = self._file_stat()
+        if stat is None or stat == self._stat:
+            return False
+
+        with LOAD_SECONDS.labels("version_reliability").time():
+            index = VersionReliabilityIndex.read_csv(self.path)
+        self.index, self._stat = index, stat
+        logger.info(
+            "Version reliabilities loaded",
+            path=self.path,
+            versions=len(index),
+            masters=len(index.master_ids),
+        )
+        return True
+
+    async def watch(self, interval: float) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.reload)
+            except Exception:
+                logger.exception(
+                    "Version reliability reload failed",
+                    path=self.path,
+                )
@@ -0,0 +1,331 @@
+"""
+Scores comp versions as they are submitted. Versions are labeled against
+their master, counted in the submitter and logo tables, each table updated
+by an agent reading versions partitioned by its key, and scored in batches
+from the updated counters.
+"""
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import faust
+import structlog
+
+from stream.common.logging import initialize_logging
+from stream.config.settings import settings
+from stream.features.features import (
+    add_counts,
+    count_increments,
+    entity_key,
+    label_version,
+    load_counted_versions,
+    load_entity_counts,
+    version_features,
+)
+from train.model.artifact import artifact_hash, load_model_artifact
+
+logger = structlog.get_logger()
+initialize_logging(settings.ENV)
+
+app = faust.App(
+    settings.STREAM_APP_ID,
+    broker=settings.STREAM_BROKER,
+    store=settings.STREAM_STORE,
+    topic_partitions=settings.STREAM_PARTITIONS,
+    processing_guarantee=settings.STREAM_PROCESSING_GUARANTEE,
+)
+
+
+class VersionEvent(faust.Record, serializer="json"):
+    """
+    A scorable comp version, with the attribute values of the version and
+    of its master by attribute name.
+    """
+
+    comp_version_id: int
+    comp_data_id_version: int
+    comp_data_id_master: int
+    submitter_person_id: int
+    logo: Optional[str]
+    version: Dict[str, Any]
+    master: Dict[str, Any]
+
+
+class CountedVersion(faust.Record, serializer="json"):
+    """
+    A labeled version on its way through the entity tables: the increments
+    of its submitter and logo counters, and the counters once updated.
+    """
+
+    comp_version_id: int
+    comp_data_id_version: int
+    comp_data_id_master: int
+    submitter_person_id: int
+    logo: Optional[str]
+    increments: Dict[str, Dict[str, int]]
+    counts: Dict[str, int]
+
+
+class VersionReliability(faust.Record, serializer="json", isodates=True):
+    comp_version_id: int
+    comp_data_id_version: int
+    comp_data_id_master: int
+    reliability: Dict[str, float]
+    model_hash: str
+    training_data_hash: Optional[str]
+    scored_at: datetime
+
+
+class EntitySeed(faust.Record, serializer="json"):
+    """
+    The counters of an entity in the training aggregates, or the id of a
+    version they count.
+    """
+
+    counts: Optional[Dict[str, int]] = None
+    comp_version_id: Optional[int] = None
+
+
+version_topic = app.topic(settings.VERSION_TOPIC, value_type=VersionEvent)
+reliability_topic = app.topic(
+    settings.RELIABILITY_TOPIC,
+    key_type=str,
+    value_type=VersionReliability,
+)
+# versions repartitioned by the key of the table they update next
+submitter_topic = app.topic(
+    f"{settings.STREAM_APP_ID}-versions-by-submitter",
+    key_type=str,
+    value_type=CountedVersion,
+    internal=True,
+)
+logo_topic = app.topic(
+    f"{settings.STREAM_APP_ID}-versions-by-logo",
+    key_type=str,
+    value_type=CountedVersion,
+    internal=True,
+)
+score_topic = app.topic(
+    f"{settings.STREAM_APP_ID}-versions-to-score",
+    key_type=str,
+    value_type=CountedVersion,
+    internal=True,
+)
+
+# correct, total and filled counters per entity, backed by changelog topics
+entity_tables = {
+    "submitter_person_id": app.Table(
+        "submitter-counts",
+        default=dict,
+        key_type=str,
+        partitions=settings.STREAM_PARTITIONS,
+    ),
+    "logo": app.Table(
+        "logo-counts",
+        default=dict,
+        key_type=str,
+        partitions=settings.STREAM_PARTITIONS,
+    ),
+}
+# versions in the counters of each table by comp_version_id, so that a
+# redelivered version, or one the seeded aggregates count, is counted once.
+# Markers are written while handling versions of the entity's partition,
+# where the version comes back when redelivered.
+counted_versions = {
+    name: app.Table(
+        f"{table.name}-versions",
+        default=bool,
+        key_type=str,
+        partitions=settings.STREAM_PARTITIONS,
+    )
+    for name, table in entity_tables.items()
+}
+# training aggregates loaded into the tables by the `seed` command
+seed_topics = {
+    name: app.topic(
+        f"{settings.STREAM_APP_ID}-{table.name}-seed",
+        key_type=str,
+        value_type=EntitySeed,
+        internal=True,
+    )
+    for name, table in entity_tables.items()
+}
+
+
+@lru_cache()
+def get_model():
+    """
+    Model artifact, its hash and the attributes it scores.
+    """
+    artifact = load_model_artifact(settings.MODEL_ARTIFACT)
+    attributes = {label: label[: -len("_label")] for label in artifact.labels}
+    return artifact, artifact_hash(settings.MODEL_ARTIFACT), attributes
+
+
+def count_entity(version, name):
+    """
+    Add the increments of `version` to its counters in the `name` table,
+    unless the counters already have it, and pass the counters on with it.
+    """
+    key = entity_key(getattr(version, name))
+    if key is None:
+        return version
+    table = entity_tables[name]
+    counted = counted_versions[name]
+    version_key = entity_key(version.comp_version_id)
+    if version_key not in counted:
+        table[key] = add_counts(table[key], version.increments[name])
+        counted[version_key] = True
+    version.counts = {**version.counts, **table[key]}
+    return version
+
+
+def seed_entity(name, key, seed):
+    if seed.counts is not None:
+        entity_tables[name][key] = seed.counts
+    if seed.comp_version_id is not None:
+        counted_versions[name][entity_key(seed.comp_version_id)] = True
+
+
+@app.agent(version_topic)
+async def label_versions(versions):
+    """
+    Label versions and send them on by submitter.
+    """
+    _, _, attributes = get_model()
+    async for batch in versions.take(
+        settings.STREAM_BATCH_SIZE,
+        within=settings.STREAM_BATCH_SECONDS,
+    ):
+        labels = [
+            label_version(event.version, event.master, attributes.values())
+            for event in batch
+        ]
+        increments = count_increments(labels, attributes.values())
+        for event, increment in zip(batch, increments):
+            version = CountedVersion(
+                comp_version_id=event.comp_version_id,
+                comp_data_id_version=event.comp_data_id_version,
+                comp_data_id_master=event.comp_data_id_master,
+                submitter_person_id=event.submitter_person_id,
+                logo=event.logo,
+                increments=increment,
+                counts={},
+            )
+            await submitter_topic.send(
+                key=entity_key(event.submitter_person_id),
+                value=version,
+            )
+            yield version
+
+
+# table updates are made one event at a time so that every change goes to
+# the changelog partition of the event it came from. Agents yield what they
+# send on, which their test context collects.
+@app.agent(submitter_topic)
+async def count_submitters(versions):
+    async for version in versions:
+        version = count_entity(version, "submitter_person_id")
+        await logo_topic.send(key=entity_key(version.logo), value=version)
+        yield version
+
+
+@app.agent(logo_topic)
+async def count_logos(versions):
+    async for version in versions:
+        version = count_entity(version, "logo")
+        await score_topic.send(
+            key=entity_key(version.comp_data_id_version),
+            value=version,
+        )
+        yield version
+
+
+@app.agent(score_topic)
+async def score_versions(versions):
+    """
+    Score versions in batches and publish their reliability.
+    """
+    artifact, model_hash, attributes = get_model()
+    training_data = artifact.manifest["training_data_hash"]
+    async for batch in versions.take(
+        settings.STREAM_BATCH_SIZE,
+        within=settings.STREAM_BATCH_SECONDS,
+    ):
+        df = version_features(
+            [version.counts for version in batch],
+            list(attributes.values()),
+        )
+        probabilities = artifact.predict_proba_all(
+            df[artifact.feature_columns],
+            deduplicate=True,
+        )
+        scored_at = datetime.now(timezone.utc)
+        reliability = zip(
+            *[probabilities[label].tolist() for label in attributes],
+        )
+        for version, values in zip(batch, reliability):
+            result = VersionReliability(
+                comp_version_id=version.comp_version_id,
+                comp_data_id_version=version.comp_data_id_version,
+                comp_data_id_master=version.comp_data_id_master,
+                reliability=dict(zip(attributes.values(), values)),
+                model_hash=model_hash,
+                training_data_hash=training_data,
+                scored_at=scored_at,
+            )
+            await reliability_topic.send(
+                key=entity_key(version.comp_data_id_version),
+                value=result,
+            )
+            yield result
+
+
+@app.agent(seed_topics["submitter_person_id"])
+async def seed_submitters(seeds):
+    async for key, seed in seeds.items():
+        seed_entity("submitter_person_id", key, seed)
+        yield key
+
+
+@app.agent(seed_topics["logo"])
+async def seed_logos(seeds):
+    async for key, seed in seeds.items():
+        seed_entity("logo", key, seed)
+        yield key
+
+
+@app.command()
+async def seed():
+    """
+    Replace the counters of the tables with the entity aggregates exported
+    by the last training run, and mark the versions they count as counted.
+    """
+    for name, topic in seed_topics.items():
+        n_entities = 0
+        for key, counts in load_entity_counts(
+            settings.ENTITY_FEATURES_DIR,
+            name,
+        ):
+            await topic.send(key=key, value=EntitySeed(counts=counts))
+            n_entities += 1
+        n_versions = 0
+        for key, comp_version_id in load_counted_versions(
+            settings.ENTITY_FEATURES_DIR,
+            name,
+        ):
+            await topic.send(
+                key=key,
+                value=EntitySeed(comp_version_id=comp_version_id),
+            )
+            n_versions += 1
+        logger.info(
+            "Seeded entity counters",
+            entity=name,
+            count=n_entities,
+            versions=n_versions,
+        )
+
+
+if __name__ == "__main__":
+    app.main()
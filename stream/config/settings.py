@@ -0,0 +1,40 @@
+from functools import lru_cache
+
+from pydantic import BaseSettings
+
+
+class Settings(BaseSettings):
+    ENV: str = "local"
+
+    STREAM_APP_ID: str = "lease-version-reliability"
+    STREAM_BROKER: str = "kafka://localhost:9092"
+    # table state is rebuilt from the changelog topics when the store is
+    # memory://, kept on local disk with rocksdb://
+    STREAM_STORE: str = "memory://"
+    STREAM_PARTITIONS: int = 8
+    # with exactly_once, the table updates of an event are committed with
+    # its offset, so a crash between two of them cannot count it twice
+    STREAM_PROCESSING_GUARANTEE: str = "at_least_once"
+    # comp versions consumed and version reliabilities published
+    VERSION_TOPIC: str = "comp-versions"
+    RELIABILITY_TOPIC: str = "comp-version-reliability"
+    # versions scored at once, waiting at most this long for a full batch
+    STREAM_BATCH_SIZE: int = 100
+    STREAM_BATCH_SECONDS: float = 1.0
+
+    # outputs of the training job
+    MODEL_ARTIFACT: str = "models/reliability"
+    ENTITY_FEATURES_DIR: str = "data/processed/entity_features"
+
+    class Config:
+        case_sensitive = True
+        env_file = ".env"
+        env_file_encoding = "utf-8"
+
+
+@lru_cache()
+def get_settings() -> Settings:
+    return Settings()
+
+
+settings = get_settings()
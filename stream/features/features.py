@@ -0,0 +1,105 @@
+import os
+
+import pandas as pd
+
+from train.data.labels import attribute_to_label_dict
+from train.features.features import entity_indicators, get_rate_features
+
+ENTITIES = ["submitter_person_id", "logo"]
+
+
+def entity_key(value):
+    """
+    Table and topic key of a submitter or logo, None for a missing logo.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    return str(int(value))
+
+
+def label_version(version, master, attributes):
+    """
+    Filled flag and label of every attribute of a version against its
+    master, by the row-wise rules of training.
+    """
+    labels = {}
+    for att in attributes:
+        value = version.get(att)
+        labels[f"{att}_filled"] = int(pd.notnull(value))
+        labels[f"{att}_label"] = attribute_to_label_dict[att](
+            value,
+            master.get(att),
+        )
+    return labels
+
+
+def count_increments(labels, attributes):
+    """
+    Increments of the correct, total and filled counters of each entity
+    for every labeled version, the indicators `get_features_by_entity`
+    sums in training.
+    """
+    df = pd.DataFrame.from_records(labels)
+    label = [f"{att}_label" for att in attributes]
+    filled = [f"{att}_filled" for att in attributes]
+    increments = {
+        name: pd.DataFrame(entity_indicators(df, name, label, filled))
+        .astype("int64")
+        .to_dict("records")
+        for name in ENTITIES
+    }
+    return [dict(zip(ENTITIES, values)) for values in zip(*increments.values())]
+
+
+def add_counts(counts, increments):
+    return {
+        col: counts.get(col, 0) + value for col, value in increments.items()
+    }
+
+
+def count_columns(attributes):
+    return [
+        f"{att}_{kind}_{name}"
+        for name in ENTITIES
+        for att in attributes
+        for kind in ["correct", "total", "filled"]
+    ]
+
+
+def version_features(counts, attributes):
+    """
+    Rate features of versions from the counters of their submitter and
+    logo. Versions without a logo get zero logo counts, as in training.
+    """
+    df = pd.DataFrame.from_records(counts).reindex(
+        columns=count_columns(attributes),
+    )
+    return get_rate_features(df.fillna(0), attributes)
+
+
+def load_entity_counts(directory, name):
+    """
+    `(key, counters)` of every entity in the aggregates exported by the
+    training job.
+    """
+    df = pd.read_parquet(os.path.join(directory, f"{name}.parquet"))
+    df = df.dropna(subset=[name])
+    keys = [entity_key(value) for value in df[name].tolist()]
+    counts = df.drop(columns=name).astype("int64").to_dict("records")
+    return zip(keys, counts)
+
+
+def load_counted_versions(directory, name):
+    """
+    `(key, comp_version_id)` of every version counted in the aggregates of
+    the `name` entities exported by the training job.
+    """
+    df = pd.read_parquet(
+        os.path.join(directory, "counted_versions.parquet"),
+        columns=["id", name],
+    )
+    df = df.dropna(subset=[name])
+    keys = [entity_key(value) for value in df[name].tolist()]
+    return zip(keys, df["id"].astype("int64").tolist())
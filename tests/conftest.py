@@ -0,0 +1,99 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+# connection settings the config modules require, the tests never connect
+for name in [
+    "MYSQL_HOST",
+    "MYSQL_USER",
+    "MYSQL_PASS",
+    "MYSQL_PORT",
+    "MYSQL_DB",
+    "MONGO_HOST",
+    "MONGO_DB",
+    "SNOWFLAKE_USERNAME",
+    "SNOWFLAKE_PRIVATE_KEY_DECRYPTED",
+    "SNOWFLAKE_ACCOUNT",
+    "CS_AUTH_URL",
+    "CS_COMP_PROCESSING_URL",
+    "CS_EXCHANGE_URL",
+    "CS_CLIENT_ID",
+    "CS_CLIENT_SECRET",
+    "CS_SCOPE",
+    "MODELS_S3_BUCKET",
+]:
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("ENV", "test")
+# no extract snapshot written into the working tree
+os.environ.setdefault("VERSION_DATA_SNAPSHOT", "")
+
+
+@pytest.fixture(scope="session")
+def scoring_model(tmp_path_factory):
+    """
+    Model artifact and entity aggregates of a small training run over a
+    synthetic stand-in, for the batch and stream scorers and the API
+    server, with the version data the stand-in was loaded with and the
+    fitted models with their feature frame.
+    """
+    # imported once the settings above are in the environment
+    from tests.standin import connect_standin, load_standin
+    from train.data.dataset import (
+        get_batch_logos,
+        get_version_data,
+        split_version_data,
+    )
+    from train.data.output_data import export_entity_features
+    from train.data.synthetic import synthetic_version_data
+    from train.features.features import feature_engineering, get_entity_features
+    from train.model.artifact import save_model_artifact, training_data_hash
+    from train.model.model import (
+        get_column_names,
+        get_split_columns,
+        train_multioutput_classifiers,
+    )
+
+    attributes = ["tenant_name", "transaction_size", "lease_term"]
+    correct, filled, label = get_column_names(attributes)
+    directory = tmp_path_factory.mktemp("scoring_model")
+    data = synthetic_version_data(2000, seed=3)
+
+    connection = connect_standin()
+    load_standin(connection, data)
+    reliable, all_data = split_version_data(
+        get_version_data(connection, None, attributes=attributes),
+    )
+    df = feature_engineering(reliable, label, filled, correct, attributes)
+    entity_features = get_entity_features(all_data, label, filled)
+    export_entity_features(
+        entity_features,
+        get_batch_logos(connection),
+        str(directory / "entity_features"),
+        all_data[["id", "submitter_person_id", "logo"]],
+    )
+    connection.close()
+
+    x_cols, y_cols = get_split_columns(df.columns)
+    model_dict = train_multioutput_classifiers(
+        df,
+        x_cols,
+        y_cols,
+        backend="random_forest",
+        model_jobs=1,
+        tree_jobs=1,
+    )
+    save_model_artifact(
+        model_dict,
+        x_cols,
+        str(directory / "reliability"),
+        training_data_hash(df, x_cols + y_cols),
+    )
+    return SimpleNamespace(
+        artifact=str(directory / "reliability"),
+        entity_features=str(directory / "entity_features"),
+        attributes=attributes,
+        data=data,
+        model_dict=model_dict,
+        features=df[x_cols],
+    )
@@ -0,0 +1,322 @@
+"""
+Local SQLite stand-in for the Snowflake tables read by the dataset layer,
+so extracts can be exercised offline, and in-memory stand-ins of the MySQL
+and Mongo clients of the batch job over the same tables.
+"""
+import os
+import sqlite3
+
+import pandas as pd
+
+SCHEMAS = ["mysql_compstak", "analytics"]
+
+TABLES = {
+    "mysql_compstak.comp_version": [
+        "id",
+        "submitter_person_id",
+        "comp_data_id",
+    ],
+    "mysql_compstak.comp_data": [
+        "id",
+        "tenant_id",
+        "transaction_size",
+        "starting_rent",
+        "execution_date",
+        "commencement_date",
+        "lease_term",
+        "expiration_date",
+        "work_value",
+        "free_months",
+        "transaction_type_id",
+        "rent_bumps_percent_bumps",
+        "rent_bumps_dollar_bumps",
+        "lease_type_id",
+    ],
+    "mysql_compstak.comp_data_calculated_fields": [
+        "comp_data_id",
+        "space_type_id",
+    ],
+    "mysql_compstak.comp_master": ["id", "comp_data_id"],
+    "mysql_compstak.comp_master_versions": [
+        "comp_master_id",
+        "comp_version_id",
+    ],
+    "mysql_compstak.comp_proposal": ["comp_version_id", "comp_batch_id"],
+    "mysql_compstak.tenant": ["id", "name"],
+    "mysql_compstak.person": ["id", "first_name", "last_name"],
+    "analytics.lease_tasks": ["batch_id", "submission_id"],
+    "analytics.submissions": ["id"],
+    "analytics.logo_detection_submission": ["id", "logo"],
+}
+
+
+# join keys of the version extract
+INDEXES = {
+    "mysql_compstak.comp_version": ["id"],
+    "mysql_compstak.comp_data": ["id"],
+    "mysql_compstak.comp_data_calculated_fields": ["comp_data_id"],
+    "mysql_compstak.comp_master": ["id"],
+    "mysql_compstak.comp_master_versions": [
+        "comp_version_id",
+        "comp_master_id",
+    ],
+    "mysql_compstak.comp_proposal": ["comp_version_id"],
+    "mysql_compstak.tenant": ["id"],
+    "analytics.lease_tasks": ["batch_id"],
+    "analytics.submissions": ["id"],
+    "analytics.logo_detection_submission": ["id"],
+}
+
+
+def _concat(*values):
+    return "".join("" if v is None else str(v) for v in values)
+
+
+def connect_standin(directory=None):
+    """
+    Open a SQLite connection with the Snowflake schemas attached, either in
+    memory or as one database file per schema under `directory`.
+    """
+    connection = sqlite3.connect(":memory:")
+    connection.create_function("CONCAT", -1, _concat)
+    for schema in SCHEMAS:
+        path = (
+            ":memory:"
+            if directory is None
+            else os.path.join(directory, f"{schema}.db")
+        )
+        connection.execute(f"ATTACH DATABASE '{path}' AS {schema}")
+
+    for table, columns in TABLES.items():
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(columns)})",
+        )
+    for table, columns in INDEXES.items():
+        schema, name = table.split(".")
+        for column in columns:
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {schema}.{name}_{column} "
+                f"ON {name} ({column})",
+            )
+    return connection
+
+
+def _sql_values(df):
+    # sqlite has no date type, dates are stored as ISO strings
+    df = df.astype(object).where(pd.notnull(df), None)
+    return [
+        tuple(
+            v if v is None or isinstance(v, (int, float, str)) else str(v)
+            for v in row
+        )
+        for row in df.itertuples(index=False, name=None)
+    ]
+
+
+def _replace_table(connection, table, df):
+    columns = TABLES[table]
+    connection.execute(f"DELETE FROM {table}")
+    connection.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})",
+        _sql_values(df[columns]),
+    )
+
+
+def load_standin(connection, version_data, people=None):
+    """
+    Replace the stand-in tables with the rows of a frame in the extract
+    schema (`get_version_data` columns, the version count is recomputed by
+    the query). `people` holds `id`, `first_name` and `last_name`.
+    """
+    attributes = [
+        col[: -len("_version")]
+        for col in version_data.columns
+        if col.endswith("_version") and not col.startswith("comp_data_id")
+    ]
+    data_columns = [
+        att for att in attributes if att not in ("tenant_name", "space_type_id")
+    ]
+
+    tenant_names = pd.concat(
+        [
+            version_data["tenant_name_version"],
+            version_data["tenant_name_master"],
+        ],
+    ).dropna()
+    tenants = pd.DataFrame({"name": tenant_names.unique()})
+    tenants["id"] = tenants.index + 1
+    tenant_ids = dict(zip(tenants["name"], tenants["id"]))
+
+    comp_data = []
+    for side in ["version", "master"]:
+        side_data = version_data[
+            [f"comp_data_id_{side}"] + [f"{att}_{side}" for att in attributes]
+        ]
+        side_data.columns = ["id"] + attributes
+        comp_data.append(side_data)
+    comp_data = pd.concat(comp_data).drop_duplicates(subset="id")
+    comp_data["tenant_id"] = comp_data["tenant_name"].map(tenant_ids)
+
+    versions = version_data.drop_duplicates(subset="id")
+    logos = versions[pd.notnull(versions["logo"])]
+
+    tables = {
+        "mysql_compstak.comp_version": versions.rename(
+            columns={"comp_data_id_version": "comp_data_id"},
+        ),
+        "mysql_compstak.comp_data": comp_data[
+            ["id", "tenant_id"] + data_columns
+        ],
+        "mysql_compstak.comp_data_calculated_fields": comp_data.rename(
+            columns={"id": "comp_data_id"},
+        ),
+        "mysql_compstak.comp_master": version_data[
+            ["comp_master_id", "comp_data_id_master"]
+        ]
+        .drop_duplicates(subset="comp_master_id")
+        .set_axis(["id", "comp_data_id"], axis=1),
+        "mysql_compstak.comp_master_versions": versions[
+            ["comp_master_id", "id"]
+        ].set_axis(["comp_master_id", "comp_version_id"], axis=1),
+        "mysql_compstak.comp_proposal": logos.assign(
+            comp_version_id=logos["id"],
+            comp_batch_id=logos["id"],
+        ),
+        "mysql_compstak.tenant": tenants,
+        "analytics.lease_tasks": logos.assign(
+            batch_id=logos["id"],
+            submission_id=logos["id"],
+        ),
+        "analytics.submissions": logos,
+        "analytics.logo_detection_submission": logos,
+    }
+    if people is not None:
+        tables["mysql_compstak.person"] = people
+
+    for table, df in tables.items():
+        _replace_table(connection, table, df)
+    connection.commit()
+
+
+class StandinMySQL:
+    """
+    `fetch_all` of a `databases.Database` over a stand-in connection, whose
+    attached schemas resolve the unqualified MySQL table names.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    async def fetch_all(self, query, values=None):
+        return self.connection.execute(query, values or {}).fetchall()
+
+
+def _matches(document, query):
+    for key, value in query.items():
+        if isinstance(value, dict) and "$in" in value:
+            if document.get(key) not in value["$in"]:
+                return False
+        elif document.get(key) != value:
+            return False
+    return True
+
+
+def _project(document, projection):
+    if projection is None:
+        return dict(document)
+    return {
+        key: value
+        for key, value in document.items()
+        if key == "_id" or projection.get(key)
+    }
+
+
+class _Cursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for document in self.documents:
+            yield document
+
+
+class BulkWriteResult:
+    def __init__(self, upserted_count, matched_count):
+        self.upserted_count = upserted_count
+        self.matched_count = matched_count
+
+
+class MemoryCollection:
+    """
+    The Motor collection methods used by the batch job, over a dict of
+    documents by `_id`. With `fail_after` set, the bulk write after that
+    many raises once its documents are stored, like a job killed between a
+    write and its checkpoint.
+    """
+
+    def __init__(self, fail_after=None):
+        self.documents = {}
+        self.writes = 0
+        self.fail_after = fail_after
+
+    async def create_index(self, keys):
+        return "_".join(f"{key}_{order}" for key, order in keys)
+
+    async def find_one(self, query, sort=None, projection=None):
+        documents = [
+            doc for doc in self.documents.values() if _matches(doc, query)
+        ]
+        for key, order in reversed(sort or []):
+            documents.sort(key=lambda doc: doc[key], reverse=order < 0)
+        if not documents:
+            return None
+        return _project(documents[0], projection)
+
+    def find(self, query, projection=None):
+        return _Cursor(
+            [
+                _project(doc, projection)
+                for doc in self.documents.values()
+                if _matches(doc, query)
+            ],
+        )
+
+    async def update_one(self, query, update, upsert=False):
+        document = self.documents.get(query["_id"])
+        if document is None and not upsert:
+            return
+        self.documents[query["_id"]] = {
+            **(document or query),
+            **update["$set"],
+        }
+
+    async def bulk_write(self, operations, ordered=True):
+        upserted = matched = 0
+        for operation in operations:
+            key = operation._filter["_id"]
+            if key in self.documents:
+                matched += 1
+            else:
+                upserted += 1
+            self.documents[key] = {"_id": key, **operation._doc["$set"]}
+        self.writes += 1
+        if self.fail_after is not None and self.writes > self.fail_after:
+            self.fail_after = None
+            raise ConnectionError("killed after the write")
+        return BulkWriteResult(upserted, matched)
+
+
+class MemoryMongo:
+    """
+    Mongo database of `MemoryCollection`s by name.
+    """
+
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, MemoryCollection())
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from train.model.artifact import load_model_artifact, save_model_artifact
+from train.model.model import make_classifier
+
+X_COLS = ["a_count", "b_rate"]
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.random((300, 2)), columns=X_COLS)
+    y = (X["a_count"] + X["b_rate"] > 1).astype("int8")
+    return X, y
+
+
+def fit(backends, X, y):
+    return {
+        f"{backend}_label": make_classifier(backend, tree_jobs=1).fit(X, y)
+        for backend in backends
+    }
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_artifact_round_trip(tmp_path, data, mmap):
+    X, y = data
+    model_dict = fit(["random_forest", "hist_gradient_boosting"], X, y)
+    path = str(tmp_path / "reliability")
+    save_model_artifact(model_dict, X_COLS, path, data_hash="abc")
+
+    artifact = load_model_artifact(path, mmap=mmap)
+    assert isinstance(artifact.nodes, np.memmap) == mmap
+    assert artifact.manifest["feature_columns"] == X_COLS
+    assert artifact.manifest["training_data_hash"] == "abc"
+    assert artifact.manifest["models"]["random_forest_label"]["kind"] == (
+        "forest"
+    )
+    assert artifact.manifest["models"]["hist_gradient_boosting_label"] == {
+        "kind": "joblib",
+        "file": "hist_gradient_boosting_label.joblib",
+    }
+    probabilities = artifact.predict_proba_all(X)
+    for label, clf in model_dict.items():
+        np.testing.assert_array_equal(
+            probabilities[label],
+            clf.predict_proba(X)[:, 1],
+        )
+
+
+def test_resave_leaves_mapped_artifact_intact(tmp_path, data):
+    X, y = data
+    path = str(tmp_path / "reliability")
+    save_model_artifact(
+        fit(["random_forest", "hist_gradient_boosting"], X, y),
+        X_COLS,
+        path,
+    )
+    mapped = load_model_artifact(path)
+    before = mapped.predict_proba_all(X)
+
+    save_model_artifact(fit(["random_forest"], X, 1 - y), X_COLS, path)
+
+    assert sorted(os.listdir(tmp_path)) == ["reliability"]
+    assert sorted(os.listdir(path)) == [
+        "manifest.json",
+        "nodes.npy",
+        "roots.npy",
+        "value.npy",
+    ]
+    after = mapped.predict_proba_all(X)
+    for label, proba in before.items():
+        np.testing.assert_array_equal(after[label], proba)
+    reloaded = load_model_artifact(path).predict_proba_all(X)
+    np.testing.assert_allclose(
+        reloaded["random_forest_label"],
+        1 - before["random_forest_label"],
+    )
@@ -0,0 +1,128 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from batch.config.settings import settings
+from batch.data.versions import iter_version_pages
+from batch.main import run_scoring
+from tests.standin import (
+    MemoryCollection,
+    MemoryMongo,
+    StandinMySQL,
+    connect_standin,
+    load_standin,
+)
+
+
+@pytest.fixture
+def connection(scoring_model):
+    connection = connect_standin()
+    load_standin(connection, scoring_model.data)
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def versions(scoring_model):
+    return scoring_model.data.drop_duplicates(subset="id").set_index("id")
+
+
+@pytest.fixture
+def scoring_settings(monkeypatch, scoring_model):
+    for name, value in {
+        "MODEL_ARTIFACT": scoring_model.artifact,
+        "ENTITY_FEATURES_DIR": scoring_model.entity_features,
+        "SCORING_PAGE_SIZE": 300,
+        "SCORING_CHECKPOINT_FILE": None,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+
+async def collect(pages):
+    return [(cursor, page) async for cursor, page in pages]
+
+
+def test_version_pages_cover_every_version_once(connection, versions):
+    pages = asyncio.run(
+        collect(iter_version_pages(StandinMySQL(connection), 0, 300)),
+    )
+    df = pd.concat([page for _, page in pages]).set_index("comp_version_id")
+
+    assert df.index.tolist() == sorted(versions.index)
+    assert [cursor for cursor, _ in pages] == [
+        int(page["comp_version_id"].iloc[-1]) for _, page in pages
+    ]
+    pd.testing.assert_series_equal(
+        df["comp_data_id_master"],
+        versions["comp_data_id_master"],
+        check_names=False,
+        check_index_type=False,
+        check_dtype=False,
+    )
+
+
+def test_rescore_all_picks_up_moved_versions(
+    monkeypatch,
+    connection,
+    versions,
+    scoring_settings,
+):
+    database = StandinMySQL(connection)
+    mongodb = MemoryMongo()
+    documents = mongodb[settings.RELIABILITY_COLLECTION].documents
+    asyncio.run(run_scoring(database, mongodb))
+    assert set(documents) == set(versions["comp_data_id_version"])
+
+    # a version moved to another master keeps its id
+    moved = versions.index[10]
+    master_id, comp_data_id = connection.execute(
+        "SELECT id, comp_data_id FROM comp_master WHERE id != ? LIMIT 1",
+        (int(versions.loc[moved, "comp_master_id"]),),
+    ).fetchone()
+    connection.execute(
+        "UPDATE comp_master_versions SET comp_master_id = ? "
+        "WHERE comp_version_id = ?",
+        (master_id, int(moved)),
+    )
+    connection.commit()
+    document = documents[int(versions.loc[moved, "comp_data_id_version"])]
+
+    stats = asyncio.run(run_scoring(database, mongodb))
+    assert stats["read"] == 0
+    assert document["comp_data_id_master"] != comp_data_id
+
+    monkeypatch.setattr(settings, "SCORING_RESCORE_ALL", True)
+    stats = asyncio.run(run_scoring(database, mongodb))
+    assert stats["written"] == len(documents)
+    document = documents[int(versions.loc[moved, "comp_data_id_version"])]
+    assert document["comp_data_id_master"] == comp_data_id
+
+
+@pytest.mark.parametrize("n_scorers", [1, 2])
+def test_restart_after_kill_scores_every_version_once(
+    monkeypatch,
+    connection,
+    versions,
+    scoring_settings,
+    n_scorers,
+):
+    monkeypatch.setattr(settings, "SCORING_JOBS", n_scorers)
+    database = StandinMySQL(connection)
+    mongodb = MemoryMongo()
+    collection = MemoryCollection(fail_after=3)
+    mongodb.collections[settings.RELIABILITY_COLLECTION] = collection
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(run_scoring(database, mongodb))
+    killed = dict(collection.documents)
+    assert 0 < len(killed) < len(versions)
+
+    # pages written past the checkpoint come back empty and are not
+    # rescored
+    asyncio.run(run_scoring(database, mongodb))
+    assert set(collection.documents) == set(versions["comp_data_id_version"])
+    assert all(
+        collection.documents[key]["scored_at"] == document["scored_at"]
+        for key, document in killed.items()
+    )
@@ -0,0 +1,121 @@
+import os
+
+import pandas as pd
+import pytest
+
+from tests.standin import connect_standin, load_standin
+from train.data.dataset import (
+    CHANGED_MASTERS_FILTER,
+    get_version_data,
+    read_version_data,
+    snapshot_expired,
+)
+from train.data.synthetic import ATTRIBUTES, synthetic_version_data
+
+
+def by_id(df):
+    return df.sort_values("id").reset_index(drop=True)
+
+
+@pytest.fixture
+def connection():
+    connection = connect_standin()
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def data():
+    return synthetic_version_data(2000, seed=2)
+
+
+def test_incremental_extract_matches_full_extract(tmp_path, connection, data):
+    snapshot_path = os.path.join(tmp_path, "version_data.parquet")
+    load_standin(connection, data[data["id"] <= 1500])
+    get_version_data(connection, snapshot_path, attributes=ATTRIBUTES)
+
+    # new versions, some of them for masters already in the snapshot, and
+    # a master moved to new comp data
+    changed = data.copy()
+    edited = changed["comp_master_id"] == 3
+    changed.loc[edited, "comp_data_id_master"] = (
+        changed["comp_data_id_version"].max() + 1
+    )
+    changed.loc[edited, "lease_term_master"] = 999.0
+    load_standin(connection, changed)
+
+    incremental = get_version_data(
+        connection,
+        snapshot_path,
+        attributes=ATTRIBUTES,
+    )
+    full = get_version_data(connection, None, attributes=ATTRIBUTES)
+
+    assert len(full) == len(data)
+    pd.testing.assert_frame_equal(
+        by_id(incremental),
+        by_id(full),
+        check_dtype=False,
+        check_categorical=False,
+    )
+
+
+def test_refresh_picks_up_changes_in_place(tmp_path, connection, data):
+    snapshot_path = os.path.join(tmp_path, "version_data.parquet")
+    load_standin(connection, data)
+    get_version_data(connection, snapshot_path)
+
+    # a logo detected late and a deleted version leave the watermarks as
+    # they are
+    changed = data[data["id"] != 10].copy()
+    late = changed["id"] == 20
+    changed.loc[late, "logo"] = "logo_late"
+    load_standin(connection, changed)
+
+    incremental = get_version_data(connection, snapshot_path)
+    assert (incremental["id"] == 10).any()
+    assert "logo_late" not in set(incremental["logo"].dropna())
+
+    refreshed = get_version_data(connection, snapshot_path, refresh=True)
+    assert not (refreshed["id"] == 10).any()
+    assert refreshed.loc[refreshed["id"] == 20, "logo"].tolist() == [
+        "logo_late",
+    ]
+
+
+def test_snapshot_expires_with_its_last_full_extract(tmp_path, connection):
+    snapshot_path = os.path.join(tmp_path, "version_data.parquet")
+    assert snapshot_expired(snapshot_path, max_age_days=7)
+
+    load_standin(connection, synthetic_version_data(200, seed=3))
+    get_version_data(connection, snapshot_path)
+    assert not snapshot_expired(snapshot_path, max_age_days=7)
+    assert not snapshot_expired(snapshot_path, max_age_days=None)
+    assert snapshot_expired(snapshot_path, max_age_days=0)
+
+    # incremental runs keep the time of the last full extract
+    get_version_data(connection, snapshot_path)
+    assert snapshot_expired(snapshot_path, max_age_days=0)
+    assert not snapshot_expired(snapshot_path, max_age_days=7)
+
+
+def test_empty_extract_runs_the_query_once(connection, data):
+    load_standin(connection, data)
+    full = read_version_data(connection, "", 500, ATTRIBUTES)
+
+    statements = []
+    connection.set_trace_callback(statements.append)
+    empty = read_version_data(
+        connection,
+        CHANGED_MASTERS_FILTER.format(
+            version_watermark=int(data["id"].max()),
+            master_watermark=int(data["comp_data_id_version"].max()),
+        ),
+        500,
+        ATTRIBUTES,
+    )
+    connection.set_trace_callback(None)
+
+    assert empty.empty
+    assert list(empty.columns) == list(full.columns)
+    assert sum("FROM" in statement for statement in statements) == 1
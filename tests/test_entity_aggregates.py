@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.standin import connect_standin, load_standin
+from train.data.dataset import get_version_data, split_version_data
+from train.data.entity_aggregates import (
+    ENTITIES,
+    get_entity_features_pushdown,
+    label_sql,
+)
+from train.data.synthetic import ATTRIBUTES, synthetic_version_data
+from train.features.features import get_entity_features
+from train.model.model import get_column_names
+
+
+@pytest.fixture
+def connection():
+    connection = connect_standin()
+    yield connection
+    connection.close()
+
+
+def with_boundary_versions(data):
+    """
+    Versions with masters of their own on the ends of the date window, also
+    with a time of day, and of the tolerance bands, and tenant names only
+    Jaro-Winkler matches.
+    """
+    extra = data.iloc[:10].copy()
+    n = len(extra)
+    comp_data_id = data[["comp_data_id_version", "comp_data_id_master"]]
+    extra["id"] = data["id"].max() + 1 + np.arange(n)
+    extra["comp_master_id"] = data["comp_master_id"].max() + 1 + np.arange(n)
+    extra["comp_data_id_version"] = comp_data_id.max().max() + 1 + np.arange(n)
+    extra["comp_data_id_master"] = extra["comp_data_id_version"] + n
+    extra["master_version_count"] = 1
+    extra["execution_date_version"] = [
+        "2012-03-31",
+        "2012-04-01",
+        "2011-10-03",
+        "2011-10-02",
+        "2012-01-01",
+        None,
+        "2012-03-31 12:00:00",
+        "2012-03-31 06:00:00",
+        "2011-10-03 12:00:00",
+        "2011-10-02 18:00:00",
+    ]
+    extra["execution_date_master"] = [
+        "2012-01-01",
+        "2012-01-01",
+        "2012-01-01",
+        "2012-01-01",
+        "2012-01-01",
+        "2012-01-01",
+        "2012-01-01",
+        "2012-01-01 06:00:00",
+        "2012-01-01",
+        "2012-01-01 06:00:00",
+    ]
+    extra["transaction_size_version"] = [
+        1050.0,
+        1050.01,
+        950.0,
+        949.99,
+        None,
+        1000.0,
+        1000.0,
+        1049.0,
+        951.0,
+        None,
+    ]
+    extra["transaction_size_master"] = 1000.0
+    extra["lease_term_version"] = [
+        108.0,
+        92.0,
+        91.99,
+        108.01,
+        100.0,
+        None,
+        100.0,
+        93.0,
+        107.0,
+        100.0,
+    ]
+    extra["lease_term_master"] = 100.0
+    extra["tenant_name_version"] = [
+        "Acme Capital",
+        "Acme Capital",
+        None,
+        "Zenith",
+        "Acme",
+        "Acme Capital",
+        "Acme",
+        "Zenith",
+        "Acme Capital",
+        None,
+    ]
+    extra["tenant_name_master"] = [
+        "Acme Capitol",
+        "Zenith Realty",
+        "Acme",
+        None,
+        "acme",
+        "Acme Capital",
+        "Acme",
+        "Zenith",
+        "Acme Capitol",
+        "Acme",
+    ]
+    return pd.concat([data, extra], ignore_index=True)
+
+
+def by_entity(df, name):
+    return (
+        df.sort_values(name)
+        .reset_index(drop=True)
+        .reindex(columns=[name] + sorted(set(df.columns) - {name}))
+    )
+
+
+def test_pushdown_matches_extract_aggregates(connection):
+    load_standin(
+        connection,
+        with_boundary_versions(synthetic_version_data(3000, seed=4)),
+    )
+    _, all_data = split_version_data(
+        get_version_data(connection, None, attributes=ATTRIBUTES),
+    )
+    _, filled, label = get_column_names(ATTRIBUTES)
+    expected = get_entity_features(all_data, label, filled)
+
+    statements = []
+    connection.set_trace_callback(statements.append)
+    pushdown = get_entity_features_pushdown(
+        connection,
+        ATTRIBUTES,
+        dialect="sqlite",
+    )
+    connection.set_trace_callback(None)
+
+    assert len(statements) == 1
+    for name in ENTITIES:
+        pd.testing.assert_frame_equal(
+            by_entity(pushdown[name], name),
+            by_entity(expected[name], name),
+            check_dtype=False,
+            check_categorical=False,
+        )
+
+
+def test_snowflake_date_window_keeps_the_time_of_day():
+    # DATEDIFF(day, ...) would count calendar days instead
+    assert (
+        "WHEN execution_date_version BETWEEN "
+        "DATEADD(day, -90, execution_date_master) AND "
+        "DATEADD(day, 90, execution_date_master) THEN 1"
+    ) in label_sql("execution_date", "snowflake")
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from train.model.inference import compile_models
+from train.model.model import BACKENDS, make_classifier
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_empty_input_scores_no_rows(backend):
+    rng = np.random.default_rng(0)
+    X_cols = ["a_count", "b_rate"]
+    X = pd.DataFrame(rng.random((200, 2)), columns=X_cols)
+    y = (X["a_count"] > 0.5).astype("int8")
+    ensemble = compile_models(
+        {"a_label": make_classifier(backend, tree_jobs=1).fit(X, y)},
+        X_cols,
+    )
+
+    for deduplicate in [False, True]:
+        probabilities = ensemble.predict_proba_all(
+            X.iloc[:0],
+            deduplicate=deduplicate,
+        )
+        assert probabilities["a_label"].shape == (0,)
+
+
+def on_thresholds(X, forests):
+    """
+    Rows of X with one feature moved onto, or next to, a split threshold
+    of the forests, in float64 and float32.
+    """
+    rng = np.random.default_rng(1)
+    rows = []
+    for clf in forests:
+        for tree in clf.estimators_[:5]:
+            split = np.flatnonzero(tree.tree_.children_left != -1)
+            for node in rng.choice(split, size=min(len(split), 20)):
+                feature = tree.tree_.feature[node]
+                threshold = tree.tree_.threshold[node]
+                narrow = np.float64(np.float32(threshold))
+                for value in [
+                    threshold,
+                    np.nextafter(threshold, -np.inf),
+                    np.nextafter(threshold, np.inf),
+                    narrow,
+                    np.float64(np.nextafter(np.float32(narrow), np.inf)),
+                ]:
+                    row = X.iloc[rng.integers(len(X))].copy()
+                    row.iloc[feature] = value
+                    rows.append(row)
+    return pd.DataFrame(rows, columns=X.columns).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("max_depth", [None, 4])
+def test_compiled_forests_match_predict_proba(max_depth):
+    rng = np.random.default_rng(0)
+    X_cols = ["a_count", "b_rate", "c_total"]
+    X = pd.DataFrame(rng.normal(size=(500, 3)), columns=X_cols)
+    X["a_count"] = rng.integers(0, 20, size=len(X))
+    targets = {
+        "a_label": X["a_count"] > 7,
+        "b_label": X["b_rate"] + rng.normal(scale=0.5, size=len(X)) > 0,
+        "c_label": X["c_total"] * X["b_rate"] > 0.1,
+    }
+    model_dict = {
+        label: RandomForestClassifier(
+            n_estimators=20,
+            max_depth=max_depth,
+            random_state=1,
+            n_jobs=1,
+        ).fit(X, y.astype("int8"))
+        for label, y in targets.items()
+    }
+    ensemble = compile_models(model_dict, X_cols)
+
+    X = pd.concat([X, on_thresholds(X, model_dict.values())])
+    probabilities = ensemble.predict_proba_all(X, chunk_size=256)
+    for label, clf in model_dict.items():
+        np.testing.assert_array_equal(
+            probabilities[label],
+            clf.predict_proba(X)[:, 1],
+        )
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from train.data.dataset import get_labels
+from train.data.labels import attribute_to_label_dict
+from train.data.schema import apply_schema
+from train.data.synthetic import ATTRIBUTES, synthetic_version_data
+
+
+def edge_rows(data):
+    """
+    Rows on the boundaries of every rule: nulls on either side, dates
+    outside the pandas timestamp range, the ends of the 90 day window and
+    of the tolerance bands, and categorical values only on one side.
+    """
+    cases = {
+        "execution_date": [
+            ("2012-03-31", "2012-01-01"),
+            ("2012-04-01", "2012-01-01"),
+            ("2011-10-03", "2012-01-01"),
+            ("2011-10-02", "2012-01-01"),
+            ("1500-01-01", "1500-02-01"),
+            ("9999-12-31", "2012-01-01"),
+            (None, "2012-01-01"),
+        ],
+        "expiration_date": [
+            ("2500-03-01", "2500-01-01"),
+            ("2012-01-01", None),
+            (None, None),
+            ("2016-02-29", "2016-05-29"),
+            ("2016-02-29", "2016-05-30"),
+            ("1677-09-20", "1677-09-25"),
+            ("2262-04-12", "2262-01-01"),
+        ],
+        "transaction_size": [
+            (1050.0, 1000.0),
+            (1050.01, 1000.0),
+            (950.0, 1000.0),
+            (949.99, 1000.0),
+            (0.0, 0.0),
+            (np.nan, 1000.0),
+            (1000.0, np.nan),
+        ],
+        "lease_term": [
+            (108.0, 100.0),
+            (108.01, 100.0),
+            (92.0, 100.0),
+            (91.99, 100.0),
+            (60.0, 60.0),
+            (np.nan, np.nan),
+            (-10.0, -10.0),
+        ],
+        "tenant_name": [
+            ("Acme Capital", "Acme Capital"),
+            ("Acme Capital", "Acme Capitol"),
+            ("Acme Capital", "Zenith Realty"),
+            ("Only Version Tenant", None),
+            (None, "Only Master Tenant"),
+            ("", ""),
+            ("Acme", "acme"),
+        ],
+        "space_type_id": [
+            (7.0, 7.0),
+            (7.0, 8.0),
+            (99.0, 7.0),
+            (7.0, 98.0),
+            (np.nan, 7.0),
+            (7.0, np.nan),
+            (np.nan, np.nan),
+        ],
+    }
+    rows = data.iloc[:7].copy()
+    for att, pairs in cases.items():
+        rows[f"{att}_version"] = [subject for subject, _ in pairs]
+        rows[f"{att}_master"] = [target for _, target in pairs]
+    return rows
+
+
+def reference_labels(data, att):
+    return np.array(
+        [
+            attribute_to_label_dict[att](subject, target)
+            for subject, target in zip(
+                data[f"{att}_version"],
+                data[f"{att}_master"],
+            )
+        ],
+    )
+
+
+@pytest.mark.parametrize("schema", [False, True])
+def test_vector_labels_match_row_wise_labels(schema):
+    data = synthetic_version_data(5000, seed=1)
+    data = pd.concat([data, edge_rows(data)], ignore_index=True)
+    if schema:
+        # categorical version/master pairs, as read from the extract
+        data = apply_schema(data)
+
+    labeled = get_labels(data.copy(), ATTRIBUTES)
+
+    for att in ATTRIBUTES:
+        expected = reference_labels(data, att)
+        np.testing.assert_array_equal(
+            labeled[f"{att}_label"].to_numpy(),
+            expected,
+            err_msg=att,
+        )
+        np.testing.assert_array_equal(
+            labeled[f"{att}_filled"].to_numpy(),
+            pd.notnull(data[f"{att}_version"]).astype(int).to_numpy(),
+            err_msg=att,
+        )
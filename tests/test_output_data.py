@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from train.data.output_data import (
+    export_version_reliability,
+    get_version_reliability,
+    iter_version_reliability,
+)
+from train.data.schema import fill_missing
+from train.model.artifact import save_model_artifact
+from train.model.inference import distinct_rows
+
+ATTRIBUTES = ["tenant_name", "lease_term"]
+X_COLS = [
+    "tenant_name_filled_submitter_person_id",
+    "tenant_name_submitter_correct_rate",
+    "lease_term_logo_fill_rate",
+]
+Y_COLS = ["tenant_name_label", "lease_term_label"]
+
+
+@pytest.fixture(scope="module")
+def scored():
+    """
+    Versions of shuffled masters whose features repeat, with the logo
+    features of a quarter of them missing and filled like the pipeline
+    does, and forests fitted on them.
+    """
+    rng = np.random.default_rng(0)
+    n = 600
+    data = pd.DataFrame(
+        {
+            "comp_data_id_version": np.arange(n) + 1000,
+            "comp_data_id_master": rng.integers(0, 80, size=n),
+            "tenant_name_version": rng.choice(["Acme", "Zenith", None], n),
+            "lease_term_version": rng.choice([12.0, 60.0, np.nan], n),
+            X_COLS[0]: rng.integers(0, 4, size=n).astype("float64"),
+            X_COLS[1]: rng.choice([0.0, 0.25, 0.5, 1.0], n),
+            X_COLS[2]: rng.choice([0.1, 0.9], n),
+        },
+    )
+    data.loc[rng.random(n) < 0.25, X_COLS[2]] = np.nan
+    data = fill_missing(data, 0)
+    data = pd.concat([data, data.iloc[::3]], ignore_index=True)
+    data["comp_data_id_version"] = np.arange(len(data)) + 1000
+    X = data[X_COLS]
+    model_dict = {
+        label: RandomForestClassifier(
+            n_estimators=10,
+            random_state=1,
+            n_jobs=1,
+        ).fit(X, rng.integers(0, 2, size=len(X)))
+        for label in Y_COLS
+    }
+    return data, model_dict
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+@pytest.mark.parametrize("chunk_size", [7, 64, 100000])
+def test_export_matches_version_reliability(
+    tmp_path,
+    scored,
+    chunk_size,
+    n_jobs,
+):
+    data, model_dict = scored
+    expected = tmp_path / "expected.csv"
+    get_version_reliability(
+        data,
+        ATTRIBUTES,
+        X_COLS,
+        Y_COLS,
+        model_dict,
+    ).to_csv(expected, index=False)
+    artifact = tmp_path / "reliability"
+    save_model_artifact(model_dict, X_COLS, str(artifact))
+
+    for artifact_path in [None, str(artifact)]:
+        exported = tmp_path / "exported.csv"
+        n_rows = export_version_reliability(
+            data,
+            ATTRIBUTES,
+            X_COLS,
+            Y_COLS,
+            model_dict,
+            str(exported),
+            artifact_path=artifact_path,
+            chunk_size=chunk_size,
+            n_jobs=n_jobs,
+        )
+        assert n_rows == len(data)
+        assert exported.read_bytes() == expected.read_bytes()
+
+
+def test_deduplicated_scoring_matches_every_row(scored):
+    data, model_dict = scored
+    first, _ = distinct_rows(data, X_COLS)
+    assert len(first) < len(data) // 2
+
+    df = pd.concat(
+        iter_version_reliability(
+            data,
+            ATTRIBUTES,
+            X_COLS,
+            Y_COLS,
+            model_dict,
+            chunk_size=50,
+        ),
+    )
+    X = data.loc[df.index, X_COLS]
+    for att, label in zip(ATTRIBUTES, Y_COLS):
+        np.testing.assert_array_equal(
+            df[f"{att}_prob"].to_numpy(),
+            model_dict[label].predict_proba(X)[:, 1],
+        )
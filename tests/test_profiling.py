@@ -0,0 +1,23 @@
+import numpy as np
+
+from train.common.profiling import RunReport, stage
+
+
+def test_stage_reports_its_own_peak_rss_delta():
+    report = RunReport()
+    # memory held by an earlier stage counts in the absolute peak only
+    with stage("bigger", report):
+        held = np.ones(2**25)
+    with stage("idle", report):
+        pass
+    with stage("smaller", report):
+        data = np.ones(2**24)
+
+    bigger = report.stages["bigger"]
+    idle = report.stages["idle"]
+    smaller = report.stages["smaller"]
+    assert bigger["peak_rss_delta_mb"] >= 0.75 * held.nbytes / 2**20
+    assert idle["peak_rss_mb"] >= held.nbytes / 2**20
+    assert idle["peak_rss_delta_mb"] < 0.1 * held.nbytes / 2**20
+    assert smaller["peak_rss_delta_mb"] >= 0.75 * data.nbytes / 2**20
+    assert smaller["peak_rss_delta_mb"] < 0.75 * held.nbytes / 2**20
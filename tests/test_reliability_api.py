@@ -0,0 +1,124 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import numpy as np
+import pandas as pd
+import pytest
+
+from server.api.endpoints import reliability
+from server.models.reliability import ReliabilityModel
+from server.models.version_reliability import VersionReliabilityStore
+
+
+@pytest.fixture
+def client(tmp_path, scoring_model):
+    app = FastAPI()
+    app.include_router(reliability.router, prefix="/reliability")
+    app.state.reliability_model = ReliabilityModel.load(scoring_model.artifact)
+
+    path = str(tmp_path / "version_reliability.csv")
+    pd.DataFrame(
+        {
+            "comp_data_id_version": [12, 11, 13],
+            "comp_data_id_master": [1, 1, 2],
+            "tenant_name_version": ["Acme", "Acme", "Zenith"],
+            "tenant_name_prob": [0.25, 0.5, 0.75],
+            "lease_term_version": [60.0, 12.0, None],
+            "lease_term_prob": [1.0, 0.0, 0.125],
+        },
+    ).to_csv(path, index=False)
+    store = VersionReliabilityStore(path)
+    store.reload()
+    app.state.version_reliability = store
+    return TestClient(app)
+
+
+def batch(features, ids=None):
+    return {
+        "comp_data_id_version": (
+            list(range(len(features))) if ids is None else ids
+        ),
+        "features": {col: features[col].tolist() for col in features},
+    }
+
+
+def test_features(client, scoring_model):
+    response = client.get("/reliability/features")
+
+    assert response.status_code == 200
+    assert sorted(response.json()["attributes"]) == sorted(
+        scoring_model.attributes,
+    )
+    assert response.json()["feature_columns"] == list(
+        scoring_model.features.columns,
+    )
+
+
+def test_versions_match_predict_proba(client, scoring_model):
+    features = scoring_model.features.iloc[:50]
+    response = client.post("/reliability/versions", json=batch(features))
+
+    assert response.status_code == 200
+    assert response.json()["comp_data_id_version"] == list(range(50))
+    reliability = response.json()["reliability"]
+    assert sorted(reliability) == sorted(scoring_model.attributes)
+    for att in scoring_model.attributes:
+        np.testing.assert_array_equal(
+            reliability[att],
+            scoring_model.model_dict[f"{att}_label"].predict_proba(features)[
+                :, 1
+            ],
+        )
+
+    version = client.post(
+        "/reliability/version",
+        json={
+            "comp_data_id_version": 3,
+            "features": features.iloc[3].to_dict(),
+        },
+    )
+    assert version.status_code == 200
+    assert version.json() == {
+        "comp_data_id_version": 3,
+        "reliability": {att: values[3] for att, values in reliability.items()},
+    }
+
+
+def test_versions_reject_mismatched_columns(client, scoring_model):
+    features = scoring_model.features.iloc[:5]
+    body = batch(features)
+    col = features.columns[1]
+    body["features"][col] = body["features"][col][:4]
+
+    response = client.post("/reliability/versions", json=body)
+
+    assert response.status_code == 422
+    assert response.json()["detail"] == f"Feature {col} does not have 5 values"
+
+    del body["features"][col]
+    response = client.post("/reliability/versions", json=body)
+    assert response.status_code == 422
+    assert response.json()["detail"] == f"Missing features: {col}"
+
+
+def test_stored_version_reliability(client):
+    response = client.get("/reliability/versions/12")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "comp_data_id_version": 12,
+        "comp_data_id_master": 1,
+        "reliability": {"tenant_name": 0.25, "lease_term": 1.0},
+    }
+    assert client.get("/reliability/versions/14").status_code == 404
+
+
+def test_stored_master_reliability(client):
+    response = client.get("/reliability/masters/1")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "comp_data_id_master": 1,
+        "comp_data_id_version": [11, 12],
+        "reliability": {"tenant_name": [0.5, 0.25], "lease_term": [0.0, 1.0]},
+    }
+    assert client.get("/reliability/masters/3").status_code == 404
@@ -0,0 +1,96 @@
+import asyncio
+
+import httpx
+
+from server.data.response_cache import ResponseCache
+
+URL = "http://exchange.test/api/allAttrs"
+
+
+class Exchange:
+    """
+    Upstream answering with the next of `responses` (the last one once
+    they run out), recording the headers of every request and holding the
+    responses while `gate` is set and closed.
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.gate = None
+
+    async def __call__(self, request):
+        self.requests.append(request.headers)
+        response = self.responses[
+            min(len(self.requests), len(self.responses)) - 1
+        ]
+        if self.gate is not None:
+            await self.gate.wait()
+        return response
+
+
+async def cached_gets(exchange, n_stale):
+    """
+    A first get filling the cache, `n_stale` concurrent gets served while
+    the upstream holds its response, and a get once it answered.
+    """
+    async with httpx.AsyncClient(
+        transport=httpx.MockTransport(exchange),
+    ) as client:
+
+        async def request(validators):
+            return await client.get(URL, headers=validators)
+
+        cache = ResponseCache(request, ttl=300, stale_ttl=3600)
+        first = await cache.get()
+        exchange.gate = asyncio.Event()
+        stale = await asyncio.gather(*[cache.get() for _ in range(n_stale)])
+        exchange.gate.set()
+        while cache._revalidating is not None:
+            await asyncio.sleep(0.01)
+        return first, stale, await cache.get()
+
+
+def test_stale_hit_revalidates_once_in_the_background():
+    exchange = Exchange(
+        httpx.Response(
+            200,
+            json={"attributes": 1},
+            headers={"ETag": '"v1"', "Cache-Control": "max-age=0"},
+        ),
+        httpx.Response(200, json={"attributes": 2}, headers={"ETag": '"v2"'}),
+    )
+
+    first, stale, refreshed = asyncio.run(cached_gets(exchange, 5))
+
+    assert all(cached is first for cached in stale)
+    assert len(exchange.requests) == 2
+    assert exchange.requests[1]["if-none-match"] == '"v1"'
+    assert refreshed.content == b'{"attributes": 2}'
+    assert refreshed.etag == '"v2"'
+
+
+def test_not_modified_keeps_the_cached_payload():
+    exchange = Exchange(
+        httpx.Response(
+            200,
+            json={"attributes": 1},
+            headers={
+                "ETag": '"v1"',
+                "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT",
+                "Cache-Control": "max-age=0",
+            },
+        ),
+        httpx.Response(304, headers={"Cache-Control": "max-age=60"}),
+    )
+
+    first, _, revalidated = asyncio.run(cached_gets(exchange, 1))
+
+    assert len(exchange.requests) == 2
+    assert exchange.requests[1]["if-modified-since"] == (
+        "Wed, 21 Oct 2015 07:28:00 GMT"
+    )
+    assert revalidated.content == first.content
+    assert revalidated.etag == '"v1"'
+    assert revalidated.max_age == 60
+    assert revalidated.age < revalidated.max_age
@@ -0,0 +1,209 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope="module")
+def stream_app():
+    """
+    The stream app with in-memory tables, its agents driven in-process by
+    their test contexts.
+    """
+    pytest.importorskip("faust")
+    # the app takes the current event loop, which asyncio.run unsets
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    from stream import app
+
+    app.app.finalize()
+    app.app.conf.store = "memory://"
+    app.app.flow_control.resume()
+    yield app
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+@pytest.fixture
+def tables(stream_app):
+    tables = {
+        name: (
+            stream_app.entity_tables[name],
+            stream_app.counted_versions[name],
+        )
+        for name in stream_app.entity_tables
+    }
+    yield tables
+    for counters, counted in tables.values():
+        counters.data.clear()
+        counted.data.clear()
+
+
+@pytest.fixture
+def model(monkeypatch, stream_app, scoring_model):
+    monkeypatch.setattr(
+        stream_app.settings,
+        "MODEL_ARTIFACT",
+        scoring_model.artifact,
+    )
+    stream_app.get_model.cache_clear()
+    yield scoring_model
+    stream_app.get_model.cache_clear()
+
+
+async def run_agent(agent, topic, events):
+    """
+    What `agent` yields for the `(key, value)` pairs of `events`, with the
+    sends to the next `topic` captured.
+    """
+    with patch.object(topic, "send", AsyncMock()):
+        async with agent.test_context() as context:
+            for key, value in events:
+                await context.put(value, key=key, wait=False)
+            while len(context.results) < len(events):
+                await asyncio.sleep(0.01)
+    return [context.results[i] for i in range(len(events))]
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(
+        asyncio.wait_for(coroutine, timeout=60),
+    )
+
+
+def counted_version(stream_app, comp_version_id, submitter, logo=None):
+    return stream_app.CountedVersion(
+        comp_version_id=comp_version_id,
+        comp_data_id_version=comp_version_id + 1000,
+        comp_data_id_master=1,
+        submitter_person_id=submitter,
+        logo=logo,
+        increments={
+            "submitter_person_id": {"lease_term_total_submitter_person_id": 1},
+            "logo": {"lease_term_total_logo": 1},
+        },
+        counts={},
+    )
+
+
+def version_events(stream_app, data, attributes):
+    events = []
+    records = data.astype(object).where(pd.notnull(data), None)
+    for row in records.to_dict("records"):
+        event = stream_app.VersionEvent(
+            comp_version_id=int(row["id"]),
+            comp_data_id_version=int(row["comp_data_id_version"]),
+            comp_data_id_master=int(row["comp_data_id_master"]),
+            submitter_person_id=int(row["submitter_person_id"]),
+            logo=row["logo"],
+            version={att: row[f"{att}_version"] for att in attributes},
+            master={att: row[f"{att}_master"] for att in attributes},
+        )
+        events.append((str(event.comp_version_id), event))
+    return events
+
+
+def test_redelivered_version_is_counted_once(stream_app, tables):
+    version = counted_version(stream_app, 1, 42)
+    counted = run(
+        run_agent(
+            stream_app.count_submitters,
+            stream_app.logo_topic,
+            [("42", version), ("42", version)],
+        ),
+    )
+
+    expected = {"lease_term_total_submitter_person_id": 1}
+    assert tables["submitter_person_id"][0]["42"] == expected
+    assert [version.counts for version in counted] == [expected, expected]
+
+
+def test_seeded_versions_are_not_counted_again(stream_app, tables):
+    seeded = {"lease_term_total_logo": 5}
+    run(
+        run_agent(
+            stream_app.seed_logos,
+            stream_app.logo_topic,
+            [
+                ("acme", stream_app.EntitySeed(counts=seeded)),
+                ("acme", stream_app.EntitySeed(comp_version_id=1)),
+            ],
+        ),
+    )
+    counted = run(
+        run_agent(
+            stream_app.count_logos,
+            stream_app.score_topic,
+            [
+                ("acme", counted_version(stream_app, 1, 42, "acme")),
+                ("acme", counted_version(stream_app, 2, 42, "acme")),
+                (None, counted_version(stream_app, 3, 42)),
+            ],
+        ),
+    )
+
+    assert [version.counts for version in counted] == [
+        {"lease_term_total_logo": 5},
+        {"lease_term_total_logo": 6},
+        {},
+    ]
+
+
+def test_stream_counters_match_training_aggregates(
+    stream_app,
+    tables,
+    model,
+):
+    from stream.features.features import load_entity_counts
+
+    events = version_events(stream_app, model.data, model.attributes)
+    labeled = run(
+        run_agent(
+            stream_app.label_versions,
+            stream_app.submitter_topic,
+            events,
+        ),
+    )
+    by_submitter = [
+        (stream_app.entity_key(version.submitter_person_id), version)
+        for version in labeled
+    ]
+    counted = run(
+        run_agent(
+            stream_app.count_submitters,
+            stream_app.logo_topic,
+            # every version delivered twice
+            by_submitter + by_submitter,
+        ),
+    )
+    counted = run(
+        run_agent(
+            stream_app.count_logos,
+            stream_app.score_topic,
+            [
+                (stream_app.entity_key(version.logo), version)
+                for version in counted
+            ],
+        ),
+    )
+
+    for name, (counters, _) in tables.items():
+        expected = dict(load_entity_counts(model.entity_features, name))
+        assert {key: counters[key] for key in counters} == expected
+
+    reliabilities = run(
+        run_agent(
+            stream_app.score_versions,
+            stream_app.reliability_topic,
+            [(None, version) for version in counted[: len(events)]],
+        ),
+    )
+    assert [r.comp_version_id for r in reliabilities] == [
+        event.comp_version_id for _, event in events
+    ]
+    assert all(
+        set(r.reliability) == set(model.attributes)
+        and all(0 <= value <= 1 for value in r.reliability.values())
+        for r in reliabilities
+    )
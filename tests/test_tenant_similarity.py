@@ -0,0 +1,57 @@
+import os
+
+import pandas as pd
+import pytest
+
+from train.data import tenant_similarity
+from train.data.tenant_similarity import (
+    get_tenant_similarity,
+    initialize_tenant_similarity,
+    save_tenant_similarity,
+)
+
+
+@pytest.fixture
+def scored_pairs(monkeypatch):
+    """
+    Number of pairs scored by every `compute_similarity` call.
+    """
+    calls = []
+    compute = tenant_similarity.compute_similarity
+
+    def counting(subjects, targets, **kwargs):
+        calls.append(len(subjects))
+        return compute(subjects, targets, **kwargs)
+
+    monkeypatch.setattr(tenant_similarity, "compute_similarity", counting)
+    yield calls
+    initialize_tenant_similarity()
+
+
+def test_pairs_are_scored_once_and_saved_once(tmp_path, scored_pairs):
+    path = os.path.join(tmp_path, "tenant_similarity.parquet")
+    initialize_tenant_similarity(path)
+
+    first = get_tenant_similarity(
+        pd.Series(["Acme", "Acme", "Zenith"]),
+        pd.Series(["Acme Inc", "Acme Inc", "Zenith"]),
+    )
+    second = get_tenant_similarity(
+        pd.Series(["Zenith", "Acme", "Atlas"]),
+        pd.Series(["Zenith", "Acme Inc", "Atlas Co"]),
+    )
+    assert first[0] == first[1] == second[1]
+    assert scored_pairs == [2, 1]
+    # nothing is written until the end of the run
+    assert not os.path.exists(path)
+
+    save_tenant_similarity()
+    assert len(pd.read_parquet(path)) == 3
+
+    # a later run reads the pairs back instead of scoring them
+    initialize_tenant_similarity(path)
+    get_tenant_similarity(pd.Series(["Atlas"]), pd.Series(["Atlas Co"]))
+    assert scored_pairs == [2, 1]
+    mtime = os.path.getmtime(path)
+    save_tenant_similarity()
+    assert os.path.getmtime(path) == mtime
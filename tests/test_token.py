@@ -0,0 +1,127 @@
+import asyncio
+
+from fastapi import HTTPException
+import httpx
+import pytest
+
+from server.api.endpoints import token
+from server.config.settings import settings
+from server.data.circuit_breaker import CircuitBreaker
+from server.data.http import cs_http_instance
+
+TOKEN = {"access_token": "abc", "token_type": "Bearer", "expires_in": 3600}
+
+
+class AuthService:
+    """
+    Auth service answering every token request with `status`, after
+    `delay` seconds.
+    """
+
+    def __init__(self, status=200, delay=0.0):
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, request):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.status == 200:
+            return httpx.Response(200, json=TOKEN)
+        return httpx.Response(self.status, text="unavailable")
+
+
+@pytest.fixture
+def auth(monkeypatch):
+    """
+    Patch the auth service, the auth circuit (opened by one failure, half
+    open after 0.2s) and the retry backoff, returning a `retrieve`
+    function that runs `retrieve_token` against `service`.
+    """
+    for name, value in {
+        "CS_AUTH_URL": "http://auth.test",
+        "MAX_TOKEN_ATTEMPTS": 2,
+        "CS_AUTH_DEADLINE": 0.3,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    monkeypatch.setattr(token, "random", lambda: 0.0)
+    circuit = CircuitBreaker("cs_auth", failure_threshold=1, reset_timeout=0.2)
+    monkeypatch.setattr(token, "auth_circuit", circuit)
+
+    async def retrieve(service, n_calls=1):
+        monkeypatch.setattr(
+            cs_http_instance,
+            "_client",
+            httpx.AsyncClient(transport=httpx.MockTransport(service)),
+        )
+        return await asyncio.gather(
+            *[token.retrieve_token({}, {}) for _ in range(n_calls)],
+            return_exceptions=True,
+        )
+
+    return lambda service, n_calls=1: asyncio.run(retrieve(service, n_calls))
+
+
+def status(result):
+    return result.status_code if isinstance(result, HTTPException) else 200
+
+
+def test_deadline_fails_the_call(auth):
+    service = AuthService(delay=5.0)
+    [result] = auth(service)
+
+    assert status(result) == 504
+    assert token.auth_circuit.state == "open"
+
+
+def test_rate_limiting_opens_the_circuit(auth):
+    service = AuthService(status=429)
+    [result] = auth(service)
+
+    assert status(result) == 400
+    assert service.calls == settings.MAX_TOKEN_ATTEMPTS + 1
+    assert token.auth_circuit.state == "open"
+
+
+def test_client_error_closes_the_circuit(auth):
+    token.auth_circuit.record_failure()
+    asyncio.run(asyncio.sleep(0.2))
+    [result] = auth(AuthService(status=401))
+
+    assert status(result) == 400
+    assert token.auth_circuit.state == "closed"
+
+
+def test_open_circuit_fails_fast(auth):
+    token.auth_circuit.record_failure()
+    service = AuthService()
+    [result] = auth(service)
+
+    assert status(result) == 503
+    assert service.calls == 0
+
+
+def test_half_open_circuit_lets_one_probe_through(auth):
+    token.auth_circuit.record_failure()
+    asyncio.run(asyncio.sleep(0.2))
+    assert token.auth_circuit.state == "half_open"
+
+    service = AuthService(delay=0.05)
+    results = auth(service, n_calls=3)
+
+    assert sorted(status(result) for result in results) == [200, 503, 503]
+    assert service.calls == 1
+    assert token.auth_circuit.state == "closed"
+
+
+def test_failed_probe_opens_the_circuit_again(auth):
+    token.auth_circuit.record_failure()
+    asyncio.run(asyncio.sleep(0.2))
+    service = AuthService(status=500)
+    [result] = auth(service)
+
+    assert status(result) == 400
+    assert token.auth_circuit.state == "open"
+    [result] = auth(service)
+    assert status(result) == 503
+    assert service.calls == settings.MAX_TOKEN_ATTEMPTS + 1
@@ -0,0 +1,66 @@
+import asyncio
+
+from server.data.token_cache import TokenCache
+
+
+class Upstream:
+    """
+    Token endpoint counting its calls, each answered with a new token.
+    """
+
+    def __init__(self, expires_in=3600):
+        self.expires_in = expires_in
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return {
+            "access_token": f"token-{self.calls}",
+            "token_type": "Bearer",
+            "expires_in": self.expires_in,
+        }
+
+
+def test_concurrent_callers_share_one_refresh():
+    upstream = Upstream()
+    cache = TokenCache(upstream.fetch)
+
+    async def get_all():
+        return await asyncio.gather(*[cache.get() for _ in range(20)])
+
+    tokens = asyncio.run(get_all())
+
+    assert upstream.calls == 1
+    assert {token["access_token"] for token in tokens} == {"token-1"}
+    assert asyncio.run(cache.get())["access_token"] == "token-1"
+    assert upstream.calls == 1
+
+
+def test_token_shorter_than_margin_is_reused():
+    upstream = Upstream(expires_in=30)
+    cache = TokenCache(upstream.fetch, refresh_margin=60)
+
+    asyncio.run(cache.get())
+    assert asyncio.run(cache.get())["access_token"] == "token-1"
+    assert upstream.calls == 1
+
+
+def test_workers_share_the_token_file(tmp_path):
+    upstream = Upstream()
+    path = str(tmp_path / "token.json")
+    workers = [TokenCache(upstream.fetch, path=path) for _ in range(3)]
+
+    async def get_all():
+        return await asyncio.gather(*[worker.get() for worker in workers])
+
+    tokens = asyncio.run(get_all())
+
+    assert upstream.calls == 1
+    assert {token["access_token"] for token in tokens} == {"token-1"}
+
+    # a rejected token is dropped for every worker
+    asyncio.run(workers[0].invalidate("token-1"))
+    later = TokenCache(upstream.fetch, path=path)
+    assert asyncio.run(later.get())["access_token"] == "token-2"
+    assert upstream.calls == 2
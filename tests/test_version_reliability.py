@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from server.models.version_reliability import (
+    VersionReliabilityIndex,
+    VersionReliabilityStore,
+)
+
+
+def export(path, versions, masters, tenant_name, lease_term):
+    """
+    Training's version reliability export, replaced atomically.
+    """
+    tmp_path = f"{path}.tmp"
+    pd.DataFrame(
+        {
+            "comp_data_id_version": versions,
+            "comp_data_id_master": masters,
+            "tenant_name_version": "Acme",
+            "tenant_name_prob": tenant_name,
+            "lease_term_version": 60.0,
+            "lease_term_prob": lease_term,
+        },
+    ).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def test_version_lookups():
+    index = VersionReliabilityIndex(
+        np.array([30, 10, 20, 50]),
+        np.array([3, 1, 3, 2]),
+        np.array([[0.3, 0.4], [0.1, 0.2], [0.5, 0.6], [0.7, 0.8]]),
+        ["tenant_name", "lease_term"],
+    )
+
+    assert len(index) == 4
+    assert index.version(10) == (1, {"tenant_name": 0.1, "lease_term": 0.2})
+    assert index.version(50) == (2, {"tenant_name": 0.7, "lease_term": 0.8})
+    for missing in [5, 15, 40, 60]:
+        assert index.version(missing) is None
+
+
+def test_master_lookups():
+    index = VersionReliabilityIndex(
+        np.array([40, 10, 30, 20, 50]),
+        np.array([7, 9, 7, 7, 8]),
+        np.array([[0.4], [0.1], [0.3], [0.2], [0.5]]),
+        ["tenant_name"],
+    )
+
+    assert index.master(7) == ([20, 30, 40], {"tenant_name": [0.2, 0.3, 0.4]})
+    assert index.master(8) == ([50], {"tenant_name": [0.5]})
+    assert index.master(9) == ([10], {"tenant_name": [0.1]})
+    for missing in [6, 10]:
+        assert index.master(missing) is None
+
+
+def test_store_reloads_replaced_export(tmp_path):
+    path = str(tmp_path / "version_reliability.csv")
+    store = VersionReliabilityStore(path)
+    assert not store.reload()
+    assert store.index is None
+
+    export(path, [11, 12], [1, 1], [0.25, 0.5], [0.75, 1.0])
+    assert store.reload()
+    first = store.index
+    assert first.version(12) == (1, {"tenant_name": 0.5, "lease_term": 1.0})
+    assert not store.reload()
+    assert store.index is first
+
+    export(path, [11, 12, 13], [1, 2, 2], [0.0, 0.125, 1.0], [0.5, 0.5, 0.5])
+    assert store.reload()
+    assert store.index is not first
+    assert store.index.version(12) == (
+        2,
+        {"tenant_name": 0.125, "lease_term": 0.5},
+    )
+    assert store.index.master(2) == (
+        [12, 13],
+        {"tenant_name": [0.125, 1.0], "lease_term": [0.5, 0.5]},
+    )
+    assert first.version(13) is None
@@ -0,0 +1,272 @@
+"""
+Stage instrumentation of the training run. Every stage logs its wall and
+CPU time, its peak RSS, how far that peak rose above the RSS the stage
+started with and the shape of its output, and adds them to the run report
+written next to the exports.
+"""
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+import psutil
+import structlog
+
+logger = structlog.get_logger()
+
+# ru_maxrss is in bytes on macOS, kilobytes elsewhere
+_MAXRSS_BYTES = 1 if sys.platform == "darwin" else 1024
+
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_maxrss * _MAXRSS_BYTES / 2**20
+
+
+class PeakRSS:
+    """
+    Highest RSS of the process while in the context, in bytes, sampled by
+    a thread every `interval` seconds. Unlike `peak_rss_mb`, the high-water
+    mark of the whole process, it is the peak of the block alone; `delta`
+    is how far it rose above the RSS at the start of the block.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.start_rss = 0
+        self.peak = 0
+        self._stop = threading.Event()
+
+    @property
+    def delta(self):
+        return self.peak - self.start_rss
+
+    def _sample(self):
+        while True:
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        self.start_rss = self.peak = self.process.memory_info().rss
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def cpu_seconds():
+    """
+    CPU time of the process and of its terminated children, such as the
+    workers of a process pool.
+    """
+    total = 0.0
+    for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]:
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+class RunReport:
+    """
+    Measures of the stages of a run, in the order the stages started. A
+    stage entered several times (e.g. per extract batch) sums its times
+    and rows over its calls and keeps the highest of their peak RSS and
+    peak RSS deltas.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.cpu_start = cpu_seconds()
+        self.stages = {}
+        self.profilers = {}
+
+    def begin(self, name):
+        self.stages.setdefault(
+            name,
+            {
+                "calls": 0,
+                "wall_seconds": 0.0,
+                "cpu_seconds": 0.0,
+                "peak_rss_mb": 0.0,
+                "peak_rss_delta_mb": 0.0,
+                "rows": None,
+                "columns": None,
+            },
+        )
+
+    def add(self, name, measures):
+        self.merge({name: {**measures, "calls": 1}})
+
+    def merge(self, stages):
+        """
+        Add the `stages` records of a report, e.g. one made in a worker
+        process.
+        """
+        for name, other in stages.items():
+            self.begin(name)
+            record = self.stages[name]
+            record["calls"] += other["calls"]
+            for key in ["wall_seconds", "cpu_seconds"]:
+                record[key] = round(record[key] + other[key], 3)
+            for key in ["peak_rss_mb", "peak_rss_delta_mb"]:
+                record[key] = round(max(record[key], other[key]), 1)
+            if other["rows"] is not None:
+                record["rows"] = (record["rows"] or 0) + other["rows"]
+            if other["columns"] is not None:
+                record["columns"] = other["columns"]
+
+    def profiler(self, name):
+        if name not in self.profilers:
+            self.profilers[name] = cProfile.Profile()
+        return self.profilers[name]
+
+    def to_dict(self, completed=True):
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "completed": completed,
+            "wall_seconds": round(time.perf_counter() - self.start, 3),
+            "cpu_seconds": round(cpu_seconds() - self.cpu_start, 3),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "stages": self.stages,
+        }
+
+    def write(self, path, completed=True):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(completed), f, indent=2)
+        os.replace(tmp_path, path)
+        logger.info("Run report written", path=path)
+
+
+# report of the current training run
+run_report = RunReport()
+
+# stages run under cProfile and where their stats go, see
+# `initialize_profiling`
+_profiling = {"stages": frozenset(), "directory": "profiles"}
+
+
+def initialize_profiling(stages, directory):
+    """
+    Run the stages named in `stages` under cProfile, dumping their stats
+    to `directory`.
+    """
+    _profiling.update(stages=frozenset(stages), directory=directory)
+
+
+class Stage:
+    """
+    Handle of a running stage, which records the shape of its output.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.columns = None
+
+    def output(self, result):
+        """
+        Record the rows and columns of the frame or array `result` and
+        return it.
+        """
+        shape = getattr(result, "shape", None)
+        if shape is not None:
+            self.rows = int(shape[0])
+            self.columns = int(shape[1]) if len(shape) > 1 else None
+        return result
+
+
+@contextmanager
+def stage(name, report=None, profile=None):
+    """
+    Measure the block as the stage `name` of `report` (the run report by
+    default). Stages passed to `initialize_profiling` (or with `profile`)
+    also run under cProfile, whose stats are dumped to
+    `<directory>/<name>.prof`; their start is logged with the pid to
+    attach a sampling profiler such as py-spy instead.
+    """
+    report = run_report if report is None else report
+    if profile is None:
+        profile = name in _profiling["stages"]
+    report.begin(name)
+    record = Stage(name)
+    profiler = None
+    if profile:
+        profiler = report.profiler(name)
+        logger.info("Profiling stage", stage=name, pid=os.getpid())
+
+    failed = True
+    rss = PeakRSS().start()
+    cpu = cpu_seconds()
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+        failed = False
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        rss.stop()
+        measures = {
+            "wall_seconds": time.perf_counter() - start,
+            "cpu_seconds": cpu_seconds() - cpu,
+            "peak_rss_mb": rss.peak / 2**20,
+            "peak_rss_delta_mb": rss.delta / 2**20,
+            "rows": record.rows,
+            "columns": record.columns,
+        }
+        report.add(name, measures)
+        if profiler is not None:
+            os.makedirs(_profiling["directory"], exist_ok=True)
+            profiler.dump_stats(
+                os.path.join(_profiling["directory"], f"{name}.prof"),
+            )
+        logger.info(
+            "Stage failed" if failed else "Stage finished",
+            stage=name,
+            **{
+                key: round(value, 3) if isinstance(value, float) else value
+                for key, value in measures.items()
+            },
+        )
+
+
+def profiled(name):
+    """
+    Decorator running every call of the function as the stage `name`,
+    with the shape of its return value as the stage output.
+    """
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                return record.output(function(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
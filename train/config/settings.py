@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import List, Optional
 
 from pydantic import BaseSettings
 
@@ -8,6 +9,35 @@ class Settings(BaseSettings):
     DATA_PROCESSED_DIR: str = "data/processed"
     DATA_RAW_DIR: str = "data/raw"
     MODEL_DIR: str = "models"
+    RELIABILITY_ARTIFACT: str = "reliability"
+    # entity aggregates of all versions, read by the batch scoring job
+    ENTITY_FEATURES_DIR: str = "data/processed/entity_features"
+    # aggregate the entity features in Snowflake instead of from the extract,
+    # on runs that read the extract in full (see VERSION_DATA_FULL_REFRESH)
+    ENTITY_FEATURES_PUSHDOWN: bool = False
+
+    EXTRACT_BATCH_SIZE: int = 100000
+    VERSION_DATA_SNAPSHOT: str = "data/raw/version_data.parquet"
+    # the snapshot only picks up new versions and masters; a full extract
+    # also picks up deletions and edits in place, it runs when forced or
+    # once the last one is older than the max age (never with None)
+    VERSION_DATA_FULL_REFRESH: bool = False
+    VERSION_DATA_MAX_AGE_DAYS: Optional[float] = 7.0
+    TENANT_SIMILARITY_CACHE: str = "data/raw/tenant_similarity.parquet"
+    TENANT_SIMILARITY_JOBS: int = 1
+    TENANT_SIMILARITY_POOL_MIN_PAIRS: int = 50000
+    # random_forest, hist_gradient_boosting or xgboost
+    TRAIN_BACKEND: str = "random_forest"
+    # cores split between models fitted at once and threads within a model
+    TRAIN_MODEL_JOBS: int = 1
+    TRAIN_TREE_JOBS: int = -1
+    # version reliability export: rows scored per chunk and scoring processes
+    EXPORT_CHUNK_ROWS: int = 50000
+    EXPORT_JOBS: int = 1
+    # stage timings of the last run, and stages to run under cProfile
+    RUN_REPORT: str = "data/processed/run_report.json"
+    PROFILE_STAGES: List[str] = []
+    PROFILE_DIR: str = "data/processed/profiles"
 
     MYSQL_HOST: str
     MYSQL_USER: str
@@ -1,25 +1,36 @@
-from datetime import timedelta
+import os
+import time
 
-import dateutil.parser as parser
-import jellyfish
 import numpy as np
 import pandas as pd
 import structlog
 
+from train.common.profiling import profiled, stage
+from train.config.settings import settings
 from train.data.database import get_snowflake_connection
+from train.data.labels import (
+    label_commencement_date,
+    label_execution_date,
+    label_expiration_date,
+)
+from train.data.schema import apply_schema, concat_frames, log_memory
+from train.data.storage import read_parquet_metadata, write_parquet
+from train.data.tenant_similarity import (
+    get_tenant_similarity,
+    save_tenant_similarity,
+)
 
 logger = structlog.get_logger()
 
 
-def get_reliable_data():
-    df = pd.read_sql(
-        """
+VERSION_DATA_QUERY = """
 SELECT
 cv.id,
 cv.submitter_person_id,
 lds.logo,
 cv.comp_data_id AS comp_data_id_version,
 cm.comp_data_id AS comp_data_id_master,
+cm.id AS comp_master_id,
 tv.name as tenant_name_version,
 cdcfv.space_type_id as space_type_id_version,
 cdv.transaction_size as transaction_size_version,
@@ -47,7 +58,8 @@ cdm.free_months as free_months_master,
 cdm.transaction_type_id as transaction_type_id_master,
 cdm.rent_bumps_percent_bumps as rent_bumps_percent_bumps_master,
 cdm.rent_bumps_dollar_bumps as rent_bumps_dollar_bumps_master,
-cdm.lease_type_id as lease_type_id_master
+cdm.lease_type_id as lease_type_id_master,
+mv.version_count as master_version_count
 FROM
 mysql_compstak.comp_version cv
 JOIN mysql_compstak.comp_data cdv
@@ -72,207 +84,365 @@ on cdv.id = cdcfv.comp_data_id
 LEFT JOIN mysql_compstak.tenant tm ON tm.id = cdm.tenant_id
 join mysql_compstak.comp_data_calculated_fields cdcfm
 on cdm.id = cdcfm.comp_data_id
-WHERE cm.id in (
+JOIN (
 SELECT
-comp_master_id FROM mysql_compstak.comp_master_versions
+comp_master_id,
+count(1) AS version_count
+FROM mysql_compstak.comp_master_versions
 GROUP BY
-comp_master_id
-HAVING
-count(1) > 3)
+comp_master_id) mv
+ON mv.comp_master_id = cm.id
+"""
 
-    """,
-        get_snowflake_connection(),
+
+# masters with a version or master comp data past the snapshot watermarks
+CHANGED_MASTERS_FILTER = """
+WHERE cm.id IN (
+SELECT
+cmv_new.comp_master_id
+FROM mysql_compstak.comp_master_versions cmv_new
+JOIN mysql_compstak.comp_master cm_new
+ON cmv_new.comp_master_id = cm_new.id
+WHERE cmv_new.comp_version_id > {version_watermark}
+OR cm_new.comp_data_id > {master_watermark})
+"""
+
+# extract bookkeeping columns that are not part of the dataset schema
+EXTRACT_COLUMNS = ["comp_master_id", "master_version_count"]
+
+
+def iter_query_batches(connection, query, batch_size):
+    """
+    Yield the result of `query` as frames of at most `batch_size` rows,
+    or a single empty frame with the result's columns when it has no rows.
+    Snowflake cursors stream Arrow batches, other DB-API cursors are read
+    with `fetchmany`.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query)
+        columns = [col[0] for col in cursor.description]
+        empty = True
+        if hasattr(cursor, "fetch_pandas_batches"):
+            for batch in cursor.fetch_pandas_batches():
+                if batch.empty:
+                    continue
+                empty = False
+                if len(batch) <= batch_size:
+                    yield batch
+                    continue
+                for start in range(0, len(batch), batch_size):
+                    yield batch.iloc[start : start + batch_size].copy()
+        else:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                empty = False
+                yield pd.DataFrame.from_records(
+                    rows,
+                    columns=columns,
+                    coerce_float=True,
+                )
+        if empty:
+            yield pd.DataFrame(columns=columns)
+    finally:
+        cursor.close()
+
+
+def read_version_data(
+    connection,
+    where="",
+    batch_size=settings.EXTRACT_BATCH_SIZE,
+    attributes=None,
+):
+    """
+    Run the version extract. With a `batch_size` the result is streamed in
+    batches, and each batch is labeled for `attributes` and cast to the
+    pipeline schema as it arrives, so the full result never exists as
+    Python objects.
+    """
+    query = VERSION_DATA_QUERY + where
+    if not batch_size:
+        df = pd.read_sql(query, connection)
+        df.columns = [x.lower() for x in df.columns]
+        if attributes:
+            df = get_labels(df, attributes)
+        return apply_schema(df)
+
+    batches = []
+    for batch in iter_query_batches(connection, query, batch_size):
+        batch.columns = [x.lower() for x in batch.columns]
+        if attributes:
+            batch = get_labels(batch, attributes)
+        batches.append(apply_schema(batch))
+    return concat_frames(batches)
+
+
+def snapshot_expired(snapshot_path, max_age_days=None):
+    """
+    Whether the next extract has to be a full one: there is no snapshot,
+    or its last full extract is more than `max_age_days` old.
+    """
+    if not snapshot_path or not os.path.exists(snapshot_path):
+        return True
+    if max_age_days is None:
+        return False
+    full_extract_at = read_parquet_metadata(snapshot_path).get(
+        "full_extract_at",
     )
-    df.columns = [x.lower() for x in df.columns]
-    return df
+    if full_extract_at is None:
+        return True
+    return time.time() - float(full_extract_at) > max_age_days * 86400
+
+
+@profiled("extract")
+def get_version_data(
+    connection=None,
+    snapshot_path=settings.VERSION_DATA_SNAPSHOT,
+    refresh=False,
+    attributes=None,
+    batch_size=settings.EXTRACT_BATCH_SIZE,
+):
+    """
+    Every version/master row with the number of versions of its master.
+
+    The extract is kept as a Parquet snapshot. Later runs only fetch the
+    masters that gained a version (`cv.id` watermark) or whose comp data
+    changed (`cm.comp_data_id` watermark) since the snapshot was written,
+    and replace those masters' rows in the snapshot. Deleted versions,
+    late logo detections, tenant renames and edits of comp data in place
+    are only picked up by a full extract, which `refresh` forces (see
+    `snapshot_expired`). The snapshot records when its last full extract
+    ran.
+
+    With `attributes`, rows are labeled as they are read (see
+    `read_version_data`) and the snapshot keeps the labels.
+    """
+    if connection is None:
+        connection = get_snowflake_connection()
+
+    snapshot = None
+    if not refresh and snapshot_path and os.path.exists(snapshot_path):
+        snapshot = pd.read_parquet(snapshot_path)
+        if snapshot.empty:
+            snapshot = None
+
+    if snapshot is None:
+        full_extract_at = time.time()
+        df = read_version_data(connection, "", batch_size, attributes)
+        rows_reused = 0
+        rows_fetched = len(df)
+        masters_invalidated = 0
+    else:
+        full_extract_at = read_parquet_metadata(snapshot_path).get(
+            "full_extract_at",
+        )
+        fetched = read_version_data(
+            connection,
+            CHANGED_MASTERS_FILTER.format(
+                version_watermark=int(snapshot["id"].max()),
+                master_watermark=int(snapshot["comp_data_id_master"].max()),
+            ),
+            batch_size,
+            attributes,
+        )
+        changed = snapshot["comp_master_id"].isin(fetched["comp_master_id"])
+        snapshot = snapshot[~changed].reset_index(drop=True)
+        if attributes and not all(
+            f"{att}_label" in snapshot.columns for att in attributes
+        ):
+            snapshot = apply_schema(get_labels(snapshot, attributes))
+        df = concat_frames([apply_schema(snapshot), fetched])
+        rows_reused = int((~changed).sum())
+        rows_fetched = len(fetched)
+        masters_invalidated = fetched["comp_master_id"].nunique()
+
+    logger.info(
+        "Version data extract",
+        rows_fetched=rows_fetched,
+        rows_reused=rows_reused,
+        masters_invalidated=masters_invalidated,
+    )
+
+    # pairs scored across all batches, written once
+    save_tenant_similarity()
+    if snapshot_path:
+        write_parquet(
+            df,
+            snapshot_path,
+            metadata=(
+                {"full_extract_at": str(full_extract_at)}
+                if full_extract_at is not None
+                else None
+            ),
+        )
+    return log_memory(df, "extract")
+
 
+def split_version_data(data, min_versions=3):
+    """
+    Split the extract into the training data (masters with more than
+    `min_versions` versions) and all version data. Both keep the schema of
+    the extract without its bookkeeping columns.
+    """
+    reliable = (data["master_version_count"] > min_versions).to_numpy()
+    all_data = data.drop(columns=EXTRACT_COLUMNS)
+    reliable_data = all_data[reliable].reset_index(drop=True)
+    return reliable_data, all_data
 
-def get_all_data():
+
+def get_submitter_info(connection=None):
+    if connection is None:
+        connection = get_snowflake_connection()
     df = pd.read_sql(
         """
-SELECT
-cv.id,
-cv.submitter_person_id,
-lds.logo,
-cv.comp_data_id AS comp_data_id_version,
-cm.comp_data_id AS comp_data_id_master,
-tv.name as tenant_name_version,
-cdcfv.space_type_id as space_type_id_version,
-cdv.transaction_size as transaction_size_version,
-cdv.starting_rent as starting_rent_version,
-cdv.execution_date as execution_date_version,
-cdv.commencement_date as commencement_date_version,
-cdv.lease_term as lease_term_version,
-cdv.expiration_date as expiration_date_version,
-cdv.work_value as work_value_version,
-cdv.free_months as free_months_version,
-cdv.transaction_type_id as transaction_type_id_version,
-cdv.rent_bumps_percent_bumps as rent_bumps_percent_bumps_version,
-cdv.rent_bumps_dollar_bumps as rent_bumps_dollar_bumps_version,
-cdv.lease_type_id as lease_type_id_version,
-tm.name as tenant_name_master,
-cdcfm.space_type_id as space_type_id_master,
-cdm.transaction_size as transaction_size_master,
-cdm.starting_rent as starting_rent_master,
-cdm.execution_date as execution_date_master,
-cdm.commencement_date as commencement_date_master,
-cdm.lease_term as lease_term_master,
-cdm.expiration_date as expiration_date_master,
-cdm.work_value as work_value_master,
-cdm.free_months as free_months_master,
-cdm.transaction_type_id as transaction_type_id_master,
-cdm.rent_bumps_percent_bumps as rent_bumps_percent_bumps_master,
-cdm.rent_bumps_dollar_bumps as rent_bumps_dollar_bumps_master,
-cdm.lease_type_id as lease_type_id_master
-FROM
-mysql_compstak.comp_version cv
-JOIN mysql_compstak.comp_data cdv
-ON cdv.id = cv.comp_data_id
-JOIN mysql_compstak.comp_master_versions cmv
-ON cmv.comp_version_id = cv.id
-JOIN mysql_compstak.comp_master cm
-ON cmv.comp_master_id = cm.id
-JOIN mysql_compstak.comp_data cdm
-ON cm.comp_data_id = cdm.id
-LEFT JOIN mysql_compstak.comp_proposal cp
-ON cv.id = cp.comp_version_id
-LEFT JOIN ANALYTICS.LEASE_TASKS lt
-ON cp.COMP_BATCH_ID = lt.batch_id
-LEFT JOIN ANALYTICS.submissions s
-ON lt.SUBMISSION_ID = s.id
-LEFT JOIN ANALYTICS.logo_detection_submission lds ON lds.id = s.id
-LEFT JOIN mysql_compstak.tenant tv
-ON tv.id = cdv.tenant_id
-join mysql_compstak.comp_data_calculated_fields cdcfv
-on cdv.id = cdcfv.comp_data_id
-LEFT JOIN mysql_compstak.tenant tm ON tm.id = cdm.tenant_id
-join mysql_compstak.comp_data_calculated_fields cdcfm
-on cdm.id = cdcfm.comp_data_id
+select  per.id,
+CONCAT(per.first_name, ' ',  per.last_name) as submitter_name
+from mysql_compstak.person per
     """,
-        get_snowflake_connection(),
+        connection,
     )
     df.columns = [x.lower() for x in df.columns]
+
     return df
 
 
-def get_submitter_info():
+def get_batch_logos(connection=None):
+    """
+    Logo detected for each comp batch, the link between a version's
+    proposal and its logo in the version extract. Batch jobs that read
+    versions from MySQL use it to look up the logo of new versions.
+    """
+    if connection is None:
+        connection = get_snowflake_connection()
     df = pd.read_sql(
         """
-select  per.id,
-CONCAT(per.first_name, ' ',  per.last_name) as submitter_name
-from mysql_compstak.person per
+select distinct lt.batch_id as comp_batch_id,
+lds.logo
+from ANALYTICS.LEASE_TASKS lt
+join ANALYTICS.submissions s on lt.SUBMISSION_ID = s.id
+join ANALYTICS.logo_detection_submission lds on lds.id = s.id
+where lds.logo is not null
     """,
-        get_snowflake_connection(),
+        connection,
     )
     df.columns = [x.lower() for x in df.columns]
+    return df.drop_duplicates(subset="comp_batch_id").reset_index(drop=True)
 
-    return df
 
+def _mask_null_labels(subject, target, match):
+    labels = np.where(match, 1, 0)
+    labels[(pd.isnull(subject) | pd.isnull(target)).to_numpy()] = -1
+    return labels
 
-def label_strict_equality(subject, target):
-    if pd.isnull(subject) or pd.isnull(target):
-        return -1
-    if subject == target:
-        return 1
-    return 0
 
+def vector_label_strict_equality(subject, target):
+    return _mask_null_labels(subject, target, (subject == target).to_numpy())
 
-def label_tenant_name(subject, target):
-    if pd.isnull(subject) or pd.isnull(target):
-        return -1
-    if subject == target:
-        return 1
-    else:
-        if jellyfish.jaro_winkler(subject, target) > 0.9:
-            return 1
-    return 0
-
-
-def label_transaction_size(subject, target):
-    if pd.isnull(subject) or pd.isnull(target):
-        return -1
-    if subject >= target * 0.95 and subject <= target * 1.05:
-        return 1
-    return 0
-
-
-def label_execution_date(subject, target):
-    if pd.isnull(subject) or pd.isnull(target):
-        return -1
-    subject = str(subject)
-    target = str(target)
-    if parser.parse(subject) <= parser.parse(target) + timedelta(
-        days=90,
-    ) and parser.parse(subject) >= parser.parse(target) - timedelta(days=90):
-        return 1
-    return 0
-
-
-def label_commencement_date(subject, target):
-    if pd.isnull(subject) or pd.isnull(target):
-        return -1
-    subject = str(subject)
-    target = str(target)
-    if parser.parse(subject) <= parser.parse(target) + timedelta(
-        days=90,
-    ) and parser.parse(subject) >= parser.parse(target) - timedelta(days=90):
-        return 1
-    return 0
-
-
-def label_expiration_date(subject, target):
-    if pd.isnull(subject) or pd.isnull(target):
-        return -1
-    subject = str(subject)
-    target = str(target)
-    if parser.parse(subject) <= parser.parse(target) + timedelta(
-        days=90,
-    ) and parser.parse(subject) >= parser.parse(target) - timedelta(days=90):
-        return 1
-    return 0
-
-
-def label_lease_term(subject, target):
-    if pd.isnull(subject) or pd.isnull(target):
-        return -1
-    if subject >= target * 0.92 and subject <= target * 1.08:
-        return 1
-    return 0
-
-
-attribute_to_label_dict = {
-    "tenant_name": label_tenant_name,
-    "space_type_id": label_strict_equality,
-    "transaction_size": label_transaction_size,
-    "starting_rent": label_strict_equality,
-    "execution_date": label_execution_date,
-    "commencement_date": label_commencement_date,
-    "lease_term": label_lease_term,
-    "expiration_date": label_expiration_date,
-    "work_value": label_strict_equality,
-    "free_months": label_strict_equality,
-    "transaction_type_id": label_strict_equality,
-    "rent_bumps_percent_bumps": label_strict_equality,
-    "rent_bumps_dollar_bumps": label_strict_equality,
-    "lease_type_id": label_strict_equality,
+
+def vector_label_tenant_name(subject, target):
+    null = (pd.isnull(subject) | pd.isnull(target)).to_numpy()
+    match = (subject == target).to_numpy() & ~null
+    fuzzy = ~null & ~match
+    if fuzzy.any():
+        match[fuzzy] = (
+            get_tenant_similarity(subject[fuzzy], target[fuzzy]) > 0.9
+        )
+    return _mask_null_labels(subject, target, match)
+
+
+def _vector_label_tolerance(subject, target, lower, upper):
+    subject = pd.to_numeric(subject)
+    target = pd.to_numeric(target)
+    match = (subject >= target * lower) & (subject <= target * upper)
+    return _mask_null_labels(subject, target, match.to_numpy())
+
+
+def vector_label_transaction_size(subject, target):
+    return _vector_label_tolerance(subject, target, 0.95, 1.05)
+
+
+def vector_label_lease_term(subject, target):
+    return _vector_label_tolerance(subject, target, 0.92, 1.08)
+
+
+def _vector_label_date(subject, target, reference):
+    """
+    Dates are parsed once per column and compared within a 90 day window.
+    Values outside the pandas timestamp range are labeled by the row-wise
+    reference function.
+    """
+    subject_date = pd.to_datetime(subject, errors="coerce")
+    target_date = pd.to_datetime(target, errors="coerce")
+    delta = subject_date - target_date
+    window = pd.Timedelta(days=90)
+    labels = _mask_null_labels(
+        subject,
+        target,
+        ((delta <= window) & (delta >= -window)).to_numpy(),
+    )
+
+    unparsed = (
+        (pd.isnull(subject_date) | pd.isnull(target_date))
+        & pd.notnull(subject)
+        & pd.notnull(target)
+    ).to_numpy()
+    if unparsed.any():
+        labels[unparsed] = [
+            reference(s, t) for s, t in zip(subject[unparsed], target[unparsed])
+        ]
+    return labels
+
+
+def vector_label_execution_date(subject, target):
+    return _vector_label_date(subject, target, label_execution_date)
+
+
+def vector_label_commencement_date(subject, target):
+    return _vector_label_date(subject, target, label_commencement_date)
+
+
+def vector_label_expiration_date(subject, target):
+    return _vector_label_date(subject, target, label_expiration_date)
+
+
+attribute_to_vector_label_dict = {
+    "tenant_name": vector_label_tenant_name,
+    "space_type_id": vector_label_strict_equality,
+    "transaction_size": vector_label_transaction_size,
+    "starting_rent": vector_label_strict_equality,
+    "execution_date": vector_label_execution_date,
+    "commencement_date": vector_label_commencement_date,
+    "lease_term": vector_label_lease_term,
+    "expiration_date": vector_label_expiration_date,
+    "work_value": vector_label_strict_equality,
+    "free_months": vector_label_strict_equality,
+    "transaction_type_id": vector_label_strict_equality,
+    "rent_bumps_percent_bumps": vector_label_strict_equality,
+    "rent_bumps_dollar_bumps": vector_label_strict_equality,
+    "lease_type_id": vector_label_strict_equality,
 }
 
 
 def get_labels(data, attributes):
+    """
+    Label every version attribute against its master, one column at a time.
+    The row-wise functions in `train.data.labels` are the reference
+    implementation of the same rules.
+    """
     for att in attributes:
-        print(f"Calculating Labels: {att}")
-        data[att + "_filled"] = np.where(
-            (pd.notnull(data[att + "_version"])),
-            1,
-            0,
-        )
+        with stage(f"label.{att}") as record:
+            data[att + "_filled"] = np.where(
+                (pd.notnull(data[att + "_version"])),
+                1,
+                0,
+            )
 
-        data[att + "_label"] = data.apply(
-            lambda x: attribute_to_label_dict[att](
-                x[att + "_version"],
-                x[att + "_master"],
-            ),
-            axis=1,
-        )
+            data[att + "_label"] = attribute_to_vector_label_dict[att](
+                data[att + "_version"],
+                data[att + "_master"],
+            )
+            record.output(data)
 
     return data
@@ -0,0 +1,255 @@
+"""
+Submitter and logo aggregates computed in the warehouse. The label rules
+of `attribute_to_label_dict` are generated as SQL next to the version
+extract, so one statement returns a row per entity instead of every
+version. Tenant names are only matched exactly in SQL, the distinct pairs
+that differ come back with the aggregates and are matched by Jaro-Winkler
+client-side.
+"""
+from functools import partial
+
+import pandas as pd
+
+from train.common.profiling import profiled
+from train.data.database import get_snowflake_connection
+from train.data.dataset import VERSION_DATA_QUERY
+from train.data.labels import (
+    attribute_to_label_dict,
+    label_commencement_date,
+    label_execution_date,
+    label_expiration_date,
+    label_lease_term,
+    label_strict_equality,
+    label_tenant_name,
+    label_transaction_size,
+)
+from train.data.schema import apply_schema, log_memory
+from train.data.tenant_similarity import (
+    get_tenant_similarity,
+    save_tenant_similarity,
+)
+
+ENTITIES = ["submitter_person_id", "logo"]
+
+# `date` as a comparable instant and shifted by a signed number of days,
+# keeping its time of day like the `timedelta` of the label rules
+DATE_VALUE = {
+    "snowflake": "{date}",
+    "sqlite": "julianday({date})",
+}
+DATE_SHIFT = {
+    "snowflake": "DATEADD(day, {days}, {date})",
+    "sqlite": "julianday({date}, '{days:+d} days')",
+}
+
+# the source is labeled once and grouped by each entity, together with the
+# differing tenant name pairs when tenant names are labeled
+ENTITY_AGGREGATE_QUERY = {
+    "snowflake": """
+WITH labeled AS (
+SELECT
+submitter_person_id,
+logo,
+{labels}
+FROM ({source}) versions)
+SELECT
+CASE WHEN GROUPING(submitter_person_id) = 0
+THEN 'submitter_person_id' ELSE 'logo' END AS entity,
+submitter_person_id,
+logo,
+{aggregates}
+FROM labeled
+GROUP BY GROUPING SETS (
+(submitter_person_id{pairs}),
+(logo{pairs}))
+HAVING GROUPING(submitter_person_id) = 0 AND submitter_person_id IS NOT NULL
+OR GROUPING(logo) = 0 AND logo IS NOT NULL
+""",
+    "sqlite": """
+WITH labeled AS MATERIALIZED (
+SELECT
+submitter_person_id,
+logo,
+{labels}
+FROM ({source}) versions)
+SELECT
+'submitter_person_id' AS entity,
+submitter_person_id,
+NULL AS logo,
+{aggregates}
+FROM labeled
+WHERE submitter_person_id IS NOT NULL
+GROUP BY submitter_person_id{pairs}
+UNION ALL
+SELECT
+'logo' AS entity,
+NULL AS submitter_person_id,
+logo,
+{aggregates}
+FROM labeled
+WHERE logo IS NOT NULL
+GROUP BY logo{pairs}
+""",
+}
+
+# tenant names of a version and its master when both are set and differ
+TENANT_PAIR_COLUMNS = [
+    "CASE WHEN tenant_name_version <> tenant_name_master "
+    "THEN tenant_name_version END AS differing_tenant_version",
+    "CASE WHEN tenant_name_version <> tenant_name_master "
+    "THEN tenant_name_master END AS differing_tenant_master",
+]
+
+
+def _match_equality(subject, target, dialect):
+    return f"{subject} = {target}"
+
+
+def _match_tolerance(subject, target, dialect, lower, upper):
+    return (
+        f"{subject} >= {target} * {lower} AND {subject} <= {target} * {upper}"
+    )
+
+
+def _match_date_window(subject, target, dialect, days):
+    value = DATE_VALUE[dialect].format(date=subject)
+    start = DATE_SHIFT[dialect].format(date=target, days=-days)
+    end = DATE_SHIFT[dialect].format(date=target, days=days)
+    return f"{value} BETWEEN {start} AND {end}"
+
+
+# SQL match condition of each row-wise label rule
+label_rule_sql = {
+    label_strict_equality: _match_equality,
+    label_tenant_name: _match_equality,
+    label_transaction_size: partial(_match_tolerance, lower=0.95, upper=1.05),
+    label_lease_term: partial(_match_tolerance, lower=0.92, upper=1.08),
+    label_execution_date: partial(_match_date_window, days=90),
+    label_commencement_date: partial(_match_date_window, days=90),
+    label_expiration_date: partial(_match_date_window, days=90),
+}
+
+
+def label_sql(att, dialect="snowflake"):
+    subject = f"{att}_version"
+    target = f"{att}_master"
+    match = label_rule_sql[attribute_to_label_dict[att]](
+        subject,
+        target,
+        dialect,
+    )
+    return (
+        f"CASE WHEN {subject} IS NULL OR {target} IS NULL THEN -1 "
+        f"WHEN {match} THEN 1 ELSE 0 END"
+    )
+
+
+def entity_aggregate_query(
+    attributes,
+    dialect="snowflake",
+    source=VERSION_DATA_QUERY,
+):
+    """
+    Correct, total and filled counts of every submitter and logo over the
+    rows of `source`, the indicators of `entity_indicators` summed in SQL,
+    in one statement. Rows are labeled `entity`; with tenant names, each
+    entity has a row per differing tenant name pair, with its count in
+    `versions`, next to the row of its other versions.
+    """
+    labels = []
+    aggregates = ["COUNT(*) AS versions"]
+    pairs = ""
+    for att in attributes:
+        labels.append(f"{label_sql(att, dialect)} AS {att}_label")
+        labels.append(
+            f"CASE WHEN {att}_version IS NOT NULL THEN 1 ELSE 0 END "
+            f"AS {att}_filled",
+        )
+        aggregates.extend(
+            [
+                f"SUM(CASE WHEN {att}_label = 1 THEN 1 ELSE 0 END) "
+                f"AS {att}_correct",
+                f"SUM(CASE WHEN {att}_label IS NOT NULL THEN 1 ELSE 0 END) "
+                f"AS {att}_total",
+                f"SUM(CASE WHEN {att}_filled IN (0, 1) THEN 1 ELSE 0 END) "
+                f"AS {att}_filled",
+            ],
+        )
+    if "tenant_name" in attributes:
+        labels.extend(TENANT_PAIR_COLUMNS)
+        aggregates[:0] = ["differing_tenant_version", "differing_tenant_master"]
+        pairs = ", differing_tenant_version, differing_tenant_master"
+    return ENTITY_AGGREGATE_QUERY[dialect].format(
+        labels=",\n".join(labels),
+        aggregates=",\n".join(aggregates),
+        pairs=pairs,
+        source=source,
+    )
+
+
+def _read_query(connection, query):
+    df = pd.read_sql(query, connection)
+    df.columns = [x.lower() for x in df.columns]
+    return df
+
+
+def _entity_aggregates(df, name, attributes):
+    """
+    Aggregates of the `name` entities from their rows of the aggregate
+    query, with the differing tenant names that Jaro-Winkler matches
+    counted as correct.
+    """
+    rows = df[df["entity"] == name]
+    counts = [
+        f"{att}_{kind}"
+        for att in attributes
+        for kind in ["correct", "total", "filled"]
+    ]
+    aggregates = rows.groupby(name, sort=False)[counts].sum()
+    if "tenant_name" in attributes:
+        pairs = rows.dropna(subset=["differing_tenant_version"])
+        similarity = get_tenant_similarity(
+            pairs["differing_tenant_version"],
+            pairs["differing_tenant_master"],
+        )
+        matches = pairs[similarity > 0.9].groupby(name)["versions"].sum()
+        aggregates["tenant_name_correct"] += matches.reindex(
+            aggregates.index,
+            fill_value=0,
+        )
+    aggregates.columns = [f"{col}_{name}" for col in aggregates.columns]
+    return aggregates.astype("int64").reset_index()
+
+
+@profiled("entity_features.pushdown")
+def get_entity_features_pushdown(
+    connection=None,
+    attributes=None,
+    dialect="snowflake",
+    source=VERSION_DATA_QUERY,
+):
+    """
+    The aggregates of `get_entity_features` for the rows of `source`,
+    computed in the warehouse. They reflect the warehouse at query time:
+    they only match the features of an extract read just before, not of
+    an extract patched from an older snapshot (see `get_version_data`).
+    """
+    if connection is None:
+        connection = get_snowflake_connection()
+    if attributes is None:
+        attributes = list(attribute_to_label_dict)
+
+    df = _read_query(
+        connection,
+        entity_aggregate_query(attributes, dialect, source),
+    )
+    entity_features = {}
+    for name in ENTITIES:
+        aggregates = _entity_aggregates(df, name, attributes)
+        cols = sorted(col for col in aggregates.columns if col != name)
+        entity_features[name] = log_memory(
+            apply_schema(aggregates[[name] + cols]),
+            f"{name} aggregates",
+        )
+    save_tenant_similarity()
+    return entity_features
@@ -0,0 +1,98 @@
+"""
+Row-wise labeling rules of a version attribute against its master: 1 when
+they agree, 0 when they do not, -1 when either value is missing.
+"""
+from datetime import timedelta
+
+import dateutil.parser as parser
+import jellyfish
+import pandas as pd
+
+
+def label_strict_equality(subject, target):
+    if pd.isnull(subject) or pd.isnull(target):
+        return -1
+    if subject == target:
+        return 1
+    return 0
+
+
+def label_tenant_name(subject, target):
+    if pd.isnull(subject) or pd.isnull(target):
+        return -1
+    if subject == target:
+        return 1
+    else:
+        if jellyfish.jaro_winkler(subject, target) > 0.9:
+            return 1
+    return 0
+
+
+def label_transaction_size(subject, target):
+    if pd.isnull(subject) or pd.isnull(target):
+        return -1
+    if subject >= target * 0.95 and subject <= target * 1.05:
+        return 1
+    return 0
+
+
+def label_execution_date(subject, target):
+    if pd.isnull(subject) or pd.isnull(target):
+        return -1
+    subject = str(subject)
+    target = str(target)
+    if parser.parse(subject) <= parser.parse(target) + timedelta(
+        days=90,
+    ) and parser.parse(subject) >= parser.parse(target) - timedelta(days=90):
+        return 1
+    return 0
+
+
+def label_commencement_date(subject, target):
+    if pd.isnull(subject) or pd.isnull(target):
+        return -1
+    subject = str(subject)
+    target = str(target)
+    if parser.parse(subject) <= parser.parse(target) + timedelta(
+        days=90,
+    ) and parser.parse(subject) >= parser.parse(target) - timedelta(days=90):
+        return 1
+    return 0
+
+
+def label_expiration_date(subject, target):
+    if pd.isnull(subject) or pd.isnull(target):
+        return -1
+    subject = str(subject)
+    target = str(target)
+    if parser.parse(subject) <= parser.parse(target) + timedelta(
+        days=90,
+    ) and parser.parse(subject) >= parser.parse(target) - timedelta(days=90):
+        return 1
+    return 0
+
+
+def label_lease_term(subject, target):
+    if pd.isnull(subject) or pd.isnull(target):
+        return -1
+    if subject >= target * 0.92 and subject <= target * 1.08:
+        return 1
+    return 0
+
+
+attribute_to_label_dict = {
+    "tenant_name": label_tenant_name,
+    "space_type_id": label_strict_equality,
+    "transaction_size": label_transaction_size,
+    "starting_rent": label_strict_equality,
+    "execution_date": label_execution_date,
+    "commencement_date": label_commencement_date,
+    "lease_term": label_lease_term,
+    "expiration_date": label_expiration_date,
+    "work_value": label_strict_equality,
+    "free_months": label_strict_equality,
+    "transaction_type_id": label_strict_equality,
+    "rent_bumps_percent_bumps": label_strict_equality,
+    "rent_bumps_dollar_bumps": label_strict_equality,
+    "lease_type_id": label_strict_equality,
+}
@@ -1,7 +1,20 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import os
 import warnings
 
+import numpy as np
 import pandas as pd
 
+from train.config.settings import settings
+from train.data.storage import write_csv_chunks, write_parquet
+from train.model.artifact import load_model_artifact
+from train.model.inference import (
+    compile_models,
+    distinct_rows,
+    log_distinct_rows,
+)
+
 warnings.filterwarnings("ignore")
 
 
@@ -32,9 +45,13 @@ async def get_submitter_reliability(
         ["submitter_name", "submitter_person_id", "n_support"]
     ]
     reliability_cols = []
+    probabilities = compile_models(model_dict, X_cols).predict_proba_all(
+        submitter_records[X_cols],
+        y_cols,
+        deduplicate=True,
+    )
     for col in y_cols:
-        clf = model_dict[col]
-        prob = clf.predict_proba(submitter_records[X_cols])[:, 1]
+        prob = probabilities[col]
         reliability_col = col.replace("label", "reliability")
         anal_df[reliability_col] = prob
         reliability_cols.append(reliability_col)
@@ -58,18 +75,184 @@ async def get_submitter_reliability(
     return anal_df, submitter_info
 
 
-def get_version_reliability(data, attributes, x_cols, y_cols, model_dict):
+def _version_frame(data, attributes, y_cols, probabilities):
     val_df = pd.DataFrame()
     val_df["comp_data_id_version"] = data["comp_data_id_version"]
     val_df["comp_data_id_master"] = data["comp_data_id_master"]
-
-    x_temp = data[x_cols]
     for i in range(0, len(attributes)):
         model_name = y_cols[i]
-        clf = model_dict[model_name]
         val_df[f"{attributes[i]}_version"] = data[f"{attributes[i]}_version"]
-        probs = clf.predict_proba(x_temp)[:, 1]
-        val_df[f"{attributes[i]}_prob"] = probs
+        val_df[f"{attributes[i]}_prob"] = probabilities[model_name]
+    return val_df
 
-    val_df = val_df.sort_values(by="comp_data_id_master")
+
+def get_version_reliability(data, attributes, x_cols, y_cols, model_dict):
+    probabilities = compile_models(model_dict, x_cols).predict_proba_all(
+        data[x_cols],
+        y_cols,
+        deduplicate=True,
+    )
+    val_df = _version_frame(data, attributes, y_cols, probabilities)
+    val_df = val_df.sort_values(by="comp_data_id_master", kind="stable")
     return val_df
+
+
+_worker_ensemble = None
+
+
+def _init_scoring_worker(artifact_path, ensemble):
+    global _worker_ensemble
+    if artifact_path is not None:
+        ensemble = load_model_artifact(artifact_path)
+    _worker_ensemble = ensemble
+
+
+def _score_chunk(chunk, y_cols):
+    first, inverse = distinct_rows(chunk)
+    probabilities = _worker_ensemble.predict_proba_all(
+        chunk.iloc[first],
+        y_cols,
+    )
+    return len(first), {
+        col: proba[inverse] for col, proba in probabilities.items()
+    }
+
+
+def _score_chunks(chunks, y_cols, artifact_path, ensemble, n_jobs):
+    """
+    Number of distinct feature rows and probabilities of every row of each
+    chunk, yielded in order as soon as the chunk is scored, in a process
+    pool with at most two chunks per worker in flight when `n_jobs` > 1.
+    """
+    if n_jobs <= 1:
+        _init_scoring_worker(artifact_path, ensemble)
+        for chunk in chunks:
+            yield _score_chunk(chunk, y_cols)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=n_jobs,
+        initializer=_init_scoring_worker,
+        initargs=(artifact_path, ensemble),
+    ) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_score_chunk, chunk, y_cols))
+            if len(pending) >= 2 * n_jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_version_reliability(
+    data,
+    attributes,
+    x_cols,
+    y_cols,
+    model_dict,
+    artifact_path=None,
+    chunk_size=settings.EXPORT_CHUNK_ROWS,
+    n_jobs=settings.EXPORT_JOBS,
+):
+    """
+    `get_version_reliability` in chunks of `chunk_size` rows, yielded in
+    the same order as its sorted frame, so concatenating the chunks gives
+    the same frame.
+
+    Rows are put in master order and each chunk is yielded as soon as it
+    is scored (see `_score_chunks`), with every distinct feature row of
+    the chunk scored once. The workers memory-map the model artifact at
+    `artifact_path` when given, otherwise they receive the compiled
+    models once.
+    """
+    ensemble = None
+    if artifact_path is None:
+        ensemble = compile_models(model_dict, x_cols)
+    order = np.argsort(
+        data["comp_data_id_master"].to_numpy(),
+        kind="stable",
+    )
+    columns = ["comp_data_id_version", "comp_data_id_master"] + [
+        f"{att}_version" for att in attributes
+    ]
+    positions = data.columns.get_indexer(columns)
+    x_positions = data.columns.get_indexer(x_cols)
+    starts = range(0, max(len(order), 1), chunk_size)
+    scored = _score_chunks(
+        (
+            data.iloc[order[start : start + chunk_size], x_positions]
+            for start in starts
+        ),
+        y_cols,
+        artifact_path,
+        ensemble,
+        n_jobs,
+    )
+    n_distinct = 0
+    for start, (n_chunk_distinct, probabilities) in zip(starts, scored):
+        n_distinct += n_chunk_distinct
+        yield _version_frame(
+            data.iloc[order[start : start + chunk_size], positions],
+            attributes,
+            y_cols,
+            probabilities,
+        )
+    log_distinct_rows(len(order), n_distinct)
+
+
+def export_version_reliability(
+    data,
+    attributes,
+    x_cols,
+    y_cols,
+    model_dict,
+    path,
+    artifact_path=None,
+    chunk_size=settings.EXPORT_CHUNK_ROWS,
+    n_jobs=settings.EXPORT_JOBS,
+):
+    """
+    Score the version reliability chunk by chunk (see
+    `iter_version_reliability`) and write each chunk to the CSV at `path`
+    as soon as it is ready, so only the chunks in flight are held in
+    memory. The file is swapped in once complete.
+    """
+    return write_csv_chunks(
+        iter_version_reliability(
+            data,
+            attributes,
+            x_cols,
+            y_cols,
+            model_dict,
+            artifact_path,
+            chunk_size,
+            n_jobs,
+        ),
+        path,
+    )
+
+
+def export_entity_features(
+    entity_features,
+    batch_logos,
+    directory,
+    counted_versions=None,
+):
+    """
+    Write the entity aggregates (one `<entity>.parquet` per entity) and
+    the batch logos (`batch_logos.parquet`) that the batch job needs
+    to compute features of versions scored outside of training. The ids,
+    submitters and logos of the versions the aggregates count
+    (`counted_versions.parquet`) let the stream job skip them.
+    """
+    for name, df in entity_features.items():
+        write_parquet(df, os.path.join(directory, f"{name}.parquet"))
+    write_parquet(
+        batch_logos,
+        os.path.join(directory, "batch_logos.parquet"),
+    )
+    if counted_versions is not None:
+        write_parquet(
+            counted_versions,
+            os.path.join(directory, "counted_versions.parquet"),
+        )
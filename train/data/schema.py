@@ -0,0 +1,146 @@
+"""
+Compact dtypes for the wide version/master frame. Every pipeline stage
+casts its output with `apply_schema` so the frame keeps this layout from
+the extract through feature engineering.
+"""
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+import structlog
+
+logger = structlog.get_logger()
+
+ID_COLUMNS = [
+    "id",
+    "submitter_person_id",
+    "comp_data_id_version",
+    "comp_data_id_master",
+    "comp_master_id",
+]
+
+CATEGORICAL_ATTRIBUTES = [
+    "tenant_name",
+    "space_type_id",
+    "transaction_type_id",
+    "lease_type_id",
+]
+
+ENTITY_COUNT_MARKERS = ["_correct_", "_total_", "_filled_"]
+
+
+def _categorical_base(col):
+    for suffix in ["_version", "_master"]:
+        base = col[: -len(suffix)]
+        if col.endswith(suffix) and base in CATEGORICAL_ATTRIBUTES:
+            return base
+    return None
+
+
+def column_dtype(col):
+    """
+    Declared dtype of a pipeline column, None for columns kept as read.
+    """
+    if col in ID_COLUMNS:
+        return "Int32"
+    if _categorical_base(col):
+        return "category"
+    if col.endswith("_rate"):
+        return "float32"
+    if col.endswith("_label") or col.endswith("_filled"):
+        return "int8"
+    if col.endswith("_hist") or any(m in col for m in ENTITY_COUNT_MARKERS):
+        return "int32"
+    return None
+
+
+def _categories(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.categories
+    return pd.Index(values.dropna().unique())
+
+
+def _union_categories(columns):
+    categories = [_categories(values) for values in columns]
+    return reduce(lambda left, right: left.union(right), categories)
+
+
+def _set_categories(df, col, categories):
+    values = df[col]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        if not values.cat.categories.equals(categories):
+            df[col] = values.cat.set_categories(categories)
+    else:
+        df[col] = pd.Categorical(values, categories=categories)
+
+
+def categorical_pairs(columns):
+    """
+    Version/master column pairs stored as categoricals. Both columns of a
+    pair share one set of categories so they can be compared directly.
+    """
+    pairs = {}
+    for col in columns:
+        base = _categorical_base(col)
+        if base:
+            pairs.setdefault(base, []).append(col)
+    return pairs
+
+
+def apply_schema(df):
+    for cols in categorical_pairs(df.columns).values():
+        categories = _union_categories([df[col] for col in cols])
+        for col in cols:
+            _set_categories(df, col, categories)
+
+    for col in df.columns:
+        dtype = column_dtype(col)
+        if dtype is None or dtype == "category" or df[col].dtype == dtype:
+            continue
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def concat_frames(frames):
+    """
+    Concatenate schema frames without losing categoricals: pandas falls
+    back to object columns when the categories of the pieces differ.
+    """
+    frames = [df for df in frames if len(df.columns)]
+    for cols in categorical_pairs(frames[0].columns).values():
+        categories = _union_categories(
+            [df[col] for df in frames for col in cols],
+        )
+        for df in frames:
+            for col in cols:
+                _set_categories(df, col, categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def fill_missing(df, value):
+    """
+    `DataFrame.fillna` that also fills categoricals, adding `value` as a
+    category where a column needs it.
+    """
+    for col in df.columns:
+        values = df[col]
+        if (
+            isinstance(values.dtype, pd.CategoricalDtype)
+            and value not in values.cat.categories
+            and values.isnull().any()
+        ):
+            df[col] = values.cat.add_categories([value])
+    return df.fillna(value)
+
+
+def log_memory(df, stage):
+    memory = df.memory_usage(deep=True)
+    logger.info(
+        "Frame memory",
+        stage=stage,
+        rows=len(df),
+        columns=len(df.columns),
+        mb=round(memory.sum() / 2**20, 1),
+        object_columns=int(np.sum(df.dtypes == object)),
+    )
+    return df
@@ -0,0 +1,74 @@
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def _write_atomic(path, write):
+    """
+    Write next to the final location and swap the file in, so an
+    interrupted run never leaves a truncated file behind and readers never
+    see a partial one.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_parquet(df, path, metadata=None):
+    """
+    Write `df` to Parquet, with the `metadata` key/value strings in the
+    schema metadata of the file.
+    """
+    if not metadata:
+        _write_atomic(
+            path,
+            lambda tmp_path: df.to_parquet(tmp_path, index=False),
+        )
+        return
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {
+            **(table.schema.metadata or {}),
+            **{key.encode(): value.encode() for key, value in metadata.items()},
+        },
+    )
+    _write_atomic(path, lambda tmp_path: pq.write_table(table, tmp_path))
+
+
+def read_parquet_metadata(path):
+    """
+    Key/value strings written with `write_parquet(..., metadata=...)`.
+    """
+    metadata = pq.read_schema(path).metadata or {}
+    return {
+        key.decode(): value.decode()
+        for key, value in metadata.items()
+        if key != b"pandas"
+    }
+
+
+def write_csv(df, path):
+    _write_atomic(path, lambda tmp_path: df.to_csv(tmp_path, index=False))
+
+
+def write_csv_chunks(chunks, path):
+    """
+    Write an iterable of DataFrames to one CSV, chunk by chunk, with the
+    header of the first one. Returns the number of rows written.
+    """
+    n_rows = 0
+
+    def write(tmp_path):
+        nonlocal n_rows
+        with open(tmp_path, "w", newline="") as f:
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(f, index=False, header=i == 0)
+                n_rows += len(chunk)
+
+    _write_atomic(path, write)
+    return n_rows
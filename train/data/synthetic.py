@@ -0,0 +1,263 @@
+"""
+Synthetic version/master frames in the schema of `get_version_data`, to run
+and benchmark the training pipeline without Snowflake.
+
+Submitters and logos follow a Zipf-like popularity, submitters have their
+own error rate, tenant names are shared across masters and misspelled by
+versions, attributes have nulls and dates are ISO strings, like the
+extract. Every column is drawn with vectorized numpy so tens of millions
+of rows can be generated.
+"""
+import numpy as np
+import pandas as pd
+
+ATTRIBUTES = [
+    "tenant_name",
+    "space_type_id",
+    "transaction_size",
+    "starting_rent",
+    "execution_date",
+    "commencement_date",
+    "lease_term",
+    "expiration_date",
+    "work_value",
+    "free_months",
+    "transaction_type_id",
+    "rent_bumps_percent_bumps",
+    "rent_bumps_dollar_bumps",
+    "lease_type_id",
+]
+
+TENANT_WORDS = [
+    "Acme",
+    "Apex",
+    "Atlas",
+    "Blue",
+    "Cedar",
+    "Delta",
+    "Eagle",
+    "Global",
+    "Harbor",
+    "Liberty",
+    "Metro",
+    "North",
+    "Pacific",
+    "Pinnacle",
+    "Summit",
+    "United",
+]
+TENANT_KINDS = [
+    "Capital",
+    "Consulting",
+    "Foods",
+    "Health",
+    "Holdings",
+    "Labs",
+    "Logistics",
+    "Media",
+    "Partners",
+    "Systems",
+]
+TENANT_SUFFIXES = ["", " Inc", " LLC", " Corp"]
+
+# share of null values of an attribute, on masters and on versions
+MASTER_NULL_RATE = 0.05
+VERSION_NULL_RATE = 0.1
+
+FIRST_DAY = np.datetime64("2005-01-01")
+# executions over 15 years, expirations up to 15 years later
+N_DAYS = 365 * 32
+DAYS = np.datetime_as_string(
+    FIRST_DAY + np.arange(N_DAYS),
+    unit="D",
+).astype(object)
+
+
+def _zipf_choice(rng, n_values, size, exponent=1.1):
+    # index of a value drawn with probability proportional to 1 / rank^s
+    weights = 1.0 / np.arange(1, n_values + 1) ** exponent
+    return rng.choice(n_values, size=size, p=weights / weights.sum())
+
+
+def _with_nulls(values, nulls):
+    # NaN in numeric columns, None in string columns, as read
+    values = values.copy()
+    values[nulls] = None if values.dtype == object else np.nan
+    return values
+
+
+def tenant_names(n_tenants):
+    """
+    `n_tenants` distinct tenant names, from word combinations numbered once
+    they run out.
+    """
+    names = [
+        f"{word} {kind}{suffix}"
+        for suffix in TENANT_SUFFIXES
+        for word in TENANT_WORDS
+        for kind in TENANT_KINDS
+    ]
+    names += [
+        f"{names[i % len(names)]} {i // len(names) + 1}"
+        for i in range(len(names), n_tenants)
+    ]
+    return np.array(names[:n_tenants], dtype=object)
+
+
+def _master_values(rng, n_masters, n_tenants):
+    """
+    Attribute values of every master, numeric ones as floats, dates as day
+    offsets from `FIRST_DAY`.
+    """
+    execution = rng.integers(0, 365 * 15, n_masters)
+    commencement = execution + rng.integers(0, 120, n_masters)
+    lease_term = rng.choice([12, 24, 36, 60, 84, 120, 180], n_masters)
+    return {
+        "tenant_name": _zipf_choice(rng, n_tenants, n_masters, 0.8),
+        "space_type_id": rng.integers(1, 8, n_masters).astype(float),
+        "transaction_size": np.round(rng.lognormal(8.5, 1.2, n_masters)),
+        "starting_rent": np.round(rng.uniform(10, 150, n_masters), 2),
+        "execution_date": execution,
+        "commencement_date": commencement,
+        "lease_term": lease_term.astype(float),
+        "expiration_date": commencement + np.round(lease_term * 30.44),
+        "work_value": np.round(rng.uniform(0, 100, n_masters), 2),
+        "free_months": rng.integers(0, 13, n_masters).astype(float),
+        "transaction_type_id": rng.integers(1, 6, n_masters).astype(float),
+        "rent_bumps_percent_bumps": np.round(
+            rng.uniform(0, 5, n_masters),
+            1,
+        ),
+        "rent_bumps_dollar_bumps": np.round(rng.uniform(0, 2, n_masters), 2),
+        "lease_type_id": rng.integers(1, 7, n_masters).astype(float),
+    }
+
+
+def _wrong_values(rng, att, values, n_tenants):
+    """
+    What a submitter gets wrong: another tenant, a date off by two weeks
+    to a year, a number off by more than 5 %, another id.
+    """
+    size = len(values)
+    if att == "tenant_name":
+        return _zipf_choice(rng, n_tenants, size, 0.8)
+    if att.endswith("_date"):
+        shift = rng.integers(14, 365, size) * rng.choice([-1, 1], size)
+        return np.clip(values + shift, 0, N_DAYS - 1)
+    if att.endswith("_id"):
+        return values % 6 + 1
+    return np.round(values * rng.uniform(1.1, 1.6, size), 2)
+
+
+def _misspell(names):
+    # the same tenant typed differently: case and spacing
+    return np.array(
+        [
+            name.upper() if i % 2 else name.replace(" ", "  ", 1)
+            for i, name in enumerate(names)
+        ],
+        dtype=object,
+    )
+
+
+def _extract_values(att, values, names):
+    # tenant ids to names, day offsets to ISO date strings
+    if att == "tenant_name":
+        return names[values]
+    if att.endswith("_date"):
+        return DAYS[values.astype(int)]
+    return values
+
+
+def synthetic_version_data(
+    n_rows,
+    seed=0,
+    n_submitters=None,
+    n_logos=None,
+    n_tenants=None,
+):
+    """
+    `n_rows` version/master rows with the columns of `get_version_data`
+    before labeling, including `master_version_count`.
+
+    Masters have 1 + geometric versions (a mean of about 3, so a good part
+    of them are reliable training masters). By default there is a
+    submitter for every 200 rows, a logo for every 10 submitters and a
+    tenant for every 20 masters.
+    """
+    rng = np.random.default_rng(seed)
+    counts = 1 + rng.geometric(0.45, n_rows // 2 + 1)
+    counts = counts[: np.searchsorted(np.cumsum(counts), n_rows) + 1]
+    counts[-1] -= counts.sum() - n_rows
+    n_masters = len(counts)
+    n_submitters = n_submitters or max(20, n_rows // 200)
+    n_logos = n_logos or max(5, n_submitters // 10)
+    n_tenants = n_tenants or max(50, n_masters // 20)
+
+    master = np.repeat(np.arange(n_masters), counts)
+    submitter = _zipf_choice(rng, n_submitters, n_rows)
+    # each submitter mostly works with one logo and has its own error rate
+    home_logo = _zipf_choice(rng, n_logos, n_submitters)
+    error_rate = rng.beta(1.5, 8, n_submitters)
+    logo = np.where(
+        rng.random(n_rows) < 0.8,
+        home_logo[submitter],
+        _zipf_choice(rng, n_logos, n_rows),
+    )
+    logos = np.array([f"logo_{i}" for i in range(n_logos)], dtype=object)
+
+    version_id = np.arange(1, n_rows + 1)
+    df = pd.DataFrame(
+        {
+            "id": version_id,
+            "submitter_person_id": submitter + 1,
+            "logo": _with_nulls(logos[logo], rng.random(n_rows) < 0.3),
+            "comp_data_id_version": version_id + n_masters,
+            "comp_data_id_master": master + 1,
+            "comp_master_id": master + 1,
+        },
+    )
+
+    masters = _master_values(rng, n_masters, n_tenants)
+    names = tenant_names(n_tenants)
+    columns = {}
+    for att in ATTRIBUTES:
+        master_values = masters[att][master]
+        version_values = master_values.copy()
+        wrong = rng.random(n_rows) < error_rate[submitter]
+        version_values[wrong] = _wrong_values(
+            rng,
+            att,
+            master_values[wrong],
+            n_tenants,
+        )
+        master_col = _extract_values(att, master_values, names)
+        version_col = _extract_values(att, version_values, names)
+        if att == "tenant_name":
+            misspelled = rng.random(n_rows) < error_rate[submitter] / 2
+            version_col[misspelled] = _misspell(version_col[misspelled])
+
+        master_nulls = rng.random(n_masters) < MASTER_NULL_RATE
+        columns[f"{att}_master"] = _with_nulls(
+            master_col,
+            master_nulls[master],
+        )
+        columns[f"{att}_version"] = _with_nulls(
+            version_col,
+            rng.random(n_rows) < VERSION_NULL_RATE,
+        )
+    for side in ["version", "master"]:
+        for att in ATTRIBUTES:
+            df[f"{att}_{side}"] = columns[f"{att}_{side}"]
+    df["master_version_count"] = counts[master]
+    return df
+
+
+def synthetic_submitter_info(data):
+    """
+    `get_submitter_info` frame for the submitters of `data`.
+    """
+    ids = np.sort(data["submitter_person_id"].unique())
+    return pd.DataFrame(
+        {"id": ids, "submitter_name": [f"Submitter {i}" for i in ids]},
+    )
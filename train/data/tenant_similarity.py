@@ -0,0 +1,148 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import jellyfish
+import numpy as np
+import pandas as pd
+import structlog
+
+from train.data.storage import write_parquet
+
+logger = structlog.get_logger()
+
+# pair cache and process pool of `get_tenant_similarity`, see
+# `initialize_tenant_similarity`; without a cache path pairs are only
+# cached for the process
+_similarity = {
+    "cache_path": None,
+    "n_jobs": 1,
+    "pool_min_pairs": 50000,
+    "cache": None,
+    "saved_pairs": 0,
+}
+
+
+def _jaro_winkler_pairs(pairs):
+    return [jellyfish.jaro_winkler(s, t) for s, t in pairs]
+
+
+def compute_similarity(subjects, targets, n_jobs=1, pool_min_pairs=50000):
+    """
+    Jaro-Winkler similarity of each (subject, target) pair. Large batches
+    are split across a process pool.
+    """
+    pairs = list(zip(subjects, targets))
+    if n_jobs <= 1 or len(pairs) < pool_min_pairs:
+        return np.array(_jaro_winkler_pairs(pairs), dtype="float64")
+
+    chunk_size = -(-len(pairs) // n_jobs)
+    chunks = [
+        pairs[i : i + chunk_size] for i in range(0, len(pairs), chunk_size)
+    ]
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        results = executor.map(_jaro_winkler_pairs, chunks)
+    return np.concatenate([np.array(r, dtype="float64") for r in results])
+
+
+def load_similarity_cache(path):
+    if not path or not os.path.exists(path):
+        return pd.DataFrame(
+            {
+                "subject": pd.Series(dtype="object"),
+                "target": pd.Series(dtype="object"),
+                "similarity": pd.Series(dtype="float64"),
+            },
+        )
+    return pd.read_parquet(path)
+
+
+def initialize_tenant_similarity(
+    cache_path=None,
+    n_jobs=1,
+    pool_min_pairs=50000,
+):
+    """
+    Keep pair similarities in the Parquet cache at `cache_path` between
+    runs, and score batches of at least `pool_min_pairs` new pairs in
+    `n_jobs` processes.
+    """
+    _similarity.update(
+        cache_path=cache_path,
+        n_jobs=n_jobs,
+        pool_min_pairs=pool_min_pairs,
+        cache=None,
+        saved_pairs=0,
+    )
+
+
+def _similarity_cache():
+    """
+    Cached pairs, read from the cache file once per process.
+    """
+    if _similarity["cache"] is None:
+        cache = load_similarity_cache(_similarity["cache_path"])
+        _similarity.update(cache=cache, saved_pairs=len(cache))
+    return _similarity["cache"]
+
+
+def save_tenant_similarity():
+    """
+    Write the cached pairs back to the cache file if pairs were scored
+    since it was read.
+    """
+    cache = _similarity["cache"]
+    if (
+        not _similarity["cache_path"]
+        or cache is None
+        or len(cache) == _similarity["saved_pairs"]
+    ):
+        return
+    write_parquet(cache, _similarity["cache_path"])
+    logger.info(
+        "Tenant name similarity cache written",
+        pairs=len(cache),
+        new_pairs=len(cache) - _similarity["saved_pairs"],
+    )
+    _similarity["saved_pairs"] = len(cache)
+
+
+def get_tenant_similarity(subject, target):
+    """
+    Similarity for every row of two aligned tenant name series.
+    Each distinct (subject, target) pair is scored once, looked up in the
+    pair cache first, and the result is broadcast back to the rows. New
+    pairs are added to the cache in memory, `save_tenant_similarity`
+    writes them out.
+    """
+    codes, uniques = pd.MultiIndex.from_arrays(
+        [
+            np.asarray(subject, dtype="object"),
+            np.asarray(target, dtype="object"),
+        ],
+    ).factorize()
+    distinct = uniques.to_frame(index=False, name=["subject", "target"])
+
+    cache = _similarity_cache()
+    distinct = distinct.merge(cache, on=["subject", "target"], how="left")
+    missing = distinct["similarity"].isnull().to_numpy()
+
+    if missing.any():
+        distinct.loc[missing, "similarity"] = compute_similarity(
+            distinct.loc[missing, "subject"],
+            distinct.loc[missing, "target"],
+            n_jobs=_similarity["n_jobs"],
+            pool_min_pairs=_similarity["pool_min_pairs"],
+        )
+        _similarity["cache"] = pd.concat(
+            [cache, distinct[missing]],
+            ignore_index=True,
+        )
+
+    logger.info(
+        "Tenant name similarity",
+        rows=len(codes),
+        distinct_pairs=len(distinct),
+        computed_pairs=int(missing.sum()),
+        cached_pairs=int((~missing).sum()),
+    )
+    return distinct["similarity"].to_numpy()[codes]
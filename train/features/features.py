@@ -1,76 +1,63 @@
 import numpy as np
 import pandas as pd
 
+from train.common.profiling import profiled, stage
+from train.data.schema import apply_schema, fill_missing, log_memory
 
-def get_features_by_entity(data, name, label, fill):
-    df_metrics = pd.DataFrame()
-    ids = list(data[name].unique())
-    if np.NaN in ids:
-        ids.remove(np.NaN)
-    df_metrics[name] = ids
 
+def entity_indicators(data, name, label, fill):
+    """
+    Indicator columns counted per entity: correct and total for every
+    label, filled for every filled column, suffixed with the entity name.
+    """
+    indicators = {}
     for col in label:
-        temp = data.copy()
-        temp[col] = data[col].replace(-1, 0)
-        s_correct = (
-            temp.groupby(name)[col]
-            .sum()
-            .rename(f"{col.replace('label', 'correct')}_{name}")
-        )
-        df_metrics = df_metrics.merge(
-            right=s_correct,
-            how="inner",
-            left_on=name,
-            right_index=True,
-        )
-
-        temp = data.copy()
-        temp[col] = data[col].replace([-1, 0], [1, 1])
-        s_total = (
-            temp.groupby(name)[col]
-            .sum()
-            .rename(f"{col.replace('label', 'total')}_{name}")
-        )
-        df_metrics = df_metrics.merge(
-            right=s_total,
-            how="inner",
-            left_on=name,
-            right_index=True,
-        )
+        correct = f"{col.replace('label', 'correct')}_{name}"
+        total = f"{col.replace('label', 'total')}_{name}"
+        indicators[correct] = data[col].eq(1)
+        indicators[total] = data[col].notnull()
 
     for col in fill:
-        temp = data.copy()
-        temp[col] = data[col].replace([-1, 0, 1], [0, 1, 1])
-
-        s_filled = temp.groupby(name)[col].sum().rename(f"{col}_{name}")
-        df_metrics = df_metrics.merge(
-            right=s_filled,
-            how="inner",
-            left_on=name,
-            right_index=True,
-        )
+        indicators[f"{col}_{name}"] = data[col].isin([0, 1])
+    return indicators
+
+
+def get_features_by_entity(data, name, label, fill):
+    """
+    Correct, total and filled counts per entity, aggregated in a single
+    groupby over indicator columns.
+    """
+    indicators = {name: data[name]}
+    indicators.update(entity_indicators(data, name, label, fill))
+
+    df_metrics = (
+        pd.DataFrame(indicators).groupby(name, sort=False).sum().reset_index()
+    )
 
     cols = list(df_metrics.columns)
     cols.remove(name)
 
     df_metrics = df_metrics[[name] + sorted(cols)]
-    return df_metrics
+    return apply_schema(df_metrics)
 
 
 def combine_features(data, agg_data, name, how, correct, filled):
-    df = data.merge(agg_data, how=how)
+    with stage(f"combine.{name}") as record:
+        df = data.merge(agg_data, how=how)
 
-    for c in correct:
-        replace_total = c.replace("correct", "total")
-        replace_label = c.replace("correct", "label")
+        for c in correct:
+            replace_total = c.replace("correct", "total")
+            replace_label = c.replace("correct", "label")
 
-        df[f"{c}_{name}_hist"] = df[f"{c}_{name}"] - df[f"{replace_label}"]
-        df[f"{replace_total}_{name}_hist"] = df[f"{replace_total}_{name}"] - 1
+            df[f"{c}_{name}_hist"] = df[f"{c}_{name}"] - df[f"{replace_label}"]
+            df[f"{replace_total}_{name}_hist"] = (
+                df[f"{replace_total}_{name}"] - 1
+            )
 
-    for f in filled:
-        df[f"{f}_{name}_hist"] = df[f"{f}_{name}"] - df[f"{f}"]
+        for f in filled:
+            df[f"{f}_{name}_hist"] = df[f"{f}_{name}"] - df[f"{f}"]
 
-    return df.fillna(0)
+        return record.output(apply_schema(fill_missing(df, 0)))
 
 
 def get_rate_features(data, attributes):
@@ -100,7 +87,35 @@ def get_rate_features(data, attributes):
             0,
         )
 
-    return df
+    return apply_schema(df)
+
+
+@profiled("entity_features")
+def get_entity_features(data, col_names_label, col_names_filled):
+    """
+    Submitter and logo aggregates of `data`, as used by
+    `feature_engineering`.
+    """
+    return {
+        "submitter_person_id": log_memory(
+            get_features_by_entity(
+                data,
+                "submitter_person_id",
+                col_names_label,
+                col_names_filled,
+            ),
+            "submitter features",
+        ),
+        "logo": log_memory(
+            get_features_by_entity(
+                data,
+                "logo",
+                col_names_label,
+                col_names_filled,
+            ),
+            "logo features",
+        ),
+    }
 
 
 def feature_engineering(
@@ -109,36 +124,33 @@ def feature_engineering(
     col_names_filled,
     col_names_correct,
     attributes,
+    entity_features=None,
 ):
-
-    df_submitter_features = get_features_by_entity(
-        data,
-        "submitter_person_id",
-        col_names_label,
-        col_names_filled,
-    )
-    df_logo_features = get_features_by_entity(
-        data,
-        "logo",
-        col_names_label,
-        col_names_filled,
-    )
+    if entity_features is None:
+        entity_features = get_entity_features(
+            data,
+            col_names_label,
+            col_names_filled,
+        )
     df = combine_features(
         data,
-        df_submitter_features,
+        entity_features["submitter_person_id"],
         "submitter_person_id",
         "inner",
         col_names_correct,
         col_names_filled,
     )
+    log_memory(df, "combine submitter features")
     df = combine_features(
         df,
-        df_logo_features,
+        entity_features["logo"],
         "logo",
         "left",
         col_names_correct,
         col_names_filled,
     )
-    df = get_rate_features(df, attributes)
+    log_memory(df, "combine logo features")
+    with stage("rate_features") as record:
+        df = record.output(get_rate_features(df, attributes))
 
-    return df
+    return log_memory(df, "rate features")
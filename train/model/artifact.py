@@ -0,0 +1,147 @@
+"""
+Compact on-disk format for the per-attribute model dict.
+
+Forests are stored as flat node arrays shared by every tree of every
+model, so loaders can memory-map them instead of unpickling estimator
+object graphs:
+
+    manifest.json     feature columns, label -> model entry, data hash
+    nodes.npy         (n_nodes, 4) int32 node records: feature, float32
+                      threshold bits, left and right child
+    value.npy         float64 positive class probability of the node
+    roots.npy         int32 root node of every tree
+
+Leaves point to themselves with a threshold of +inf. Models that are not
+forests of decision trees are stored with joblib next to the arrays. The
+loaded artifact scores with the engine of `train.model.inference`, which
+also documents the node records. A saved artifact replaces the previous
+directory as a whole.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from train.model.inference import ARRAYS, TreeEnsemble, compile_models
+
+FORMAT_VERSION = 2
+MANIFEST = "manifest.json"
+
+
+def training_data_hash(df, columns):
+    hashed = pd.util.hash_pandas_object(df[columns], index=False)
+    return hashlib.sha256(hashed.to_numpy().tobytes()).hexdigest()
+
+
+def artifact_hash(path):
+    """
+    SHA-256 of every file of the artifact directory, identifying the
+    models that produced a score.
+    """
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(path)):
+        digest.update(name.encode())
+        with open(os.path.join(path, name), "rb") as f:
+            for block in iter(lambda: f.read(2**20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _replace_directory(tmp_path, path):
+    """
+    Swap the finished directory `tmp_path` in for `path`. The files of the
+    previous directory are unlinked, never rewritten, so readers that
+    memory-mapped them keep a consistent copy.
+    """
+    old_path = f"{path}.old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def save_model_artifact(model_dict, X_cols, path, data_hash=None):
+    """
+    Write the model dict to the artifact directory `path`, replacing any
+    previous artifact as a whole once every file is written.
+    """
+    path = os.path.normpath(path)
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    ensemble = compile_models(model_dict, X_cols)
+    for name in ARRAYS:
+        np.save(
+            os.path.join(tmp_path, f"{name}.npy"),
+            getattr(ensemble, name),
+        )
+
+    models = {}
+    for label, entry in ensemble.models.items():
+        if entry["kind"] == "estimator":
+            filename = f"{label}.joblib"
+            joblib.dump(
+                ensemble.estimators[label],
+                os.path.join(tmp_path, filename),
+            )
+            entry = {"kind": "joblib", "file": filename}
+        models[label] = entry
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "feature_columns": list(X_cols),
+        "training_data_hash": data_hash,
+        "models": models,
+    }
+    with open(os.path.join(tmp_path, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    _replace_directory(tmp_path, path)
+
+
+class ModelArtifact(TreeEnsemble):
+    """
+    Loaded artifact. Forest arrays are memory-mapped unless `mmap` is off.
+    """
+
+    def __init__(self, path, mmap=True):
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest["format_version"] != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported model artifact format "
+                f"{self.manifest['format_version']}",
+            )
+
+        mmap_mode = "r" if mmap else None
+        arrays = {
+            name: np.load(
+                os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode
+            )
+            for name in ARRAYS
+        }
+
+        models = {}
+        estimators = {}
+        for label, entry in self.manifest["models"].items():
+            if entry["kind"] == "joblib":
+                estimators[label] = joblib.load(
+                    os.path.join(path, entry["file"])
+                )
+                entry = {"kind": "estimator"}
+            models[label] = entry
+
+        super().__init__(
+            arrays,
+            models,
+            self.manifest["feature_columns"],
+            estimators,
+        )
+
+
+def load_model_artifact(path, mmap=True):
+    return ModelArtifact(path, mmap=mmap)
@@ -0,0 +1,330 @@
+"""
+Vectorized inference for the per-attribute model dict.
+
+Forests are compiled into one table of 16 byte node records shared by
+every tree of every model (see `train.model.artifact` for the on-disk
+layout):
+
+    feature     int32 split feature, 0 for leaves
+    threshold   float32 split threshold rounded down, +inf for leaves
+    left        int32 global index of the left child, the node for leaves
+    right       int32 global index of the right child, the node for leaves
+
+A float32 feature value x satisfies x <= t exactly when it satisfies
+x <= t rounded down to float32, so the compact thresholds take the same
+branches as sklearn's float64 ones. A chunk of rows is scored by walking
+blocks of trees taken across all models at once, one level per step,
+with one gather of node records per (row, tree) pair and level. Pairs
+that reached a leaf stay on it and are only dropped once they are a
+sizeable part of the block. Probabilities are accumulated tree by tree
+in estimator order, exactly like `RandomForestClassifier.predict_proba`
+with one job.
+"""
+import numpy as np
+import pandas as pd
+import structlog
+
+logger = structlog.get_logger()
+
+ARRAYS = ["nodes", "value", "roots"]
+
+FEATURE, THRESHOLD, LEFT, RIGHT = range(4)
+
+# drop finished pairs once they are 1 / COMPACT_FRACTION of the batch
+COMPACT_FRACTION = 4
+# (row, tree) pairs walked together: few enough for the temporaries and
+# the nodes of the block to stay in cache, enough to share the per-level
+# overhead
+BLOCK_PAIRS = 32768
+
+
+def _is_forest(clf):
+    estimators = getattr(clf, "estimators_", None)
+    return isinstance(estimators, list) and all(
+        hasattr(tree, "tree_") for tree in estimators
+    )
+
+
+def _positive_class_values(tree_, positive):
+    value = tree_.value[:, 0, :]
+    normalizer = value.sum(axis=1)
+    normalizer[normalizer == 0.0] = 1.0
+    if positive is None:
+        return np.zeros(tree_.node_count, dtype="float64")
+    return value[:, positive] / normalizer
+
+
+def _float32_floor(threshold):
+    """
+    Largest float32 that is not greater than each float64 threshold.
+    """
+    rounded = threshold.astype("float32")
+    above = rounded.astype("float64") > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _compile_tree(tree_, positive, offset):
+    index = np.arange(tree_.node_count) + offset
+    leaf = tree_.children_left == -1
+    nodes = np.empty((tree_.node_count, 4), dtype="int32")
+    nodes[:, FEATURE] = np.where(leaf, 0, tree_.feature)
+    nodes[:, THRESHOLD] = np.where(
+        leaf,
+        np.float32(np.inf),
+        _float32_floor(tree_.threshold),
+    ).view("int32")
+    nodes[:, LEFT] = np.where(leaf, index, tree_.children_left + offset)
+    nodes[:, RIGHT] = np.where(leaf, index, tree_.children_right + offset)
+    return nodes, _positive_class_values(tree_, positive)
+
+
+def _compile_forest(clf, offset):
+    classes = list(clf.classes_)
+    positive = classes.index(1) if 1 in classes else None
+    arrays = {name: [] for name in ARRAYS}
+    max_depth = 0
+    for estimator in clf.estimators_:
+        tree_ = estimator.tree_
+        nodes, value = _compile_tree(tree_, positive, offset)
+        arrays["nodes"].append(nodes)
+        arrays["value"].append(value)
+        arrays["roots"].append([offset])
+        max_depth = max(max_depth, tree_.max_depth)
+        offset += tree_.node_count
+    return arrays, max_depth, offset
+
+
+def distinct_rows(X, columns=None, chunk_size=65536):
+    """
+    Index of the first occurrence of each distinct row of X (restricted to
+    `columns` when given) and, for every row, the position of its distinct
+    row in that index.
+
+    Rows are grouped by a 64 bit hash of their values, computed chunk by
+    chunk, and then compared with the first row of their group, so a hash
+    collision only costs the colliding rows their deduplication.
+    """
+    frame = X if isinstance(X, pd.DataFrame) else pd.DataFrame(X)
+    positions = np.arange(frame.shape[1])
+    if columns is not None:
+        positions = frame.columns.get_indexer(columns)
+    if not len(frame):
+        return np.empty(0, dtype="intp"), np.empty(0, dtype="intp")
+
+    hashes = np.concatenate(
+        [
+            pd.util.hash_pandas_object(
+                frame.iloc[start : start + chunk_size, positions],
+                index=False,
+            ).to_numpy()
+            for start in range(0, len(frame), chunk_size)
+        ],
+    )
+    _, first, inverse = np.unique(
+        hashes,
+        return_index=True,
+        return_inverse=True,
+    )
+    inverse = inverse.reshape(-1)
+
+    collided = []
+    for start in range(0, len(frame), chunk_size):
+        rows = np.arange(start, min(start + chunk_size, len(frame)))
+        values = frame.iloc[rows, positions].to_numpy()
+        expected = frame.iloc[first[inverse[rows]], positions].to_numpy()
+        same = (values == expected) | (pd.isnull(values) & pd.isnull(expected))
+        collided.append(rows[~same.all(axis=1)])
+    collided = np.concatenate(collided)
+    if len(collided):
+        inverse[collided] = len(first) + np.arange(len(collided))
+        first = np.concatenate([first, collided])
+    return first, inverse
+
+
+def log_distinct_rows(n_rows, n_distinct):
+    logger.info(
+        "Distinct feature rows",
+        rows=n_rows,
+        distinct_rows=n_distinct,
+        dedup_ratio=round(n_rows / max(n_distinct, 1), 2),
+    )
+
+
+class TreeEnsemble:
+    """
+    Compiled model dict: node records for the forests, estimators for the
+    models that are not forests of decision trees.
+
+    `models` maps each label to `{"kind": "forest", "trees": [start, end],
+    "max_depth": ...}` or `{"kind": "estimator"}`.
+    """
+
+    def __init__(self, arrays, models, feature_columns, estimators=None):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.models = models
+        self.feature_columns = list(feature_columns)
+        self.estimators = estimators or {}
+
+    @property
+    def labels(self):
+        return list(self.models.keys())
+
+    def _leaves(self, X, trees):
+        """
+        Leaf reached by every row of X in every tree of `trees`, as a
+        (len(trees), len(X)) array.
+        """
+        n_rows, n_features = X.shape
+        X = X.ravel()
+        node = np.repeat(self.roots[trees].astype("int32"), n_rows)
+        leaves = np.empty_like(node)
+        pair = np.arange(len(node))
+        row = np.tile(np.arange(n_rows, dtype="int32") * n_features, len(trees))
+        # flat index of the right child in the i-th gathered record
+        right = np.arange(len(node), dtype="int32") * 4 + RIGHT
+        while len(node):
+            record = self.nodes.take(node, axis=0)
+            finished = record[:, LEFT] == node
+            if np.count_nonzero(finished) * COMPACT_FRACTION >= len(node):
+                done = np.flatnonzero(finished)
+                leaves[pair.take(done)] = node.take(done)
+                active = np.flatnonzero(~finished)
+                if not len(active):
+                    break
+                pair = pair.take(active)
+                row = row.take(active)
+                record = record.take(active, axis=0)
+            go_left = X.take(row + record[:, FEATURE]) <= record[
+                :, THRESHOLD
+            ].view("float32")
+            # the left child sits just before the right one in the record
+            node = record.ravel().take(right[: len(record)] - go_left)
+        return leaves.reshape(len(trees), n_rows)
+
+    def _forest_chunk(self, X, labels):
+        ranges = [self.models[label]["trees"] for label in labels]
+        trees = np.concatenate([np.arange(start, end) for start, end in ranges])
+        owners = [
+            label
+            for label, (start, end) in zip(labels, ranges)
+            for _ in range(start, end)
+        ]
+        sums = {label: np.zeros(len(X), dtype="float64") for label in labels}
+        block = max(1, BLOCK_PAIRS // len(X))
+        for start in range(0, len(trees), block):
+            values = self.value.take(
+                self._leaves(X, trees[start : start + block]),
+            )
+            for label, tree_values in zip(owners[start:], values):
+                sums[label] += tree_values
+
+        return {
+            label: sums[label] / (end - start)
+            for label, (start, end) in zip(labels, ranges)
+        }
+
+    def _estimator_proba(self, label, X):
+        clf = self.estimators[label]
+        if not isinstance(X, pd.DataFrame):
+            X = pd.DataFrame(X, columns=self.feature_columns)
+        return clf.predict_proba(X)[:, list(clf.classes_).index(1)]
+
+    def predict_proba_all(
+        self,
+        X,
+        labels=None,
+        chunk_size=2048,
+        deduplicate=False,
+    ):
+        """
+        Positive class probability of every model in `labels` (default all)
+        for each row of X, walking all forests together in chunks of
+        `chunk_size` rows. With `deduplicate`, every distinct feature row
+        is scored once and the results are broadcast back to its rows.
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_columns]
+        labels = self.labels if labels is None else list(labels)
+        if len(X) == 0:
+            # the estimators of the boosting backends reject empty input
+            return {label: np.empty(0, dtype="float64") for label in labels}
+        if deduplicate:
+            first, inverse = distinct_rows(X)
+            log_distinct_rows(len(inverse), len(first))
+            distinct = (
+                X.iloc[first] if isinstance(X, pd.DataFrame) else X[first]
+            )
+            probabilities = self.predict_proba_all(distinct, labels, chunk_size)
+            return {label: probabilities[label][inverse] for label in labels}
+        forests = [
+            label for label in labels if self.models[label]["kind"] == "forest"
+        ]
+
+        probabilities = {}
+        if forests:
+            matrix = np.ascontiguousarray(X, dtype="float32")
+            for label in forests:
+                probabilities[label] = np.empty(len(matrix), dtype="float64")
+            for start in range(0, len(matrix), chunk_size):
+                chunk = self._forest_chunk(
+                    matrix[start : start + chunk_size],
+                    forests,
+                )
+                for label, proba in chunk.items():
+                    probabilities[label][start : start + chunk_size] = proba
+
+        for label in labels:
+            if label not in probabilities:
+                probabilities[label] = self._estimator_proba(label, X)
+        return {label: probabilities[label] for label in labels}
+
+    def predict_proba(self, label, X):
+        """
+        Positive class probability of model `label` for each row of X.
+        """
+        return self.predict_proba_all(X, [label])[label]
+
+
+def compile_models(model_dict, X_cols):
+    """
+    Compile the forests of the model dict into one `TreeEnsemble`.
+    """
+    arrays = {
+        "nodes": [np.empty((0, 4), dtype="int32")],
+        "value": [np.empty(0, dtype="float64")],
+        "roots": [np.empty(0, dtype="int32")],
+    }
+    models = {}
+    estimators = {}
+    offset = 0
+    n_trees = 0
+    for label, clf in model_dict.items():
+        if not _is_forest(clf):
+            models[label] = {"kind": "estimator"}
+            estimators[label] = clf
+            continue
+
+        forest, max_depth, offset = _compile_forest(clf, offset)
+        for name in ARRAYS:
+            arrays[name].extend(forest[name])
+        models[label] = {
+            "kind": "forest",
+            "trees": [n_trees, n_trees + len(clf.estimators_)],
+            "max_depth": int(max_depth),
+        }
+        n_trees += len(clf.estimators_)
+
+    if offset > np.iinfo("int32").max:
+        raise ValueError(f"Too many tree nodes to compile: {offset}")
+    return TreeEnsemble(
+        {
+            "nodes": np.concatenate(arrays["nodes"]),
+            "value": np.concatenate(arrays["value"]),
+            "roots": np.concatenate(arrays["roots"]).astype("int32"),
+        },
+        models,
+        X_cols,
+        estimators,
+    )
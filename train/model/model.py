@@ -1,6 +1,21 @@
-from sklearn.ensemble import RandomForestClassifier
+from concurrent.futures import ProcessPoolExecutor
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import (
+    HistGradientBoostingClassifier,
+    RandomForestClassifier,
+)
 from sklearn.metrics import accuracy_score, f1_score
 from sklearn.model_selection import train_test_split
+import structlog
+
+from train.common.profiling import RunReport, run_report, stage
+from train.config.settings import settings
+
+logger = structlog.get_logger()
 
 
 def get_column_names(attributes):
@@ -26,36 +41,176 @@ def get_split_columns(columns):
     return X_cols, y_cols
 
 
-def train_multioutput_classifiers(df, X_cols, y_cols):
+def _feature_matrix(df, X_cols, path=None):
+    """
+    Contiguous float32 feature matrix, filled column by column, optionally
+    as a .npy memmap at `path`.
+    """
+    shape = (len(df), len(X_cols))
+    if path is None:
+        X = np.empty(shape, dtype="float32")
+    else:
+        X = np.lib.format.open_memmap(
+            path,
+            mode="w+",
+            dtype="float32",
+            shape=shape,
+        )
+    for i, col in enumerate(X_cols):
+        X[:, i] = df[col].to_numpy(dtype="float32")
+    return X
 
-    model_dict = {}
-    for col in y_cols:
-
-        # Remove null attributes
-        temp = df[df[col] != -1]
-        X = temp[X_cols]
-        y = temp[col]
-        x_train, x_test, y_train, y_test = train_test_split(
-            X,
-            y,
-            test_size=0.2,
-            random_state=10,
+
+BACKENDS = ["random_forest", "hist_gradient_boosting", "xgboost"]
+
+
+def make_classifier(backend, tree_jobs=-1):
+    """
+    Unfitted binary classifier of the given backend. `tree_jobs` is the
+    number of threads of one model (-1 for all cores); the histogram
+    gradient boosting backend always uses the OpenMP default.
+    """
+    if backend == "random_forest":
+        return RandomForestClassifier(
+            class_weight=None,
+            random_state=1,
+            n_jobs=tree_jobs,
+        )
+    if backend == "hist_gradient_boosting":
+        return HistGradientBoostingClassifier(
+            max_iter=200,
+            random_state=1,
         )
-        class_weight = None
-        clf = RandomForestClassifier(
-            class_weight=class_weight,
+    if backend == "xgboost":
+        from xgboost import XGBClassifier
+
+        return XGBClassifier(
+            tree_method="hist",
+            n_estimators=200,
+            max_depth=8,
+            learning_rate=0.1,
+            eval_metric="logloss",
+            use_label_encoder=False,
             random_state=1,
-            n_jobs=-1,
+            n_jobs=tree_jobs if tree_jobs > 0 else None,
+        )
+    raise ValueError(
+        f"Unknown model backend {backend}, expected one of {BACKENDS}",
+    )
+
+
+def _fit_classifier(X, y, X_cols, backend, tree_jobs):
+    # Remove null attributes
+    rows = np.flatnonzero(y != -1)
+    train_rows, test_rows = train_test_split(
+        rows,
+        test_size=0.2,
+        random_state=10,
+    )
+    clf = make_classifier(backend, tree_jobs)
+    clf.fit(pd.DataFrame(X[train_rows], columns=X_cols), y[train_rows])
+    test_preds = clf.predict(pd.DataFrame(X[test_rows], columns=X_cols))
+    acc = accuracy_score(y[test_rows], test_preds)
+    f1 = f1_score(y[test_rows], test_preds)
+    return clf, acc, f1, y[rows]
+
+
+def _fit_stage(label, X, y, X_cols, backend, tree_jobs, report=None):
+    with stage(f"train.{label}", report) as record:
+        result = _fit_classifier(X, y, X_cols, backend, tree_jobs)
+        record.rows, record.columns = len(result[3]), len(X_cols)
+    return result
+
+
+def _fit_shared_classifier(
+    X_path,
+    y_path,
+    j,
+    label,
+    X_cols,
+    backend,
+    tree_jobs,
+):
+    # the stage is measured in the worker and merged into the run report
+    report = RunReport()
+    X = np.load(X_path, mmap_mode="r")
+    y = np.load(y_path, mmap_mode="r")[:, j]
+    result = _fit_stage(
+        label,
+        X,
+        np.asarray(y),
+        X_cols,
+        backend,
+        tree_jobs,
+        report,
+    )
+    return result, report.stages
+
+
+def train_multioutput_classifiers(
+    df,
+    X_cols,
+    y_cols,
+    backend=settings.TRAIN_BACKEND,
+    model_jobs=settings.TRAIN_MODEL_JOBS,
+    tree_jobs=settings.TRAIN_TREE_JOBS,
+):
+    """
+    Fit one `backend` classifier (see `make_classifier`) per label column
+    over a single float32 feature matrix. With `model_jobs` > 1 the fits
+    run in a process pool, each model using `tree_jobs` cores, and the
+    workers memory-map the matrix from a temporary .npy file instead of
+    receiving a pickled copy.
+    """
+    y = np.column_stack([df[col].to_numpy(dtype="int8") for col in y_cols])
+
+    if model_jobs <= 1:
+        X = _feature_matrix(df, X_cols)
+        results = [
+            _fit_stage(col, X, y[:, j], X_cols, backend, tree_jobs)
+            for j, col in enumerate(y_cols)
+        ]
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            X_path = os.path.join(directory, "X.npy")
+            y_path = os.path.join(directory, "y.npy")
+            X = _feature_matrix(df, X_cols, X_path)
+            X.flush()
+            del X
+            np.save(y_path, y)
+
+            with ProcessPoolExecutor(max_workers=model_jobs) as executor:
+                futures = [
+                    executor.submit(
+                        _fit_shared_classifier,
+                        X_path,
+                        y_path,
+                        j,
+                        col,
+                        X_cols,
+                        backend,
+                        tree_jobs,
+                    )
+                    for j, col in enumerate(y_cols)
+                ]
+                results = []
+                for future in futures:
+                    result, stages = future.result()
+                    run_report.merge(stages)
+                    results.append(result)
+
+    model_dict = {}
+    for col, (clf, acc, f1, labels) in zip(y_cols, results):
+        logger.info(
+            "Holdout metrics",
+            label=col,
+            accuracy=round(acc, 4),
+            f1=round(f1, 4),
+            label_counts={
+                int(value): int(count)
+                for value, count in pd.Series(labels).value_counts().items()
+            },
         )
-        clf.fit(x_train, y_train)
-        test_preds = clf.predict(x_test)
-        acc = accuracy_score(y_test, test_preds)
-        f1 = f1_score(y_test, test_preds)
-
-        print(f"{col} - Accuracy : {acc}")
-        print(f"{col} - F1 : {f1}")
-        print(y.value_counts())
-        print("----------------------------------")
 
         model_dict[col] = clf
     return model_dict
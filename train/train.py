@@ -1,20 +1,28 @@
 import asyncio
+import os
 
 import structlog
 
 from train.common.logging import initialize_logging
+from train.common.profiling import initialize_profiling, run_report, stage
 from train.config.settings import settings
 from train.data.dataset import (
-    get_all_data,
-    get_labels,
-    get_reliable_data,
+    get_batch_logos,
     get_submitter_info,
+    get_version_data,
+    snapshot_expired,
+    split_version_data,
 )
+from train.data.entity_aggregates import get_entity_features_pushdown
 from train.data.output_data import (
+    export_entity_features,
+    export_version_reliability,
     get_submitter_reliability,
-    get_version_reliability,
 )
-from train.features.features import feature_engineering
+from train.data.schema import log_memory
+from train.data.tenant_similarity import initialize_tenant_similarity
+from train.features.features import feature_engineering, get_entity_features
+from train.model.artifact import save_model_artifact, training_data_hash
 from train.model.model import (
     get_column_names,
     get_split_columns,
@@ -24,20 +32,12 @@ from train.model.model import (
 
 async def main() -> None:
     initialize_logging(settings.ENV)
-    logger = structlog.get_logger()
-
-    logger.info("<<< Getting Data >>>")
-    # training data (masters with >3 versions within it)
-    reliable_data = get_reliable_data()
-
-    # all version data needed to export a reliability score
-    all_data = get_all_data()
-
-    # submitter name for display purposes when exporting validation data
-    submitter_name = get_submitter_info()
-
-    print(len(reliable_data))
-    print(len(all_data))
+    initialize_profiling(settings.PROFILE_STAGES, settings.PROFILE_DIR)
+    initialize_tenant_similarity(
+        settings.TENANT_SIMILARITY_CACHE,
+        settings.TENANT_SIMILARITY_JOBS,
+        settings.TENANT_SIMILARITY_POOL_MIN_PAIRS,
+    )
 
     attributes = [
         "tenant_name",
@@ -56,58 +56,144 @@ async def main() -> None:
         "lease_type_id",
     ]
 
+    try:
+        await run_training(attributes)
+    except BaseException:
+        run_report.write(settings.RUN_REPORT, completed=False)
+        raise
+    run_report.write(settings.RUN_REPORT)
+
+
+async def run_training(attributes) -> None:
+    logger = structlog.get_logger()
     col_names_correct, col_names_filled, col_names_label = get_column_names(
         attributes,
     )
 
-    logger.info("Creating Data Labels")
-    data = get_labels(reliable_data, attributes)
-    all_data = get_labels(all_data, attributes)
+    logger.info("<<< Getting Data >>>")
+    # all version data in one extract, with the version count of each master,
+    # labeled batch by batch as it streams in
+    refresh = settings.VERSION_DATA_FULL_REFRESH or snapshot_expired(
+        settings.VERSION_DATA_SNAPSHOT,
+        settings.VERSION_DATA_MAX_AGE_DAYS,
+    )
+    full_extract = refresh or not (
+        settings.VERSION_DATA_SNAPSHOT
+        and os.path.exists(settings.VERSION_DATA_SNAPSHOT)
+    )
+    version_data = get_version_data(attributes=attributes, refresh=refresh)
+
+    # submitter name for display purposes when exporting validation data
+    with stage("submitter_info") as record:
+        submitter_name = record.output(get_submitter_info())
+
+    # training data (masters with >3 versions within it) and all version data
+    # needed to export a reliability score
+    data, all_data = split_version_data(version_data)
+    del version_data
+    log_memory(data, "reliable data")
+    logger.info(
+        "Split version data",
+        reliable_rows=len(data),
+        all_rows=len(all_data),
+    )
 
     logger.info("Feature Engineering - Reliable Data")
-    df = feature_engineering(
-        data,
-        col_names_label,
-        col_names_filled,
-        col_names_correct,
-        attributes,
-    )
+    with stage("features.reliable") as record:
+        df = record.output(
+            feature_engineering(
+                data,
+                col_names_label,
+                col_names_filled,
+                col_names_correct,
+                attributes,
+            ),
+        )
 
     logger.info("Feature Engineering - All Data")
-    df_all = feature_engineering(
-        all_data,
-        col_names_label,
-        col_names_filled,
-        col_names_correct,
-        attributes,
-    )
+    with stage("features.all") as record:
+        # warehouse aggregates only match an extract read in full just now,
+        # not one patched from an older snapshot
+        if settings.ENTITY_FEATURES_PUSHDOWN and full_extract:
+            entity_features = get_entity_features_pushdown(
+                attributes=attributes,
+            )
+        else:
+            if settings.ENTITY_FEATURES_PUSHDOWN:
+                logger.info(
+                    "Entity aggregates computed from the extract, the "
+                    "pushdown needs a full extract",
+                )
+            entity_features = get_entity_features(
+                all_data,
+                col_names_label,
+                col_names_filled,
+            )
+        df_all = record.output(
+            feature_engineering(
+                all_data,
+                col_names_label,
+                col_names_filled,
+                col_names_correct,
+                attributes,
+                entity_features,
+            ),
+        )
+    # latest aggregates for the batch job that scores new versions
+    with stage("export.entity_features"):
+        export_entity_features(
+            entity_features,
+            get_batch_logos(),
+            settings.ENTITY_FEATURES_DIR,
+            all_data[["id", "submitter_person_id", "logo"]],
+        )
+    del entity_features
 
     logger.info("Model Training")
     x_cols, y_cols = get_split_columns(df.columns)
-    model_dict = train_multioutput_classifiers(df, x_cols, y_cols)
+    with stage("train") as record:
+        model_dict = train_multioutput_classifiers(df, x_cols, y_cols)
+        record.rows, record.columns = len(df), len(x_cols)
+    artifact_path = os.path.join(
+        settings.MODEL_DIR,
+        settings.RELIABILITY_ARTIFACT,
+    )
+    with stage("export.model_artifact"):
+        save_model_artifact(
+            model_dict,
+            x_cols,
+            artifact_path,
+            training_data_hash(df, x_cols + y_cols),
+        )
 
     logger.info("Exporting Submitter Results")
-    submitter_df, submitter_info = await get_submitter_reliability(
-        df,
-        x_cols,
-        y_cols,
-        model_dict,
-        submitter_name,
-    )
-    submitter_df.to_csv("data/processed/submitter_reliability.csv", index=False)
+    with stage("export.submitter_reliability") as record:
+        submitter_df, submitter_info = await get_submitter_reliability(
+            df,
+            x_cols,
+            y_cols,
+            model_dict,
+            submitter_name,
+        )
+        submitter_df.to_csv(
+            "data/processed/submitter_reliability.csv",
+            index=False,
+        )
+        record.output(submitter_df)
 
     logger.info("Exporting Version Results")
-    version_reliability_df = get_version_reliability(
-        df_all,
-        attributes,
-        x_cols,
-        y_cols,
-        model_dict,
-    )
-    version_reliability_df.to_csv(
-        "data/processed/version_reliability.csv",
-        index=False,
-    )
+    # scored in chunks and swapped in atomically, the API server reloads it
+    # when it changes
+    with stage("export.version_reliability") as record:
+        record.rows = export_version_reliability(
+            df_all,
+            attributes,
+            x_cols,
+            y_cols,
+            model_dict,
+            "data/processed/version_reliability.csv",
+            artifact_path=artifact_path,
+        )
 
 
 if __name__ == "__main__":